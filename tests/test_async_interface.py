@@ -0,0 +1,129 @@
+"""Tests asyncio interface for I/O grib readers and importers."""
+
+import asyncio
+import os
+import unittest
+from datetime import datetime
+from tempfile import TemporaryDirectory
+
+import xarray
+
+import unimodel.io
+from unimodel.io.importers_nwp import release_nwp_grib
+from unimodel.io.readers_nwp import read_ecmwf_grib, read_icon_grib
+
+
+class TestAsyncInterface(unittest.TestCase):
+    """Tests asyncio interface"""
+
+    config = {
+        "wrf43_prs": {
+            "src": "tests/data/nwp_src/wrf43_prs/"
+            "WRFPRS-03.{year}{month}{day}{run}_{lt}"
+            ".grib",
+            "compressed": False,
+            "lead_time_digits": 3,
+        },
+        "nwp_dir": "tests/data/nwp_dir/",
+        "stage_max_size": 1024**3,
+    }
+
+    def tearDown(self) -> None:
+        unimodel.io.set_async_workers()
+
+        return super().tearDown()
+
+    def test_read_async(self):
+        """Tests concurrent reads from an event loop"""
+        reads = [
+            ("tests/data/nwp_src/icon/icon-07.2023020700_10.grib2", "2t", "icon"),
+            ("tests/data/nwp_src/ecmwf_hres/A1S02200000022006001-99", "tp", "ecmwf"),
+        ]
+        data_ref = [
+            read_icon_grib(*reads[0]),
+            read_ecmwf_grib(*reads[1]),
+        ]
+
+        async def read_all():
+            return await asyncio.gather(
+                *(unimodel.io.read_async(*args) for args in reads * 4)
+            )
+
+        unimodel.io.set_async_workers(2)
+        data_vars = asyncio.run(read_all())
+
+        for i, data_var in enumerate(data_vars):
+            xarray.testing.assert_identical(data_var, data_ref[i % 2])
+
+        with self.assertRaises(ValueError):
+            asyncio.run(unimodel.io.read_async(*reads[0][:2], "no_model"))
+        with self.assertRaises(ValueError):
+            unimodel.io.set_async_workers(0)
+
+    def test_import_nwp_grib_async(self):
+        """Tests import of grib files from an event loop"""
+        nwp_file = asyncio.run(
+            unimodel.io.import_nwp_grib_async(
+                datetime(2023, 2, 6, 0), 32, "wrf43_prs", self.config
+            )
+        )
+        release_nwp_grib(nwp_file)
+
+        self.assertEqual(
+            nwp_file, "tests/data/nwp_dir/wrf43_prs/WRFPRS-03.2023020600_032.grib"
+        )
+
+        with self.assertRaises(FileNotFoundError):
+            asyncio.run(
+                unimodel.io.import_nwp_grib_async(
+                    datetime(2022, 11, 15, 0), 0, "wrf43_prs", self.config
+                )
+            )
+        with self.assertRaises(ValueError):
+            asyncio.run(
+                unimodel.io.import_nwp_grib_async(
+                    datetime(2023, 2, 6, 0),
+                    32,
+                    "wrf43_prs",
+                    {key: self.config[key] for key in ["wrf43_prs", "nwp_dir"]},
+                )
+            )
+
+    def test_import_nwp_grib_async_lead_times(self):
+        """Tests concurrent imports of several lead times"""
+        with TemporaryDirectory() as tmp_dir:
+            for lead_time in range(6):
+                with open(
+                    os.path.join(tmp_dir, f"model.2023020600_{lead_time:03d}.grib"),
+                    "wb",
+                ) as f_grib:
+                    f_grib.write(bytes(1000))
+            config = {
+                "model": {
+                    "src": os.path.join(
+                        tmp_dir, "model.{year}{month}{day}{run}_{lt}.grib"
+                    ),
+                    "compressed": False,
+                    "lead_time_digits": 3,
+                },
+                "nwp_dir": os.path.join(tmp_dir, "nwp_dir/"),
+                "stage_max_size": 1024**2,
+            }
+
+            async def import_all():
+                return await asyncio.gather(
+                    *(
+                        unimodel.io.import_nwp_grib_async(
+                            datetime(2023, 2, 6, 0), lead_time, "model", config
+                        )
+                        for lead_time in range(6)
+                    )
+                )
+
+            unimodel.io.set_async_workers(3)
+            nwp_files = asyncio.run(import_all())
+
+            self.assertEqual(len(set(nwp_files)), 6)
+            for nwp_file in nwp_files:
+                self.assertTrue(os.path.isfile(nwp_file))
+            release_nwp_grib(nwp_files)
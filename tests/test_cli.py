@@ -0,0 +1,22 @@
+"""Tests command line interface."""
+
+import io
+import unittest
+from contextlib import redirect_stdout
+
+from unimodel.cli import main
+
+
+class TestCLI(unittest.TestCase):
+    """Tests command line interface"""
+
+    def test_warmup(self):
+        """Tests the warmup command"""
+        output = io.StringIO()
+        with redirect_stdout(output):
+            self.assertEqual(main(["warmup"]), 0)
+
+        self.assertIn("linalg_lstsq", output.getvalue())
+
+        with self.assertRaises(SystemExit):
+            main(["no_command"])
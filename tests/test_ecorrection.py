@@ -71,6 +71,17 @@ class TestEcorrection(unittest.TestCase):
 
         self.assertAlmostEqual(float(var_correction[288, 142].values), 4.74, 1)
 
+    def test_apply_correction_dtype(self):
+        """Tests apply correction function does not upcast float32 data"""
+        ecor = Ecorrection(self.da_var["lsm"], self.dem_file)
+
+        var_correction = ecor.apply_correction(
+            self.da_var["t2m"], self.da_var["orog"], dtype="float32"
+        )
+
+        self.assertEqual(var_correction.dtype, np.float32)
+        self.assertAlmostEqual(float(var_correction[288, 142].values), 8.22, 1)
+
     def test_apply_correction_not_2t_dataarray(self):
         """Datarray without the desired variable (2t)"""
         with self.assertRaises(ValueError) as err:
@@ -0,0 +1,226 @@
+"""Tests file_cache module."""
+
+import os
+import socket
+import unittest
+from tempfile import TemporaryDirectory
+
+import numpy as np
+
+from unimodel.utils.file_cache import (
+    ArrayCache,
+    FileCache,
+    StageCache,
+    link_or_copy,
+)
+
+
+class TestFileCache(unittest.TestCase):
+    """Tests on-disk cache with size budget"""
+
+    def test_store_and_load(self):
+        """Tests storing and loading a cached object"""
+        with TemporaryDirectory() as cache_dir:
+            cache = FileCache(cache_dir)
+            cache.store("key", {"a": [1, 2, 3]})
+
+            self.assertEqual(cache.load("key"), {"a": [1, 2, 3]})
+            self.assertIsNone(cache.load("missing"))
+            self.assertTrue(os.path.isfile(cache.path("key")))
+
+            # Entries have the default permissions, so caches can be shared
+            umask = os.umask(0)
+            os.umask(umask)
+            self.assertEqual(os.stat(cache.path("key")).st_mode & 0o777, 0o666 & ~umask)
+            self.assertEqual(os.listdir(cache_dir), ["key.json"])
+
+    def test_file_key(self):
+        """Tests cache keys change when the file is modified"""
+        with TemporaryDirectory() as cache_dir:
+            file_path = os.path.join(cache_dir, "file.grib")
+            with open(file_path, "wb") as f_grib:
+                f_grib.write(b"GRIB")
+
+            key = FileCache.file_key(file_path, ("shortName",))
+
+            self.assertEqual(key, FileCache.file_key(file_path, ("shortName",)))
+            self.assertNotEqual(key, FileCache.file_key(file_path, ("level",)))
+
+            with open(file_path, "ab") as f_grib:
+                f_grib.write(b"7777")
+
+            self.assertNotEqual(key, FileCache.file_key(file_path, ("shortName",)))
+
+    def test_evict(self):
+        """Tests least recently used entries are evicted"""
+        with TemporaryDirectory() as cache_dir:
+            cache = FileCache(cache_dir)
+            for i, key in enumerate(["first", "second", "third"]):
+                cache.store(key, "x" * 1000)
+                os.utime(cache.path(key), ns=(i, i))
+            # Mark 'first' entry as the most recently used
+            os.utime(cache.path("first"), ns=(3, 3))
+
+            cache.max_size = 2500
+            cache.evict()
+
+            self.assertIsNotNone(cache.load("first"))
+            self.assertIsNone(cache.load("second"))
+            self.assertIsNotNone(cache.load("third"))
+
+    def test_array_cache(self):
+        """Tests arrays are cached with metadata and memory-mapped"""
+        with TemporaryDirectory() as cache_dir:
+            cache = ArrayCache(cache_dir)
+            values = np.arange(12, dtype=np.float32).reshape(3, 4)
+            cache.store("key", (values, {"dims": ("y", "x")}))
+
+            cached_values, metadata = cache.load("key")
+
+            self.assertTrue(isinstance(cached_values, np.memmap))
+            np.testing.assert_array_equal(cached_values, values)
+            self.assertEqual(metadata, {"dims": ("y", "x")})
+
+            # Metadata is stored as JSON, restoring tuples and numpy types
+            metadata = {
+                "time": np.datetime64("2023-02-28T00:00", "ns"),
+                "x": np.linspace(0, 1, 5),
+                "encoding": {"dtype": np.dtype("float32"), "shape": (3, 4)},
+                "window": b"\x00\xff",
+            }
+            cache.store("meta", (values, metadata))
+            cached_metadata = cache.load("meta")[1]
+            self.assertEqual(cached_metadata["time"], metadata["time"])
+            np.testing.assert_array_equal(cached_metadata["x"], metadata["x"])
+            self.assertEqual(cached_metadata["encoding"], metadata["encoding"])
+            self.assertEqual(cached_metadata["window"], metadata["window"])
+            with self.assertRaises(TypeError):
+                cache.store("object", (values, {"a": np.array([None])}))
+            self.assertIsNone(cache.load("missing"))
+
+            # Changes to a loaded array are not written to the cache
+            cached_values[0, 0] = -1
+            self.assertEqual(cache.load("key")[0][0, 0], 0)
+
+            # Metadata is evicted with its array
+            cache.max_size = 0
+            cache.evict()
+
+            self.assertEqual(os.listdir(cache_dir), [])
+
+    def test_stage_cache(self):
+        """Tests unchanged staged files are reused"""
+        with TemporaryDirectory() as tmp_dir:
+            src_file = os.path.join(tmp_dir, "file.grib")
+            with open(src_file, "wb") as f_grib:
+                f_grib.write(bytes(1000))
+
+            stage = StageCache(os.path.join(tmp_dir, "stage"), 10000)
+            staged_file = stage.stage(src_file)
+            src_stat = os.stat(src_file)
+
+            self.assertEqual(staged_file, stage.path("file.grib"))
+            self.assertTrue(
+                stage.is_staged("file.grib", src_stat.st_size, src_stat.st_mtime_ns)
+            )
+
+            # A changed source is copied again
+            with open(src_file, "wb") as f_grib:
+                f_grib.write(bytes(2000))
+            os.utime(src_file, ns=(0, src_stat.st_mtime_ns + 1))
+            self.assertEqual(os.path.getsize(stage.stage(src_file)), 2000)
+
+    def test_link_or_copy(self):
+        """Tests files are linked or copied to the stage directory"""
+        with TemporaryDirectory() as tmp_dir:
+            src_file = os.path.join(tmp_dir, "file.grib")
+            with open(src_file, "wb") as f_grib:
+                f_grib.write(bytes(range(256)))
+
+            dst_file = os.path.join(tmp_dir, "hardlink.grib")
+            self.assertEqual(link_or_copy(src_file, dst_file, "hardlink"), "hardlink")
+            self.assertTrue(os.path.samefile(src_file, dst_file))
+
+            dst_file = os.path.join(tmp_dir, "symlink.grib")
+            self.assertEqual(link_or_copy(src_file, dst_file, "symlink"), "symlink")
+            self.assertTrue(os.path.islink(dst_file))
+
+            # Reflinks are copied on file systems without copy-on-write
+            dst_file = os.path.join(tmp_dir, "reflink.grib")
+            self.assertIn(
+                link_or_copy(src_file, dst_file, "reflink", 10**9),
+                ["reflink", "copy"],
+            )
+            self.assertFalse(os.path.samefile(src_file, dst_file))
+            self.assertEqual(os.stat(dst_file).st_mtime_ns, 10**9)
+            with open(dst_file, "rb") as f_grib:
+                self.assertEqual(f_grib.read(), bytes(range(256)))
+
+            self.assertEqual(sorted(os.listdir(tmp_dir))[0], "file.grib")
+            self.assertEqual(len(os.listdir(tmp_dir)), 4)
+
+            with self.assertRaises(ValueError):
+                link_or_copy(src_file, dst_file, "move")
+
+    def test_stage_cache_symlink(self):
+        """Tests marking staged symbolic links does not change their source"""
+        with TemporaryDirectory() as tmp_dir:
+            src_file = os.path.join(tmp_dir, "file.grib")
+            with open(src_file, "wb") as f_grib:
+                f_grib.write(bytes(1000))
+            os.utime(src_file, ns=(10**9, 10**9))
+
+            stage = StageCache(os.path.join(tmp_dir, "stage"), 10000)
+            staged_file = stage.stage(src_file, "symlink")
+
+            self.assertTrue(os.path.islink(staged_file))
+            self.assertEqual(os.stat(src_file).st_atime_ns, 10**9)
+            self.assertEqual(os.stat(src_file).st_mtime_ns, 10**9)
+
+            # Symbolic links count as the size of their source
+            stage.max_size = 1000
+            stage.evict()
+            self.assertTrue(os.path.islink(staged_file))
+
+            stage.max_size = 999
+            stage.evict()
+
+            self.assertFalse(os.path.lexists(staged_file))
+            self.assertTrue(os.path.exists(src_file))
+
+    def test_stage_cache_evict(self):
+        """Tests least recently used files not referenced are evicted"""
+        with TemporaryDirectory() as tmp_dir:
+            stage = StageCache(os.path.join(tmp_dir, "stage"), 2500)
+            for i, name in enumerate(["first", "second", "third", "fourth"]):
+                src_file = os.path.join(tmp_dir, name)
+                with open(src_file, "wb") as f_grib:
+                    f_grib.write(bytes(1000))
+                staged_file = stage.stage(src_file)
+                os.utime(staged_file, ns=(i, i))
+
+            # References of processes that are no longer running are ignored
+            stage.acquire(stage.path("first"))
+            refs_dir = os.path.join(stage.cache_dir, ".refs")
+            open(
+                os.path.join(refs_dir, f"second@{socket.gethostname()}@999999999"),
+                "wb",
+            ).close()
+            # Other files are ignored
+            stray_names = ["stray", f"third@{socket.gethostname()}@1.tmp"]
+            for stray_name in stray_names:
+                open(os.path.join(refs_dir, stray_name), "wb").close()
+
+            stage.evict()
+
+            self.assertEqual(
+                sorted(os.listdir(stage.cache_dir)), [".refs", "first", "fourth"]
+            )
+            self.assertEqual(len(os.listdir(refs_dir)), 1 + len(stray_names))
+
+            stage.release(stage.path("first"))
+            stage.max_size = 0
+            stage.evict()
+
+            self.assertEqual(os.listdir(stage.cache_dir), [".refs"])
+            self.assertEqual(sorted(os.listdir(refs_dir)), stray_names)
@@ -5,7 +5,13 @@ import unittest
 import pyproj
 import xarray
 
-from unimodel.utils.geotools import proj4_from_grib, reproject_xarray
+from unimodel.utils.geotools import (
+    grid_crs,
+    grid_crs_cache_info,
+    proj4_from_grib,
+    reproject_xarray,
+    subset_bbox,
+)
 
 
 class TestGeoTools(unittest.TestCase):
@@ -29,6 +35,35 @@ class TestGeoTools(unittest.TestCase):
             "WGS 84",
         )
 
+    def test_subset_bbox(self):
+        """Tests selecting the grid points inside a bounding box"""
+        x_coords = self.data.x.values[10:20]
+        y_coords = self.data.y.values[5:15]
+        bbox = (x_coords.min(), y_coords.min(), x_coords.max(), y_coords.max())
+        data_bbox = subset_bbox(self.data, bbox)
+
+        self.assertEqual(data_bbox.shape[-2:], (10, 10))
+        self.assertEqual(data_bbox.rio.crs, self.data.rio.crs)
+        self.assertAlmostEqual(
+            data_bbox.rio.transform().c, (self.data.rio.transform() * (10, 0))[0]
+        )
+        with self.assertRaises(ValueError):
+            subset_bbox(self.data, (1e7, 1e7, 1e7 + 1, 1e7 + 1))
+
+    def test_grid_crs(self):
+        """Tests the CRS is built once per grid"""
+        crs = grid_crs(self.data)
+        hits = grid_crs_cache_info().hits
+
+        self.assertIs(grid_crs(self.data.copy()), crs)
+        self.assertEqual(grid_crs_cache_info().hits, hits + 1)
+        self.assertEqual(crs, pyproj.crs.CRS.from_dict(proj4_from_grib(self.data)))
+
+        # The missing value encoding does not change the grid
+        data = self.data.copy()
+        data.attrs["GRIB_missingValue"] = -1
+        self.assertIs(grid_crs(data), crs)
+
     def test_reproject_xarray(self):
         """Tests reproject an xarray"""
         dest_proj = "EPSG:4326"
@@ -0,0 +1,83 @@
+"""Tests gzip_index module."""
+
+import gzip
+import io
+import os
+import unittest
+from tempfile import TemporaryDirectory
+
+import numpy as np
+
+from unimodel.utils.gzip_index import IndexedGzipFile, build_index, load_index
+
+
+class TestGzipIndex(unittest.TestCase):
+    """Tests random access to gzip files"""
+
+    def setUp(self) -> None:
+        # Incompressible and compressible blocks, so deflate blocks end at
+        # any bit of a byte
+        rng = np.random.default_rng(0)
+        self.data = b"".join(
+            rng.bytes(100000) if i % 3 == 0 else (b"grib %d " % i) * 20000
+            for i in range(30)
+        )
+
+        return super().setUp()
+
+    def _read_random(self, f_gz):
+        rng = np.random.default_rng(1)
+        for offset, size in zip(
+            rng.integers(0, len(self.data), 100), rng.integers(0, 300000, 100)
+        ):
+            f_gz.seek(offset)
+            self.assertEqual(f_gz.read(size), self.data[offset : offset + size])
+
+    def test_read(self):
+        """Tests reading at random offsets"""
+        with TemporaryDirectory() as tmp_dir:
+            gz_file = os.path.join(tmp_dir, "data.gz")
+            with open(gz_file, "wb") as f_gz:
+                f_gz.write(gzip.compress(self.data))
+
+            index = build_index(gz_file, span=128 * 1024)
+            self.assertEqual(index["size"], len(self.data))
+            self.assertGreater(len(index["points"]), 10)
+
+            with IndexedGzipFile(gz_file, span=128 * 1024) as f_gz:
+                self._read_random(f_gz)
+                self.assertEqual(f_gz.seek(-10, io.SEEK_END), len(self.data) - 10)
+                self.assertEqual(f_gz.read(), self.data[-10:])
+
+    def test_read_members(self):
+        """Tests reading a gzip file with several members"""
+        with TemporaryDirectory() as tmp_dir:
+            gz_file = os.path.join(tmp_dir, "data.gz")
+            with open(gz_file, "wb") as f_gz:
+                for i in range(0, len(self.data), 700000):
+                    f_gz.write(gzip.compress(self.data[i : i + 700000]))
+
+            with IndexedGzipFile(gz_file, span=128 * 1024) as f_gz:
+                self._read_random(f_gz)
+                f_gz.seek(0)
+                self.assertEqual(f_gz.read(), self.data)
+
+    def test_index_file(self):
+        """Tests the index is written once and rebuilt if the file changes"""
+        with TemporaryDirectory() as tmp_dir:
+            gz_file = os.path.join(tmp_dir, "data.gz")
+            index_file = gz_file + ".gzidx"
+            with open(gz_file, "wb") as f_gz:
+                f_gz.write(gzip.compress(self.data))
+
+            index = load_index(gz_file, index_file, span=128 * 1024)
+            self.assertTrue(os.path.isfile(index_file))
+            self.assertEqual(load_index(gz_file, index_file)["span"], 128 * 1024)
+
+            with open(gz_file, "wb") as f_gz:
+                f_gz.write(gzip.compress(self.data[:1000]))
+            index = load_index(gz_file, index_file)
+            self.assertEqual(index["size"], 1000)
+
+            with IndexedGzipFile(gz_file, index_file) as f_gz:
+                self.assertEqual(f_gz.read(), self.data[:1000])
@@ -1,12 +1,18 @@
 """Module to test NWP importer module."""
 
+import os
+import tarfile
 import unittest
 from datetime import datetime
 from glob import glob
 from os import makedirs, path
 from shutil import rmtree
+from tempfile import TemporaryDirectory
+from unittest import mock
 
-from unimodel.io.importers_nwp import import_nwp_grib
+from unimodel.io import importers_nwp
+from unimodel.io.importers_nwp import import_nwp_grib, release_nwp_grib
+from unimodel.utils.file_cache import StageCache
 
 
 class TestNWPImporter(unittest.TestCase):
@@ -47,6 +53,14 @@ class TestNWPImporter(unittest.TestCase):
             "compressed": True,
             "lead_time_digits": 2,
         },
+        "wrf_tl_ens_src": {
+            "src_tar": "tests/data/nwp_src/wrf_tl_ens/"
+            "NWCST_TL_ENS-membres.{year}{month}{day}{run}.tar.gz",
+            "src": "tl_ens-03-{member}.{year}{month}{day}{run}_{lt}.grib",
+            "compressed": True,
+            "lead_time_digits": 2,
+            "stage_tar": False,
+        },
         "no_lt_digits": {
             "src": "tests/data/nwp_src/wrf43_prs/"
             "WRFPRS-03.{year}{month}{day}{run}_{lt}"
@@ -196,6 +210,110 @@ class TestNWPImporter(unittest.TestCase):
         )
         self.assertEqual(len(nwp_file), 12)
 
+    def test_io_import_nwp_grib_compressed_selective(self):
+        """Tests only the members matching the lead time are extracted"""
+        import_nwp_grib(datetime(2023, 10, 19, 0), 1, "wrf_tl_ens", self.config)
+
+        stage_dir = "tests/data/nwp_dir/wrf_tl_ens/"
+        self.assertEqual(len(glob(stage_dir + "*_01.grib")), 12)
+        self.assertEqual(len(glob(stage_dir + "*_04.grib")), 0)
+        self.assertTrue(
+            path.isfile(
+                stage_dir + "NWCST_TL_ENS-membres.2023101900.tar.gz.members.json"
+            )
+        )
+
+    def test_io_import_nwp_grib_compressed_not_staged(self):
+        """Tests import of compressed grib files without copying the tar"""
+        nwp_file = import_nwp_grib(
+            datetime(2023, 10, 19, 0), 1, "wrf_tl_ens_src", self.config
+        )
+
+        self.assertEqual(
+            sorted(nwp_file)[0],
+            "tests/data/nwp_dir/wrf_tl_ens_src/tl_ens-03-001.2023101900_01.grib",
+        )
+        self.assertEqual(len(nwp_file), 12)
+        self.assertEqual(glob("tests/data/nwp_dir/wrf_tl_ens_src/*.tar.gz"), [])
+
+        nwp_file = import_nwp_grib(
+            datetime(2023, 10, 19, 0), 4, "wrf_tl_ens_src", self.config
+        )
+        self.assertEqual(len(nwp_file), 12)
+
+    def test_io_import_nwp_grib_stage_cache(self):
+        """Tests import to a stage directory with a size budget"""
+        config = dict(self.config, stage_max_size=10 * 1024**3)
+        stage_dir = "tests/data/nwp_dir/ecmwf_hres/"
+
+        nwp_file_0 = import_nwp_grib(datetime(2023, 2, 20, 0), 0, "ecmwf_hres", config)
+        nwp_file_6 = import_nwp_grib(datetime(2023, 2, 20, 0), 6, "ecmwf_hres", config)
+        mtime_0 = path.getmtime(nwp_file_0)
+
+        # Previous lead times are kept and reused
+        self.assertTrue(path.isfile(nwp_file_0))
+        self.assertEqual(
+            import_nwp_grib(datetime(2023, 2, 20, 0), 0, "ecmwf_hres", config),
+            nwp_file_0,
+        )
+        self.assertEqual(path.getmtime(nwp_file_0), mtime_0)
+
+        # Released files are evicted when the budget is exceeded
+        release_nwp_grib([nwp_file_0, nwp_file_0, nwp_file_6])
+        config["stage_max_size"] = 0
+        import_nwp_grib(datetime(2023, 2, 20, 0), 0, "ecmwf_hres", config)
+
+        self.assertEqual(glob(stage_dir + "*"), [nwp_file_0])
+        release_nwp_grib(nwp_file_0)
+
+    def test_io_import_nwp_grib_stage_cache_concurrent_evict(self):
+        """Tests files being staged are not evicted by other processes"""
+        with TemporaryDirectory() as tmp_dir:
+            tar_file = path.join(tmp_dir, "run.tar.gz")
+            with tarfile.open(tar_file, "w:gz") as tar:
+                for name in ["member-1.grib", "member-2.grib"]:
+                    src_file = path.join(tmp_dir, name)
+                    with open(src_file, "wb") as f_grib:
+                        f_grib.write(bytes(1000))
+                    tar.add(src_file, name)
+
+            stage = StageCache(path.join(tmp_dir, "stage"), 10**6)
+            other_stage = StageCache(stage.cache_dir, 0)
+            extract_tar_members = importers_nwp._extract_tar_members
+
+            def evict_and_extract(*args):
+                other_stage.evict()
+                return extract_tar_members(*args)
+
+            with mock.patch.object(
+                importers_nwp, "_extract_tar_members", side_effect=evict_and_extract
+            ):
+                nwp_files = importers_nwp._import_to_stage_cache(
+                    stage, r"member-\d\.grib", tar_file
+                )
+
+            self.assertEqual(
+                sorted(os.listdir(stage.cache_dir)),
+                [
+                    ".refs",
+                    "member-1.grib",
+                    "member-2.grib",
+                    "run.tar.gz",
+                    "run.tar.gz.gzidx",
+                    "run.tar.gz.members.json",
+                ],
+            )
+
+            # Only the imported files stay referenced
+            other_stage.evict()
+            self.assertEqual(
+                sorted(os.listdir(stage.cache_dir)),
+                [".refs", "member-1.grib", "member-2.grib"],
+            )
+            release_nwp_grib(nwp_files)
+            other_stage.evict()
+            self.assertEqual(os.listdir(stage.cache_dir), [".refs"])
+
     def test_io_import_nwp_grib_model_not_lt_digits(self):
         """Tests import of a comprsessed model without src_tar"""
         with self.assertRaises(KeyError) as err:
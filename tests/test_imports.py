@@ -0,0 +1,63 @@
+"""Tests heavy dependencies of unimodel modules are imported lazily."""
+
+import subprocess
+import sys
+import unittest
+
+import unimodel.io
+
+# Dependencies loaded only when readers, reprojections or corrections are used
+_HEAVY_MODULES = [
+    "cfgrib",
+    "dask",
+    "eccodes",
+    "numba",
+    "pandas",
+    "pyproj",
+    "rasterio",
+    "rioxarray",
+    "sklearn",
+    "xarray",
+]
+
+
+class TestImports(unittest.TestCase):
+    """Tests heavy dependencies are imported on first use"""
+
+    def _import(self, statements: str) -> list:
+        """Runs import statements in a new interpreter and returns the heavy
+        modules they loaded."""
+        code = (
+            "import sys\n"
+            f"{statements}\n"
+            f"print(' '.join(m for m in {_HEAVY_MODULES} if m in sys.modules))\n"
+        )
+        output = subprocess.run(
+            [sys.executable, "-c", code], capture_output=True, check=True, text=True
+        ).stdout
+
+        return output.split()
+
+    def test_light_imports(self):
+        """Tests entry points do not import heavy dependencies"""
+        heavy_modules = self._import(
+            "import unimodel.io\n"
+            "from unimodel.io import get_reader, read_async\n"
+            "from unimodel.io.importers_nwp import import_nwp_grib\n"
+            "from unimodel.downscaling.ecorrection import Ecorrection\n"
+            "from unimodel.utils.load_config import load_config"
+        )
+
+        self.assertEqual(heavy_modules, [])
+
+    def test_lazy_reader(self):
+        """Tests readers are imported on first use"""
+        heavy_modules = self._import(
+            "import unimodel.io\nunimodel.io.get_reader('icon')"
+        )
+
+        self.assertIn("cfgrib", heavy_modules)
+        self.assertIn("xarray", heavy_modules)
+
+        with self.assertRaises(AttributeError):
+            getattr(unimodel.io, "no_method")
@@ -0,0 +1,100 @@
+"""Tests instrumentation of readers and importers."""
+
+import json
+import logging
+import os
+import unittest
+from tempfile import TemporaryDirectory
+
+from unimodel.utils.instrumentation import (
+    add_bytes_read,
+    instrumented,
+    lap,
+    record_array,
+    set_sink,
+    timed,
+)
+
+
+@instrumented("file_path")
+def _instrumented_read(file_path, fail=False):
+    with timed("scan"):
+        add_bytes_read(10)
+    lap("open")
+    record_array(100)
+    add_bytes_read(5)
+    if fail:
+        raise ValueError("Read failed")
+    lap("coords")
+
+    return file_path
+
+
+class TestInstrumentation(unittest.TestCase):
+    """Tests instrumentation events"""
+
+    def tearDown(self) -> None:
+        set_sink(None)
+
+        return super().tearDown()
+
+    def test_callback_sink(self):
+        """Tests events of instrumented calls"""
+        events = []
+        set_sink(events.append)
+
+        self.assertEqual(_instrumented_read("file.grib"), "file.grib")
+        with self.assertRaises(ValueError):
+            _instrumented_read("file.grib", fail=True)
+
+        self.assertEqual(len(events), 2)
+        self.assertEqual(events[0]["call"], "_instrumented_read")
+        self.assertEqual(events[0]["file_path"], "file.grib")
+        self.assertEqual(list(events[0]["stages"].keys()), ["scan", "open", "coords"])
+        self.assertGreaterEqual(
+            events[0]["stages"]["open"], events[0]["stages"]["scan"]
+        )
+        self.assertGreaterEqual(events[0]["seconds"], events[0]["stages"]["open"])
+        self.assertEqual(events[0]["bytes_read"], 15)
+        self.assertEqual(events[0]["peak_array_bytes"], 100)
+        self.assertNotIn("error", events[0])
+        self.assertEqual(events[1]["error"], "ValueError")
+
+        # Stages outside instrumented calls emit their own event
+        with timed("decode", grib_file="file.grib"):
+            add_bytes_read(20)
+        self.assertEqual(events[2]["call"], "decode")
+        self.assertEqual(events[2]["grib_file"], "file.grib")
+        self.assertEqual(events[2]["bytes_read"], 20)
+        self.assertEqual(list(events[2]["stages"].keys()), ["decode"])
+
+        set_sink(None)
+        _instrumented_read("file.grib")
+        self.assertEqual(len(events), 3)
+
+    def test_json_lines_sink(self):
+        """Tests events appended to a JSON lines file"""
+        with TemporaryDirectory() as tmp_dir:
+            events_file = os.path.join(tmp_dir, "events.jsonl")
+            set_sink(events_file)
+            _instrumented_read("file_1.grib")
+            _instrumented_read("file_2.grib")
+
+            with open(events_file, "r", encoding="utf-8") as f_events:
+                events = [json.loads(line) for line in f_events]
+
+        self.assertEqual(
+            [event["file_path"] for event in events], ["file_1.grib", "file_2.grib"]
+        )
+
+    def test_logger_sink(self):
+        """Tests events logged as JSON"""
+        logger = logging.getLogger("unimodel.tests")
+        set_sink(logger)
+        with self.assertLogs(logger, level="INFO") as logs:
+            _instrumented_read("file.grib")
+
+        self.assertEqual(json.loads(logs.records[0].getMessage())["bytes_read"], 15)
+
+        with self.assertRaises(TypeError):
+            set_sink(1)
@@ -1,6 +1,12 @@
 """Tests interface for I/O methods."""
 
+import os
 import unittest
+from tempfile import TemporaryDirectory
+
+import eccodes
+import numpy as np
+import xarray
 
 import unimodel.io
 from unimodel.io.readers_nwp import (
@@ -41,6 +47,10 @@ class TestIOInterface(unittest.TestCase):
             reader_method = unimodel.io.get_reader(reader_pair[0])
             self.assertEqual(reader_method, reader_pair[1])
 
+        reader_method = unimodel.io.get_reader("icon", chunks={"step": 1})
+        self.assertEqual(reader_method.func, read_icon_grib)
+        self.assertEqual(reader_method.keywords, {"chunks": {"step": 1}})
+
         with self.assertRaises(ValueError) as err:
             unimodel.io.get_reader("noaa")
 
@@ -53,3 +63,121 @@ class TestIOInterface(unittest.TestCase):
             "'wrf_gfs_9', 'ecmwf', 'ecmwf_hres', 'ecmwf_ens', "
             "'unified_model', 'wrf_tl_ens', 'gfs', 'gefs', 'swan', 'ww3']",
         )
+
+    def test_read_variables(self):
+        """Test reading several variables with a single scan"""
+        file = "tests/data/nwp_src/icon/icon-07.2023020700_10.grib2"
+        grib_data = unimodel.io.read_variables(file, ["tp"], "icon")
+
+        self.assertEqual(list(grib_data.keys()), ["tp"])
+        xarray.testing.assert_equal(grib_data["tp"], read_icon_grib(file, "tp", "icon"))
+
+        grib_dataset = unimodel.io.read_variables(file, ["tp"], "icon", as_dataset=True)
+
+        self.assertTrue(isinstance(grib_dataset, xarray.Dataset))
+        self.assertEqual(grib_dataset["tp"].rio.crs.data["proj"], "longlat")
+
+    def test_read_many(self):
+        """Test concurrent reading of several grib files"""
+        files = [
+            "tests/data/nwp_src/wrf_gfs_3/WRFPRS_d01.012",
+            "tests/data/nwp_src/wrf_gfs_3/WRFPRS_d01.120",
+        ]
+        for executor in ["thread", "process"]:
+            grib_data = unimodel.io.read_many(
+                files, "tp", "wrf_gfs_3", max_workers=2, executor=executor
+            )
+
+            self.assertEqual(grib_data.dims[0], "valid_time")
+            self.assertEqual(grib_data.shape[0], 2)
+            self.assertEqual(grib_data.rio.crs.data["proj"], "lcc")
+
+            for i, file in enumerate(files):
+                grib_file = read_wrf_prs(file, "tp", "wrf_gfs_3")
+                xarray.testing.assert_equal(grib_data.isel(valid_time=i), grib_file)
+
+        with self.assertRaises(ValueError) as err:
+            unimodel.io.read_many(files, "tp", "wrf_gfs_3", executor="mpi")
+
+        self.assertEqual(
+            err.exception.args[0],
+            "Unknown executor mpi\n The available executors are: "
+            "['process', 'thread']",
+        )
+
+    def test_read_many_checks(self):
+        """Tests the model name and the files read by read_many are checked"""
+        with TemporaryDirectory() as tmp_dir:
+            files = []
+            for number in [1, 2]:
+                files.append(
+                    os.path.join(tmp_dir, f"tl_ens-03-00{number}.2023101900_01.grib")
+                )
+                _write_grib(files[-1], [1], number)
+            steps_file = os.path.join(tmp_dir, "steps.grib")
+            _write_grib(steps_file, [1, 2])
+
+            # Model names are not case sensitive
+            grib_data = unimodel.io.read_many(
+                files, "2t", "WRF_TL_ENS", executor="thread"
+            )
+            self.assertEqual(grib_data.dims[0], "realization")
+            self.assertEqual(grib_data.realization.values.tolist(), [1, 2])
+
+            with self.assertRaises(ValueError):
+                unimodel.io.read_many([], "2t", "wrf_tl_ens")
+            with self.assertRaises(ValueError):
+                unimodel.io.read_many(
+                    [steps_file, steps_file], "2t", "gfs", executor="thread"
+                )
+
+    def test_read_messages(self):
+        """Tests reading only the messages of a variable"""
+        file = "tests/data/nwp_src/ecmwf_ens/A4E07050000070501001-99"
+        extra_filters = {"dataType": "pf", "number": [1, 2]}
+        data_ref = read_ecmwf_grib(file, "tp", "ecmwf_ens", {"dataType": "pf"})
+        data_var = unimodel.io.read_messages(file, "tp", "ecmwf_ens", extra_filters)
+
+        xarray.testing.assert_equal(data_var, data_ref.sel(number=[1, 2]))
+
+        with self.assertRaises(ValueError):
+            unimodel.io.read_messages(file, "no_var", "ecmwf_ens")
+
+    def test_iter_read(self):
+        """Tests reading the messages of a variable one at a time"""
+        file = "tests/data/nwp_src/ecmwf_ens/A4E07050000070501001-99"
+        data_ref = read_ecmwf_grib(file, "tp", "ecmwf_ens", {"dataType": "pf"})
+        data_iter = unimodel.io.iter_read(file, "tp", "ecmwf_ens", {"dataType": "pf"})
+
+        for data_ref_number, data_var in zip(data_ref, data_iter, strict=True):
+            self.assertEqual(data_var.rio.crs, data_ref.rio.crs)
+            xarray.testing.assert_equal(data_var, data_ref_number)
+
+        with self.assertRaises(ValueError):
+            next(unimodel.io.iter_read(file, "no_var", "ecmwf_ens"))
+
+
+def _write_grib(grib_file: str, steps: list, number: int = None) -> None:
+    """Writes a small grib file of 2 m temperature with one message per
+    step, of an ensemble member if 'number' is set."""
+    with open(grib_file, "wb") as f_grib:
+        for step in steps:
+            codes_id = eccodes.codes_grib_new_from_samples("GRIB2")
+            eccodes.codes_set(codes_id, "Ni", 4)
+            eccodes.codes_set(codes_id, "Nj", 3)
+            eccodes.codes_set(codes_id, "latitudeOfFirstGridPointInDegrees", 42.0)
+            eccodes.codes_set(codes_id, "longitudeOfFirstGridPointInDegrees", 1.0)
+            eccodes.codes_set(codes_id, "latitudeOfLastGridPointInDegrees", 40.0)
+            eccodes.codes_set(codes_id, "longitudeOfLastGridPointInDegrees", 4.0)
+            eccodes.codes_set(codes_id, "iDirectionIncrementInDegrees", 1.0)
+            eccodes.codes_set(codes_id, "jDirectionIncrementInDegrees", 1.0)
+            if number is not None:
+                eccodes.codes_set(codes_id, "productDefinitionTemplateNumber", 1)
+                eccodes.codes_set(codes_id, "perturbationNumber", number)
+            eccodes.codes_set(codes_id, "typeOfLevel", "heightAboveGround")
+            eccodes.codes_set(codes_id, "level", 2)
+            eccodes.codes_set(codes_id, "shortName", "2t")
+            eccodes.codes_set(codes_id, "step", step)
+            eccodes.codes_set_values(codes_id, np.arange(12.0) + step)
+            eccodes.codes_write(codes_id, f_grib)
+            eccodes.codes_release(codes_id)
@@ -0,0 +1,49 @@
+"""Tests numba kernels."""
+
+import unittest
+
+import numpy as np
+
+from unimodel.utils.numba_tools import _linalg_lstsq, linalg_lstsq, warmup
+
+
+class TestNumbaTools(unittest.TestCase):
+    """Tests numba kernels"""
+
+    def test_linalg_lstsq(self):
+        """Tests the regression of a set of points for each data type"""
+        rng = np.random.default_rng(0)
+        for dtype in ("float32", "float64"):
+            XX = rng.random((10, 64)).astype(dtype)
+            offset, scale = linalg_lstsq(XX, 2 * XX + 1)
+
+            self.assertEqual(offset.dtype, dtype)
+            np.testing.assert_allclose(offset, 1, atol=1e-3)
+            np.testing.assert_allclose(scale, 2, atol=1e-3)
+
+    def test_linalg_lstsq_cast(self):
+        """Tests integer and mixed data type inputs are cast"""
+        XX = np.tile(np.arange(64), (10, 1))
+        offset, scale = linalg_lstsq(XX, 3 * XX + 1)
+
+        self.assertEqual(offset.dtype, "float64")
+        np.testing.assert_allclose(scale, 3)
+
+        offset, scale = linalg_lstsq(XX.astype("float32"), 3.0 * XX + 1)
+
+        self.assertEqual(offset.dtype, "float64")
+        np.testing.assert_allclose(offset, 1, atol=1e-6)
+
+    def test_warmup(self):
+        """Tests kernels are compiled for all their signatures"""
+        kernels = warmup()
+
+        self.assertEqual(list(kernels.keys()), ["linalg_lstsq"])
+        self.assertGreaterEqual(len(kernels["linalg_lstsq"]), 2)
+
+        # Calls use the compiled signatures, so nothing else is compiled
+        n_signatures = len(_linalg_lstsq.nopython_signatures)
+        for dtype in ("float32", "float64", "int64"):
+            XX = np.ones((2, 4), dtype=dtype)
+            linalg_lstsq(XX, XX)
+        self.assertEqual(len(_linalg_lstsq.nopython_signatures), n_signatures)
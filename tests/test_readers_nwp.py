@@ -1,11 +1,19 @@
 """Tests transformation of NWP grib to xarray."""
 
 import os
+import shutil
 import unittest
+from concurrent.futures import ThreadPoolExecutor
+from tempfile import TemporaryDirectory
+from unittest import mock
 
+import dask.array
 import numpy as np
+import xarray
 
 from unimodel.io.readers_nwp import (
+    find_messages,
+    inventory,
     read_arome_grib,
     read_arpege_grib,
     read_bolam_grib,
@@ -13,12 +21,17 @@ from unimodel.io.readers_nwp import (
     read_icon_grib,
     read_moloch_grib,
     read_ncep_grib,
+    read_ncep_idx,
     read_swan_grib,
     read_unified_model_grib,
+    read_values_into,
     read_wrf_prs,
     read_wrf_tl_ens_grib,
     read_ww3_grib,
+    set_field_cache,
+    set_index_cache,
 )
+from unimodel.utils.instrumentation import set_sink
 
 
 class TestReadersNWP(unittest.TestCase):
@@ -427,3 +440,243 @@ class TestReadersNWP(unittest.TestCase):
         self.assertAlmostEqual(data_var.rio.transform().f, 38.415)
 
         self.assertFalse(os.path.isfile(file_idx))
+
+    def test_index_cache(self):
+        """Tests grib message indexes are cached and reused"""
+        file = "tests/data/nwp_src/ecmwf_hres/A1S02200000022006001-99"
+        data_ref = read_ecmwf_grib(file, "tp", "ecmwf_hres")
+
+        with TemporaryDirectory() as cache_dir:
+            set_index_cache(cache_dir)
+            try:
+                data_var = read_ecmwf_grib(file, "tp", "ecmwf_hres")
+                self.assertEqual(len(os.listdir(cache_dir)), 1)
+
+                # Second read loads the index from cache
+                data_var = read_ecmwf_grib(file, "tp", "ecmwf_hres")
+                self.assertEqual(len(os.listdir(cache_dir)), 1)
+            finally:
+                set_index_cache(None)
+
+        np.testing.assert_array_equal(data_var.values, data_ref.values)
+        self.assertFalse(os.path.isfile(file + ".02ccc.idx"))
+
+    def test_field_cache(self):
+        """Tests decoded fields are cached and memory-mapped"""
+        file = "tests/data/nwp_src/icon/icon-07.2023020700_10.grib2"
+        data_ref = read_icon_grib(file, "2t", "icon")
+
+        with TemporaryDirectory() as cache_dir:
+            set_field_cache(cache_dir)
+            try:
+                read_icon_grib(file, "2t", "icon")
+                self.assertEqual(len(os.listdir(cache_dir)), 2)
+
+                # Second read maps the cached field
+                data_var = read_icon_grib(file, "2t", "icon")
+                self.assertEqual(len(os.listdir(cache_dir)), 2)
+                self.assertTrue(isinstance(data_var.variable._data, np.memmap))
+                xarray.testing.assert_identical(data_var, data_ref)
+                self.assertEqual(data_var.rio.crs, data_ref.rio.crs)
+
+                # Other reader arguments are cached apart
+                read_icon_grib(file, "2t", "icon", dtype="float64")
+                self.assertEqual(len(os.listdir(cache_dir)), 4)
+            finally:
+                set_field_cache(None)
+
+    def test_inventory(self):
+        """Tests listing the messages of a grib file"""
+        file = "tests/data/nwp_src/ecmwf_ens/A4E07050000070501001-99"
+        grib_inventory = inventory(file)
+        data_var = read_ecmwf_grib(file, "tp", "ecmwf_ens", {"dataType": "pf"})
+
+        self.assertEqual(grib_inventory.offset.iloc[0], 0)
+        self.assertTrue(grib_inventory.offset.is_monotonic_increasing)
+        self.assertEqual(
+            grib_inventory.offset.iloc[-1] + grib_inventory.totalLength.iloc[-1],
+            os.path.getsize(file),
+        )
+
+        messages = grib_inventory[
+            (grib_inventory.shortName == "tp") & (grib_inventory.dataType == "pf")
+        ]
+        self.assertEqual(len(messages), data_var.number.size)
+        self.assertEqual(
+            messages.numberOfPoints.iloc[0], data_var.x.size * data_var.y.size
+        )
+
+    def test_read_ncep_idx(self):
+        """Tests reading only the messages listed in an NCEP inventory"""
+        file = "tests/data/nwp_src/gfs/gfs.2023022800_003.grib2"
+        data_ref = read_ncep_grib(file, "tp", "gfs")
+        grib_inventory = inventory(file)
+
+        with TemporaryDirectory() as tmp_dir:
+            file_tmp = shutil.copy(file, tmp_dir)
+            with open(file_tmp + ".idx", "w", encoding="utf-8") as f_idx:
+                for i, message in grib_inventory.iterrows():
+                    ncep_variable = "APCP" if message.shortName == "tp" else "XXX"
+                    f_idx.write(
+                        f"{i + 1}:{message.offset}:d=2023022800:{ncep_variable}:"
+                        "surface:0-3 hour acc fcst:\n"
+                    )
+
+            ncep_inventory = read_ncep_idx(file_tmp + ".idx")
+            data_var = read_ncep_grib(file_tmp, "tp", "gfs").load()
+
+        self.assertEqual(len(ncep_inventory), len(grib_inventory))
+        np.testing.assert_array_equal(
+            ncep_inventory.totalLength, grib_inventory.totalLength
+        )
+        xarray.testing.assert_equal(data_var, data_ref)
+
+    def test_read_chunks(self):
+        """Tests lazy reading of grib data"""
+        file = "tests/data/nwp_src/gefs/GEFS.2023022800.f003"
+        extra_filter = {"dataType": "pf"}
+        data_ref = read_ncep_grib(file, "tp", "gefs", extra_filter)
+        data_var = read_ncep_grib(
+            file, "tp", "gefs", extra_filter, chunks={"number": 1, "x": 7}
+        )
+
+        self.assertTrue(isinstance(data_var.data, dask.array.Array))
+        self.assertEqual(data_var.data.chunks[0][0], 1)
+        self.assertEqual(data_var.data.chunks[2], (7, 7))
+        self.assertEqual(data_var.rio.crs, data_ref.rio.crs)
+        self.assertEqual(data_var.rio.transform(), data_ref.rio.transform())
+
+        np.testing.assert_array_equal(data_var.values, data_ref.values)
+
+    def test_read_bbox(self):
+        """Tests reading a bounding box of grib data"""
+        file = "tests/data/nwp_src/gfs/gfs.2023022800_003.grib2"
+        data_ref = read_ncep_grib(file, "tp", "gfs")
+        x_ref = data_ref.x.values[2:5]
+        y_ref = data_ref.y.values[1:4]
+        bbox = (x_ref.min(), y_ref.min(), x_ref.max(), y_ref.max())
+        data_var = read_ncep_grib(file, "tp", "gfs", bbox=bbox, bbox_crs="EPSG:4326")
+
+        self.assertEqual(data_var.shape[-2:], (3, 3))
+        self.assertEqual(data_var.rio.crs, data_ref.rio.crs)
+        np.testing.assert_array_equal(data_var.x.values, x_ref)
+        np.testing.assert_array_equal(
+            data_var.values, data_ref.isel(x=slice(2, 5), y=slice(1, 4)).values
+        )
+
+    def test_read_dtype(self):
+        """Tests the data type of the read values"""
+        file = "tests/data/nwp_src/ecmwf_hres/A1S02200000022006001-99"
+        data_ref = read_ecmwf_grib(file, "tp", "ecmwf")
+        data_var = read_ecmwf_grib(file, "tp", "ecmwf", dtype="float64")
+
+        self.assertEqual(data_ref.dtype, np.float32)
+        self.assertEqual(data_var.dtype, np.float64)
+        np.testing.assert_allclose(data_var.values, data_ref.values, rtol=1e-6)
+
+    def test_read_levels(self):
+        """Tests reading several isobaric levels in one pass"""
+        file = "tests/data/nwp_src/wrf43_prs/WRFPRS-03.2023020600_032.grib"
+        levels = [500, 850]
+        data_var = read_wrf_prs(file, "t", "wrf", levels=levels)
+
+        self.assertEqual(data_var.dims, ("isobaricInhPa", "y", "x"))
+        np.testing.assert_array_equal(data_var.isobaricInhPa.values, levels)
+        for level in levels:
+            data_ref = read_wrf_prs(
+                file, "t", "wrf", {"typeOfLevel": "isobaricInhPa", "level": level}
+            )
+            np.testing.assert_array_equal(
+                data_var.sel(isobaricInhPa=level).values, data_ref.values
+            )
+
+        data_var = read_wrf_prs(file, "t", "wrf", levels=[850])
+        self.assertEqual(data_var.dims, ("isobaricInhPa", "y", "x"))
+
+        with self.assertRaises(ValueError):
+            read_wrf_prs(file, "t", "wrf", levels=[850, 1])
+
+    def test_read_values_into(self):
+        """Tests decoding messages into a preallocated array"""
+        file = "tests/data/nwp_src/ecmwf_ens/A4E07050000070501001-99"
+        data_ref = read_ecmwf_grib(file, "tp", "ecmwf_ens", {"dataType": "pf"})
+        grib_inventory = inventory(file)
+        offsets = find_messages(grib_inventory, "tp", {"dataType": "pf"})
+
+        block = np.empty(data_ref.shape, dtype="float32")
+        for offset in offsets:
+            number = grib_inventory.number[grib_inventory.offset == offset].item()
+            i = data_ref.number.values.tolist().index(number)
+            self.assertIs(read_values_into(file, offset, block[i]), block[i])
+        np.testing.assert_array_equal(block, data_ref.values)
+
+        # Values are copied if the ecCodes C functions are not available
+        with mock.patch.dict("unimodel.io.readers_nwp._GET_ARRAY_INTO", clear=True):
+            values = read_values_into(file, offsets[0], np.empty_like(block[0]))
+        np.testing.assert_array_equal(
+            values, read_values_into(file, offsets[0], block[0])
+        )
+
+        with self.assertRaises(ValueError):
+            read_values_into(file, offsets[0], block[0, :-1])
+        with self.assertRaises(ValueError):
+            read_values_into(file, offsets[0], block[0].astype("int32"))
+
+    def test_read_threads(self):
+        """Tests concurrent reads from several threads"""
+        reads = [
+            (
+                read_icon_grib,
+                "tests/data/nwp_src/icon/icon-07.2023020700_10.grib2",
+                "2t",
+                "icon",
+                None,
+            ),
+            (
+                read_ecmwf_grib,
+                "tests/data/nwp_src/ecmwf_hres/A1S02200000022006001-99",
+                "tp",
+                "ecmwf",
+                None,
+            ),
+            (
+                read_ecmwf_grib,
+                "tests/data/nwp_src/ecmwf_ens/A4E07050000070501001-99",
+                "tp",
+                "ecmwf_ens",
+                {"dataType": "pf"},
+            ),
+        ]
+        data_ref = [reader(*args).values for reader, *args in reads]
+
+        def read(i):
+            reader, *args = reads[i % len(reads)]
+            return i % len(reads), reader(*args).values
+
+        with TemporaryDirectory() as cache_dir:
+            for field_cache in (None, cache_dir):
+                set_field_cache(field_cache)
+                try:
+                    with ThreadPoolExecutor(max_workers=8) as pool:
+                        for i, values in pool.map(read, range(16 * len(reads))):
+                            np.testing.assert_array_equal(values, data_ref[i])
+                finally:
+                    set_field_cache(None)
+
+    def test_read_instrumentation(self):
+        """Tests the instrumentation events of a reader"""
+        file = "tests/data/nwp_src/ecmwf_hres/A1S02200000022006001-99"
+        events = []
+        set_sink(events.append)
+        try:
+            data_var = read_ecmwf_grib(file, "tp", "ecmwf")
+        finally:
+            set_sink(None)
+
+        self.assertEqual(len(events), 1)
+        self.assertEqual(events[0]["call"], "read_ecmwf_grib")
+        self.assertEqual(events[0]["grib_file"], file)
+        for stage in ("scan", "open", "decode", "crs", "coords"):
+            self.assertIn(stage, events[0]["stages"])
+        self.assertGreater(events[0]["bytes_read"], 0)
+        self.assertGreaterEqual(events[0]["peak_array_bytes"], data_var.nbytes)
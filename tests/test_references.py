@@ -0,0 +1,94 @@
+"""Tests reference sets of model runs."""
+
+import os
+import unittest
+from datetime import datetime
+from tempfile import TemporaryDirectory
+
+import dask.array
+import numpy as np
+import pandas as pd
+
+from unimodel.io.readers_nwp import read_ecmwf_grib
+from unimodel.io.references import build_run_references, open_run_references
+
+
+class TestReferences(unittest.TestCase):
+    """Tests reference sets of model runs"""
+
+    config = {
+        "ecmwf_ens": {
+            "src": "tests/data/nwp_src/ecmwf_ens/A4E{month}"
+            "{day}{run}00{valid_month}{valid_day}{valid_hour}1-99",
+            "compressed": False,
+        },
+        "ecmwf_tar": {
+            "src": "A4E{month}{day}{run}00{valid_month}{valid_day}{valid_hour}1-99",
+            "compressed": True,
+        },
+    }
+    file = "tests/data/nwp_src/ecmwf_ens/A4E07050000070501001-99"
+
+    def test_build_run_references(self):
+        """Tests building the references of a run"""
+        with TemporaryDirectory() as tmp_dir:
+            references_file = os.path.join(tmp_dir, "references.json")
+            references = build_run_references(
+                datetime(2023, 7, 5), "ecmwf_ens", self.config, [1], references_file
+            )
+
+            self.assertTrue(os.path.isfile(references_file))
+
+        self.assertEqual(
+            references.file.unique().tolist(), [os.path.abspath(self.file)]
+        )
+        self.assertEqual(references.offset.iloc[0], 0)
+
+        with self.assertRaises(KeyError):
+            build_run_references(datetime(2023, 7, 5), "no_model", self.config, [1])
+        with self.assertRaises(ValueError):
+            build_run_references(datetime(2023, 7, 5), "ecmwf_tar", self.config, [1])
+        with self.assertRaises(FileNotFoundError):
+            build_run_references(datetime(2023, 7, 5), "ecmwf_ens", self.config, [2])
+
+    def test_open_run_references(self):
+        """Tests opening a variable of a run from its references"""
+        data_ref = read_ecmwf_grib(self.file, "tp", "ecmwf_ens", {"dataType": "pf"})
+
+        with TemporaryDirectory() as tmp_dir:
+            references_file = os.path.join(tmp_dir, "references.json")
+            build_run_references(
+                datetime(2023, 7, 5), "ecmwf_ens", self.config, [1], references_file
+            )
+            data_var = open_run_references(
+                references_file, "tp", "ecmwf_ens", {"dataType": "pf"}
+            )
+
+        self.assertTrue(isinstance(data_var.data, dask.array.Array))
+        self.assertEqual(data_var.dims, data_ref.dims)
+        self.assertEqual(data_var.rio.crs, data_ref.rio.crs)
+        self.assertEqual(data_var.rio.transform(), data_ref.rio.transform())
+        np.testing.assert_array_equal(data_var.number.values, data_ref.number.values)
+        np.testing.assert_array_equal(data_var.values, data_ref.values)
+
+        with self.assertRaises(ValueError):
+            open_run_references(references_file, "no_var", "ecmwf_ens")
+
+    def test_open_run_references_single_message(self):
+        """Tests opening a variable of a single message from its references"""
+        extra_filters = {"dataType": "pf", "number": 1}
+        data_ref = read_ecmwf_grib(self.file, "tp", "ecmwf_ens", extra_filters)
+        references = build_run_references(
+            datetime(2023, 7, 5), "ecmwf_ens", self.config, [1]
+        )
+
+        data_var = open_run_references(references, "tp", "ecmwf_ens", extra_filters)
+
+        self.assertTrue(isinstance(data_var.data, dask.array.Array))
+        self.assertEqual(data_var.dims, data_ref.dims)
+        np.testing.assert_array_equal(data_var.values, data_ref.values)
+
+        # Repeated messages are not unique, even if no dimension changes
+        references = pd.concat([references] * 2, ignore_index=True)
+        with self.assertRaises(ValueError):
+            open_run_references(references, "tp", "ecmwf_ens", extra_filters)
@@ -0,0 +1,7 @@
+"""Runs the command line interface of unimodel (python -m unimodel)."""
+
+import sys
+
+from unimodel.cli import main
+
+sys.exit(main())
@@ -0,0 +1,38 @@
+"""Command line interface of unimodel."""
+
+import argparse
+import time
+
+
+def main(argv: list = None) -> int:
+    """Runs a unimodel command. The available commands are:
+
+        warmup: Compiles the numba kernels of unimodel and caches them on
+                disk, so workers do not compile them on first use.
+
+    Args:
+        argv (list, optional): Command line arguments. Defaults to None,
+                               the arguments of the process.
+
+    Returns:
+        int: Exit status.
+    """
+    parser = argparse.ArgumentParser(
+        prog="unimodel", description="Uniformization of model outputs."
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser(
+        "warmup", help="compile the numba kernels and cache them on disk"
+    )
+    args = parser.parse_args(argv)
+
+    if args.command == "warmup":
+        start = time.perf_counter()
+        from unimodel.utils.numba_tools import warmup
+
+        for name, signatures in warmup().items():
+            for signature in signatures:
+                print(f"{name} {signature}")
+        print(f"Kernels ready in {time.perf_counter() - start:.1f} s")
+
+    return 0
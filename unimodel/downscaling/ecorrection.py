@@ -1,15 +1,16 @@
 """Class that calculates the elevation correction of 2t"""
 
+from __future__ import annotations
+
 import os
+from typing import TYPE_CHECKING
 
 import numpy as np
-import rasterio
-import rasterio.fill
-import xarray as xr
-from sklearn.neighbors import NearestNeighbors
 
-from unimodel.utils.geotools import landsea_mask_from_shp, reproject_xarray
-from unimodel.utils.numba_tools import linalg_lstsq
+# rasterio, scikit-learn, numba and geotools are slow to import, so they are
+# imported by the methods that use them
+if TYPE_CHECKING:
+    import xarray as xr
 
 
 class Ecorrection:
@@ -31,8 +32,11 @@ class Ecorrection:
         if land_binary_mask.attrs["standard_name"] != "land_binary_mask":
             raise ValueError("'land_binary_mask' dataArray does not exist")
 
-        # Values greater than 0.5 are considered land
-        land_binary_mask.data = np.where(land_binary_mask.data > 0.5, 1, 0)
+        # Values greater than 0.5 are considered land. The mask keeps the
+        # data type of the variable, so it does not upcast the data it masks
+        land_binary_mask.data = (land_binary_mask.data > 0.5).astype(
+            land_binary_mask.dtype
+        )
         self.land_binary_mask = land_binary_mask
 
         self.neigh_info = self.__calculate_neighbours(land_binary_mask)
@@ -61,6 +65,8 @@ class Ecorrection:
         Returns:
             dict: with calculated neighbours information
         """
+        from sklearn.neighbors import NearestNeighbors
+
         neigh_candidates = np.where(land_binary_mask == 1)
         neigh_candidates = np.vstack((neigh_candidates[1], neigh_candidates[0])).T
         neigh_needed = np.where(land_binary_mask >= 0)
@@ -96,6 +102,8 @@ class Ecorrection:
             numpy.arrays: Two arrays with gradients and residues from linear
             regression calculations.
         """
+        from unimodel.utils.numba_tools import linalg_lstsq
+
         indices = self.neigh_info["indices"]
         neigh_candidates = self.neigh_info["neigh_candidates"]
 
@@ -105,6 +113,8 @@ class Ecorrection:
 
         var_sel = da_2t.values[idx_row, idx_col].reshape(-1, len(indices[0]))
         dem_sel = da_orog.values[idx_row, idx_col].reshape(-1, len(indices[0]))
+        # linalg_lstsq needs both arrays with the same data type
+        dem_sel = dem_sel.astype(var_sel.dtype, copy=False)
 
         # Apply the least-squares method
         _, gradients = linalg_lstsq(dem_sel, var_sel)
@@ -120,7 +130,11 @@ class Ecorrection:
         return xr_gradients
 
     def apply_correction(
-        self, da_2t: xr.DataArray, da_orog: xr.DataArray, lsm_shp: str = None
+        self,
+        da_2t: xr.DataArray,
+        da_orog: xr.DataArray,
+        lsm_shp: str = None,
+        dtype: str = None,
     ) -> xr.DataArray:
         """Apply the elevation correction of 2t field.
 
@@ -130,6 +144,10 @@ class Ecorrection:
             lsm_shp (str, optional): If not None reprojection to destination
                                         resolution is done accounting for
                                         landsea mask values. Defaults to None.
+            dtype (str, optional): Data type of all the computations and of
+                                   the corrected field (i.e. 'float32').
+                                   Defaults to None, data types are not
+                                   changed.
 
         Raises:
             ValueError: If '2t' DataArray does not exist
@@ -138,6 +156,11 @@ class Ecorrection:
         Returns:
             xr.DataArray: DataArray with field corrected
         """
+        import rasterio
+        import rasterio.fill
+
+        from unimodel.utils.geotools import landsea_mask_from_shp, reproject_xarray
+
         if da_2t.attrs["GRIB_shortName"] != "2t":
             raise ValueError("2t variable does not exist")
 
@@ -147,6 +170,10 @@ class Ecorrection:
                 " 'mterh', 'h' and 'HSURF'"
             )
 
+        if dtype is not None:
+            da_2t = da_2t.astype(dtype, copy=False)
+            da_orog = da_orog.astype(dtype, copy=False)
+
         gradients = self.calculate_lapse_rate(da_2t, da_orog)
 
         hres_dem = rasterio.open(self.dem_file)
@@ -161,6 +188,7 @@ class Ecorrection:
             shape=shape,
             ul_corner=ul_corner,
             resolution=resolution,
+            dtype=dtype,
         )
         hres_orog = reproject_xarray(
             xr_coarse=da_orog,
@@ -168,6 +196,7 @@ class Ecorrection:
             shape=shape,
             ul_corner=ul_corner,
             resolution=resolution,
+            dtype=dtype,
         )
         hres_gradients = reproject_xarray(
             xr_coarse=gradients,
@@ -175,6 +204,7 @@ class Ecorrection:
             shape=shape,
             ul_corner=ul_corner,
             resolution=resolution,
+            dtype=dtype,
         )
 
         if lsm_shp is not None:
@@ -183,7 +213,7 @@ class Ecorrection:
                 self.hres_lsm = landsea_mask_from_shp(hres_dem, lsm_shp)
 
             # Select only data over land
-            var_2t = da_2t * self.land_binary_mask
+            var_2t = da_2t * self.land_binary_mask.astype(da_2t.dtype, copy=False)
             # Data over sea redefine as NoData
             var_2t.attrs["_FillValue"] = 0
 
@@ -194,6 +224,7 @@ class Ecorrection:
                 shape=shape,
                 ul_corner=ul_corner,
                 resolution=resolution,
+                dtype=dtype,
             )
 
             # Fill NoData (sea) with the surrounding data (land),
@@ -209,9 +240,13 @@ class Ecorrection:
             )
 
         # Apply correction
-        corrected_field = hres_2t + hres_gradients * (hres_dem.read(1) - hres_orog)
+        hres_dem_values = hres_dem.read(1, out_dtype=dtype)
+        corrected_field = hres_2t + hres_gradients * (hres_dem_values - hres_orog)
 
         if hres_2t.units == "K":
             corrected_field = corrected_field - 273.15
 
+        if dtype is not None:
+            corrected_field = corrected_field.astype(dtype, copy=False)
+
         return corrected_field
@@ -1,2 +1,41 @@
-"""Implementation of reader methods."""
-from .interface import get_reader
+"""Implementation of reader methods.
+
+Methods are imported from their modules on first access, so importing the
+package does not load cfgrib, xarray and the other heavy dependencies of
+the readers.
+"""
+
+from importlib import import_module
+
+# Public methods of the package and the module where they are implemented
+_methods = {
+    "import_nwp_grib_async": "async_interface",
+    "read_async": "async_interface",
+    "set_async_workers": "async_interface",
+    "get_reader": "interface",
+    "iter_read": "interface",
+    "read_many": "interface",
+    "read_messages": "interface",
+    "read_variables": "interface",
+    "find_messages": "readers_nwp",
+    "inventory": "readers_nwp",
+    "read_values_into": "readers_nwp",
+    "build_run_references": "references",
+    "open_run_references": "references",
+}
+
+__all__ = list(_methods)
+
+
+def __getattr__(name):
+    if name not in _methods:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    method = getattr(import_module(f"{__name__}.{_methods[name]}"), name)
+    globals()[name] = method
+
+    return method
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
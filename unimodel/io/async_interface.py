@@ -0,0 +1,156 @@
+"""Asyncio interface for I/O grib readers and importers."""
+
+from __future__ import annotations
+
+import asyncio
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from functools import partial
+from typing import TYPE_CHECKING
+
+from unimodel.io.importers_nwp import import_nwp_grib
+from unimodel.io.interface import _read_and_load, get_reader
+
+if TYPE_CHECKING:
+    import xarray
+
+# Executor running blocking copies and decodes, created on first use or
+# through 'set_async_workers'
+_executor = None
+_max_workers = 4
+
+# Limit of concurrent calls of each event loop, so calls waiting for a
+# worker can be cancelled before they are submitted to the executor
+_semaphores = weakref.WeakKeyDictionary()
+
+
+def set_async_workers(max_workers: int = 4) -> None:
+    """Sets the maximum number of blocking calls run concurrently by the
+    asyncio interface. Calls beyond the limit wait in the event loop until
+    a worker is free. It must not be changed while calls are running.
+
+    Args:
+        max_workers (int, optional): Maximum number of concurrent calls.
+                                     Defaults to 4.
+
+    Raises:
+        ValueError: If 'max_workers' is lower than 1.
+    """
+    global _executor, _max_workers
+
+    if max_workers < 1:
+        raise ValueError("'max_workers' must be greater than 0.")
+
+    if _executor is not None:
+        _executor.shutdown(wait=False)
+
+    _executor = None
+    _max_workers = max_workers
+    _semaphores.clear()
+
+
+async def _run(func, *args):
+    """Runs a blocking function in the executor of the asyncio interface,
+    once a worker is free.
+
+    Args:
+        func (function): Blocking function.
+        *args: Arguments of 'func'.
+
+    Returns:
+        any: Value returned by 'func'.
+    """
+    global _executor
+
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=_max_workers, thread_name_prefix="unimodel"
+        )
+
+    loop = asyncio.get_running_loop()
+    semaphore = _semaphores.get(loop)
+    if semaphore is None:
+        semaphore = _semaphores[loop] = asyncio.Semaphore(_max_workers)
+
+    async with semaphore:
+        return await loop.run_in_executor(_executor, partial(func, *args))
+
+
+async def read_async(
+    grib_file: str,
+    variable: str,
+    model: str,
+    extra_filters: dict = None,
+    bbox: tuple = None,
+    bbox_crs: str = None,
+    dtype: str = None,
+) -> xarray.DataArray:
+    """Reads a grib file with the reader method of 'model' without blocking
+    the event loop. Values are decoded by a worker thread (see
+    `set_async_workers`). If the call is cancelled while waiting for a
+    worker, the file is not read.
+
+    Args:
+        grib_file (str): Path to a grib file.
+        variable (str): Variable to extract.
+        model (str): Name of the NWP model, as accepted by `get_reader`.
+        extra_filters (dict, optional): Other filters needed to read the
+                                        variable. Defaults to None.
+        bbox (tuple, optional): Bounding box (x_min, y_min, x_max, y_max)
+                                of the returned data. Defaults to None.
+        bbox_crs (str, optional): CRS of 'bbox'. Defaults to None, the model
+                                  CRS.
+        dtype (str, optional): Data type of the values. Defaults to None,
+                               the reader default.
+
+    Raises:
+        ValueError: If 'model' not in the available model list.
+
+    Returns:
+        xarray.DataArray: Variable data, loaded in memory.
+    """
+    reader_method = get_reader(model, bbox=bbox, bbox_crs=bbox_crs, dtype=dtype)
+
+    return await _run(
+        _read_and_load, reader_method, grib_file, variable, model, extra_filters
+    )
+
+
+async def import_nwp_grib_async(
+    date_run: datetime, lead_time: int, model: str, config: dict
+) -> str:
+    """Copies NWP grib files from a source directory to a stage directory
+    without blocking the event loop (see `import_nwp_grib`). Files are
+    copied by a worker thread (see `set_async_workers`). If the call is
+    cancelled while waiting for a worker, the file is not copied.
+
+    The stage directory must be a stage cache ('stage_max_size' set in the
+    configuration). Otherwise, each import removes the files of other
+    lead times, including those of concurrent calls.
+
+    Args:
+        date_run (datetime): Datetime of the model run.
+        lead_time (int): Lead time of the forecast to extract.
+        model (str): Name of the model
+        config (dict): Configuration dictionary.
+
+    Raises:
+        KeyError: If 'model' not in the configuration dictionary.
+        KeyError: If 'src_tar' not included when 'compressed' set to True.'
+        ValueError: If 'stage_max_size' is not set in the configuration.
+        ValueError: If 'stage_mode' is not 'copy', 'hardlink', 'reflink' or
+                    'symlink'.
+        FileNotFoundError: If source tar file not found.
+        FileNotFoundError: If source grib file not found.
+
+    Returns:
+        str: Path to the grib file.
+    """
+    if config.get("stage_max_size") is None:
+        raise ValueError(
+            "Concurrent imports need a stage cache, set 'stage_max_size' in "
+            "the configuration."
+        )
+
+    return await _run(import_nwp_grib, date_run, lead_time, model, config)
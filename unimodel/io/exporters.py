@@ -6,35 +6,44 @@ from unimodel.utils.decorators import xarray_attributes
 
 
 @xarray_attributes
-def concat_model(model: list, dim: str) -> xarray.DataArray:
+def concat_model(model: list, dim: str, dtype: str = None) -> xarray.DataArray:
     """Concatenates a list of model xarrays.
 
     Args:
         model (list): List of models xarrays.
         dim (str): Dimension over we want to concatenate
+        dtype (str, optional): Data type of the concatenated values. Defaults
+                               to None, the data type of the models.
 
     Returns:
         xarray.Datarray: Model concatenated.
     """
+    if dtype is not None:
+        model = [model_lt.astype(dtype, copy=False) for model_lt in model]
+
     model_concat = xarray.concat(model, dim)
 
     return model_concat
 
 
 @xarray_attributes
-def merge_models(models: list) -> xarray.DataArray:
+def merge_models(models: list, dtype: str = None) -> xarray.DataArray:
     """
     Merges a list of different model xarray.DataArray into a single
     xarray.DataArray with a new dimension named 'model'.
 
     Args:
         models (list): List of models xarray.DataArray.
+        dtype (str, optional): Data type of the merged values. Defaults to
+                               None, the data type of the models.
 
     Returns:
         xarray.Datarray: Merged data with new dimension 'model'.
     """
     model_list = []
     for model in models:
+        if dtype is not None:
+            model = model.astype(dtype, copy=False)
         # Add 'model' coordinate
         model_new_coord = model.assign_coords(model=model.attrs["model"])
         # New coordinate 'model' as dimension
@@ -67,7 +76,7 @@ def differences_by_lead_time(model_concat: list) -> xarray.DataArray:
     return diff_data
 
 
-def concat_and_merge(models: list) -> xarray.DataArray:
+def concat_and_merge(models: list, dtype: str = None) -> xarray.DataArray:
     """Concats and mergres a list of model lists to a single xarray.Datarray.
     If model variable is 'tp' `differences_by_lead_time` is applied."
 
@@ -77,18 +86,21 @@ def concat_and_merge(models: list) -> xarray.DataArray:
                        of the child list to different lead times
                        (i.e [[arome_lt0, arome_lt1, ...], [arpege_lt0,
                        arpege_lt1, ...]]).
+        dtype (str, optional): Data type of the concatenated and merged
+                               values. Defaults to None, the data type of
+                               the models.
     Returns:
         xarray: Concatenated and merged models.
     """
 
     data_xarray = []
     for model in models:
-        model_concat = concat_model(model, dim="valid_time")
+        model_concat = concat_model(model, dim="valid_time", dtype=dtype)
         if model_concat.name == "tp":
             data_xarray.append(differences_by_lead_time(model_concat))
         else:
             data_xarray.append(model_concat)
 
-    data_xarray = merge_models(data_xarray)
+    data_xarray = merge_models(data_xarray, dtype=dtype)
 
     return data_xarray
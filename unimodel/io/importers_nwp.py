@@ -1,15 +1,29 @@
 """Module to import NWP grib files."""
 
+import gzip
+import json
+import os
 import re
 import tarfile
 from datetime import datetime, timedelta
 from glob import glob
 from os import makedirs, remove
 from posixpath import basename
-from shutil import copyfile
 
 from genericpath import exists
 
+from unimodel.utils.file_cache import (
+    STAGE_MODES,
+    StageCache,
+    _temporary_path,
+    link_or_copy,
+)
+from unimodel.utils.gzip_index import IndexedGzipFile
+from unimodel.utils.instrumentation import instrumented, timed
+
+# Size of the blocks copied when extracting tar members
+_COPY_BLOCK_SIZE = 1024**2
+
 
 def _get_datetime_formatted(date: datetime) -> dict:
     year = date.strftime("%Y")
@@ -29,36 +43,24 @@ def _get_datetime_formatted(date: datetime) -> dict:
     }
 
 
-def import_nwp_grib(
+def _format_nwp_file(
     date_run: datetime, lead_time: int, model: str, config: dict
 ) -> str:
-    """Copies NWP grib files from a source directory to a stage directory.
+    """Formats the 'src' path template of a model for a run and lead time.
 
     Args:
         date_run (datetime): Datetime of the model run.
-        lead_time (int): Lead time of the forecast to extract.
+        lead_time (int): Lead time of the forecast.
         model (str): Name of the model
         config (dict): Configuration dictionary.
 
     Raises:
-        KeyError: If 'model' not in the configuration dictionary.
-        KeyError: If 'src_tar' not included when 'compressed' set to True.'
-        FileNotFoundError: If source tar file not found.
-        FileNotFoundError: If source grib file not found.
+        KeyError: If '{lt}' in 'src' and 'lead_time_digits' not included.
 
     Returns:
-        str: Path to the grib file.
+        str: Path to the grib file. Ensemble members are matched by the
+             pattern '[0-9]*'.
     """
-    if model not in config.keys():
-        raise KeyError(model + " not in configuration dictionary.")
-
-    model_dir = config["nwp_dir"] + model + "/"
-    if not exists(model_dir):
-        makedirs(model_dir)
-
-    prev_files_tar = glob(model_dir + "*.tar.gz")
-    prev_files = glob(model_dir + "*[!.tar.gz]")
-
     date_run_f = _get_datetime_formatted(date_run)
 
     # Valid datetime is required for ECMWF-HRES files
@@ -101,8 +103,325 @@ def import_nwp_grib(
         }
     )
 
+    return nwp_file
+
+
+def _open_tar_gz(tar_file: str, index_path: str):
+    """Opens the uncompressed data of a tar.gz file for random access. The
+    seek-point index of the archive (see `unimodel.utils.gzip_index`) is
+    built on first use and cached in a '.gzidx' file.
+
+    Args:
+        tar_file (str): Path to the tar.gz file.
+        index_path (str): Path of the index files without extension.
+
+    Returns:
+        file: Binary file object of the uncompressed archive. If the zlib
+              shared library is not available, a gzip.GzipFile that seeks
+              by decompressing from the start.
+    """
+    try:
+        return IndexedGzipFile(tar_file, index_path + ".gzidx")
+    except ImportError:
+        return gzip.open(tar_file, "rb")
+
+
+def _tar_members(tar_file: str, index_path: str) -> list:
+    """Gets the regular file members of a tar.gz file with the offset and
+    size of their data in the uncompressed archive. The member index is
+    cached in a '.members.json' file, so the archive is scanned only once.
+
+    Args:
+        tar_file (str): Path to the tar.gz file.
+        index_path (str): Path of the index files without extension.
+
+    Returns:
+        list: Members as dicts with keys 'name', 'offset', 'size' and
+              'mtime', in archive order.
+    """
+    index_file = index_path + ".members.json"
+    tar_stat = os.stat(tar_file)
+    tar_key = [tar_stat.st_size, tar_stat.st_mtime_ns]
+
+    try:
+        with open(index_file, "r", encoding="utf-8") as f_index:
+            index = json.load(f_index)
+        if index["tar"] == tar_key:
+            return index["members"]
+    except (OSError, ValueError, KeyError):
+        pass
+
+    with timed("scan"), _open_tar_gz(tar_file, index_path) as f_tar, tarfile.open(
+        fileobj=f_tar, mode="r:"
+    ) as _tar:
+        members = [
+            {
+                "name": member.path,
+                "offset": member.offset_data,
+                "size": member.size,
+                "mtime": int(member.mtime),
+            }
+            for member in _tar
+            if member.isfile()
+        ]
+
+    # The index is written atomically, so concurrent imports never read a
+    # partial one
+    tmp_path = _temporary_path(index_file)
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f_index:
+            json.dump({"tar": tar_key, "members": members}, f_index)
+        os.replace(tmp_path, index_file)
+    except BaseException:
+        if exists(tmp_path):
+            remove(tmp_path)
+        raise
+
+    return members
+
+
+def _extract_tar_members(
+    tar_file: str, index_path: str, members: list, dst_dir: str
+) -> list:
+    """Extracts some members of a tar.gz file, decompressing the archive
+    from the checkpoint of its index nearest to each of them. Files are
+    written atomically with the modification time of their member.
+
+    Args:
+        tar_file (str): Path to the tar.gz file.
+        index_path (str): Path of the index files without extension.
+        members (list): Members to extract, as returned by `_tar_members`.
+        dst_dir (str): Directory where members are extracted.
+
+    Returns:
+        list: Paths to the extracted files, in archive order.
+    """
+    dst_files = []
+    with _open_tar_gz(tar_file, index_path) as f_tar:
+        for member in sorted(members, key=lambda member: member["offset"]):
+            dst_file = dst_dir + member["name"]
+            f_tar.seek(member["offset"])
+            tmp_path = _temporary_path(dst_file)
+            try:
+                with open(tmp_path, "wb") as f_dst:
+                    remaining = member["size"]
+                    while remaining > 0:
+                        block = f_tar.read(min(remaining, _COPY_BLOCK_SIZE))
+                        if len(block) == 0:
+                            raise tarfile.ReadError("Unexpected end of " + tar_file)
+                        f_dst.write(block)
+                        remaining -= len(block)
+                os.utime(tmp_path, (member["mtime"], member["mtime"]))
+                os.replace(tmp_path, dst_file)
+            except BaseException:
+                if exists(tmp_path):
+                    remove(tmp_path)
+                raise
+            dst_files.append(dst_file)
+
+    return dst_files
+
+
+def _stage_file(stage: StageCache, src_file: str, stage_mode: str) -> str:
+    """Stages a file in a stage cache unless it is already staged and
+    unchanged. The file is referenced by this process before it is staged,
+    so it is never evicted by others in between.
+
+    Args:
+        stage (StageCache): Stage cache.
+        src_file (str): Path to the source file.
+        stage_mode (str): 'copy', 'hardlink', 'reflink' or 'symlink'.
+
+    Returns:
+        str: Path to the staged file, referenced until released.
+    """
+    staged_file = stage.path(basename(src_file))
+    stage.acquire(staged_file)
+    try:
+        src_stat = os.stat(src_file)
+        if stage.is_staged(basename(src_file), src_stat.st_size, src_stat.st_mtime_ns):
+            return stage.stage(src_file, stage_mode)
+
+        with timed("copy"):
+            return stage.stage(src_file, stage_mode)
+    except BaseException:
+        stage.release(staged_file)
+        raise
+
+
+def _import_to_stage_cache(
+    stage: StageCache,
+    nwp_file: str,
+    tar_file: str = None,
+    stage_tar: bool = True,
+    stage_mode: str = "copy",
+) -> list:
+    """Imports grib files to a stage cache, reusing the files that are
+    already staged and unchanged. Imported files are referenced by this
+    process until released (see `release_nwp_grib`).
+
+    Args:
+        stage (StageCache): Stage cache of the model.
+        nwp_file (str): Path to the grib file, or pattern of its name in
+                        the tar file.
+        tar_file (str, optional): Path to the source tar.gz file. Defaults
+                                  to None, 'nwp_file' is not compressed.
+        stage_tar (bool, optional): If False, members are extracted straight
+                                    from 'tar_file'. Defaults to True.
+        stage_mode (str, optional): How source files are staged, 'copy',
+                                    'hardlink', 'reflink' or 'symlink'.
+                                    Defaults to 'copy'.
+
+    Raises:
+        FileNotFoundError: If source tar file not found.
+        FileNotFoundError: If source grib file not found.
+
+    Returns:
+        list: Paths to the staged grib files.
+    """
+    if tar_file is None:
+        if not exists(nwp_file):
+            raise FileNotFoundError(nwp_file + " not found.")
+        nwp_files = [_stage_file(stage, nwp_file, stage_mode)]
+        # NCEP '.idx' inventories allow reading only the needed messages
+        if exists(nwp_file + ".idx"):
+            _stage_file(stage, nwp_file + ".idx", stage_mode)
+
+        return nwp_files
+
+    if not exists(tar_file):
+        raise FileNotFoundError(tar_file + " not found.")
+    index_path = stage.path(basename(tar_file))
+
+    # The tar file and its indexes are referenced while members are
+    # extracted, and members before they are checked, so other processes
+    # sharing the stage directory never evict them in between
+    index_files = [index_path + ".members.json", index_path + ".gzidx"]
+    for staged_file in index_files:
+        stage.acquire(staged_file)
     nwp_files = []
+    try:
+        src_tar = tar_file
+        if stage_tar:
+            src_tar = _stage_file(stage, tar_file, stage_mode)
+            index_files.append(index_path)
 
+        members = [
+            member
+            for member in _tar_members(src_tar, index_path)
+            if re.match(basename(nwp_file), member["name"])
+        ]
+        if len(members) == 0:
+            raise FileNotFoundError(nwp_file + " not found in " + tar_file + ".")
+        for member in members:
+            stage.acquire(stage.path(member["name"]))
+            nwp_files.append(stage.path(member["name"]))
+
+        missing = [
+            member
+            for member in members
+            if not stage.is_staged(
+                member["name"], member["size"], member["mtime"] * 10**9
+            )
+        ]
+        if len(missing) > 0:
+            with timed("extract"):
+                _extract_tar_members(src_tar, index_path, missing, stage.path(""))
+    except BaseException:
+        for staged_file in nwp_files:
+            stage.release(staged_file)
+        raise
+    finally:
+        for staged_file in index_files:
+            stage.release(staged_file)
+
+    # Indexes are marked as used, so they are evicted with the tar file
+    for staged_file in nwp_files + index_files:
+        if exists(staged_file):
+            stage.touch(staged_file)
+
+    return nwp_files
+
+
+def release_nwp_grib(nwp_file) -> None:
+    """Releases grib files imported by `import_nwp_grib` to a stage cache
+    (see 'stage_max_size'), so they can be evicted. Files not imported to a
+    stage cache are ignored.
+
+    Args:
+        nwp_file (str or list): Path or paths returned by `import_nwp_grib`.
+    """
+    if isinstance(nwp_file, str):
+        nwp_file = [nwp_file]
+
+    for staged_file in nwp_file:
+        StageCache.release(staged_file)
+        StageCache.release(staged_file + ".idx")
+
+
+@instrumented("date_run", "lead_time", "model")
+def import_nwp_grib(
+    date_run: datetime, lead_time: int, model: str, config: dict
+) -> str:
+    """Copies NWP grib files from a source directory to a stage directory.
+    From compressed sources, only the members matching 'src' are extracted.
+    If 'stage_tar' is set to False in the model configuration, they are
+    extracted straight from 'src_tar' and the tar file is not copied.
+
+    By default, files of previous runs or lead times are removed from the
+    stage directory. If 'stage_max_size' (bytes) is set in the
+    configuration, the stage directory of each model is instead an LRU
+    cache with this size budget (see `unimodel.utils.file_cache.StageCache`):
+    unchanged files are reused and the least recently used ones are evicted.
+    Imported files are not evicted until released with `release_nwp_grib`
+    or the process ends.
+
+    Source files are copied unless 'stage_mode' in the model configuration
+    is 'hardlink', 'reflink' or 'symlink'. Then they are linked, and copied
+    only if linking is not possible (i.e. hardlinks and reflinks between
+    different file systems).
+
+    Args:
+        date_run (datetime): Datetime of the model run.
+        lead_time (int): Lead time of the forecast to extract.
+        model (str): Name of the model
+        config (dict): Configuration dictionary.
+
+    Raises:
+        KeyError: If 'model' not in the configuration dictionary.
+        KeyError: If 'src_tar' not included when 'compressed' set to True.'
+        ValueError: If 'stage_mode' is not 'copy', 'hardlink', 'reflink' or
+                    'symlink'.
+        FileNotFoundError: If source tar file not found.
+        FileNotFoundError: If source grib file not found.
+
+    Returns:
+        str: Path to the grib file.
+    """
+    if model not in config.keys():
+        raise KeyError(model + " not in configuration dictionary.")
+
+    stage_mode = config[model].get("stage_mode", "copy")
+    if stage_mode not in STAGE_MODES:
+        raise ValueError(
+            f"Unknown stage mode {stage_mode}\n The available stage modes are: "
+            + str(list(STAGE_MODES))
+        )
+
+    model_dir = config["nwp_dir"] + model + "/"
+    if not exists(model_dir):
+        makedirs(model_dir)
+
+    prev_files_tar = glob(model_dir + "*.tar.gz")
+    prev_files = glob(model_dir + "*[!.tar.gz]")
+
+    date_run_f = _get_datetime_formatted(date_run)
+
+    nwp_file = _format_nwp_file(date_run, lead_time, model, config)
+
+    nwp_files = []
+
+    tar_file = None
     if config[model]["compressed"]:
         # If model is informed as compressed (tar.gz), the key 'src_tar'
         # (tar source file) must be included in the configuration dictionary
@@ -115,19 +434,33 @@ def import_nwp_grib(
             run=date_run_f["hour"],
         )
 
-        # If tar file is already copied in stage directory, program execution
-        # continues
-        if not exists(model_dir + basename(tar_file)):
-            # If tar_file not exists, previous tar and non-tar files are
+    if config.get("stage_max_size") is not None:
+        stage = StageCache(model_dir, config["stage_max_size"])
+        nwp_files = _import_to_stage_cache(
+            stage, nwp_file, tar_file, config[model].get("stage_tar", True), stage_mode
+        )
+        stage.evict()
+    elif tar_file is not None:
+        # Indexes of the tar file are written in the stage directory. If
+        # 'stage_tar' is False, members are extracted from the source tar file
+        # and its member index marks that the run is already staged.
+        stage_tar = config[model].get("stage_tar", True)
+        index_path = model_dir + basename(tar_file)
+        staged_file = index_path if stage_tar else index_path + ".members.json"
+
+        # If tar file is already staged, program execution continues
+        if not exists(staged_file):
+            # If tar_file not staged, previous tar and non-tar files are
             # removed
             for prev_file in prev_files_tar + prev_files:
                 remove(prev_file)
             # If tar_file exists in source folder, it is copied to stage
-            # directory
-            if exists(tar_file):
-                copyfile(tar_file, model_dir + basename(tar_file))
-            else:
+            # directory unless members are extracted from the source
+            if not exists(tar_file):
                 raise FileNotFoundError(tar_file + " not found.")
+            if stage_tar:
+                with timed("copy"):
+                    link_or_copy(tar_file, index_path, stage_mode)
         else:
             # Check if previous files match the required nwp_file
             for prev_file in prev_files:
@@ -136,22 +469,35 @@ def import_nwp_grib(
 
         # If none of the previous files (not tar) matches the required nwp_file
         if len(nwp_files) == 0:
-            # Extract files from tar file
-            with tarfile.open(model_dir + basename(tar_file), "r:gz") as _tar:
-                for member in _tar:
-                    _tar.makefile(member, model_dir + member.path)
-                    if bool(re.match(basename(nwp_file), member.path)):
-                        nwp_files.append(model_dir + member.path)
-            if len(nwp_files) == 0:
+            # Extract only the members matching the required nwp_file
+            src_tar = index_path if stage_tar else tar_file
+            members = [
+                member
+                for member in _tar_members(src_tar, index_path)
+                if re.match(basename(nwp_file), member["name"])
+            ]
+            if len(members) == 0:
                 raise FileNotFoundError(nwp_file + " not found in " + tar_file + ".")
+            with timed("extract"):
+                nwp_files = _extract_tar_members(
+                    src_tar, index_path, members, model_dir
+                )
     else:
         # If NWP grib file not compressed, previous grib files are removed
         for prev_file in prev_files:
             remove(prev_file)
         # IF NWP grib file exists in source directory, it is copied
         if exists(nwp_file):
-            copyfile(nwp_file, model_dir + basename(nwp_file))
+            with timed("copy"):
+                link_or_copy(nwp_file, model_dir + basename(nwp_file), stage_mode)
             nwp_files.append(model_dir + basename(nwp_file))
+            # NCEP '.idx' inventories allow reading only the needed messages
+            if exists(nwp_file + ".idx"):
+                link_or_copy(
+                    nwp_file + ".idx",
+                    model_dir + basename(nwp_file) + ".idx",
+                    stage_mode,
+                )
         else:
             raise FileNotFoundError(nwp_file + " not found.")
 
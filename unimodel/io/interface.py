@@ -1,43 +1,56 @@
 """Interface for I/O grib readers."""
 
-from unimodel.io.readers_nwp import (
-    read_arome_grib,
-    read_arpege_grib,
-    read_bolam_grib,
-    read_ecmwf_grib,
-    read_icon_grib,
-    read_moloch_grib,
-    read_unified_model_grib,
-    read_wrf_prs,
-    read_wrf_tl_ens_grib,
-    read_ncep_grib,
-    read_swan_grib,
-    read_ww3_grib,
-)
+from __future__ import annotations
 
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from functools import partial
+from importlib import import_module
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import xarray
+
+# Reader method of each model, imported from 'readers_nwp' on first use so
+# that importing the interface does not load cfgrib, xarray and pyproj
 _readers = dict()
-_readers["arome"] = read_arome_grib
-_readers["arpege"] = read_arpege_grib
-_readers["bolam"] = read_bolam_grib
-_readers["icon"] = read_icon_grib
-_readers["moloch_gfs"] = read_moloch_grib
-_readers["moloch_ecm"] = read_moloch_grib
-_readers["wrf_ecm"] = read_wrf_prs
-_readers["wrf_exp"] = read_wrf_prs
-_readers["wrf_gfs_3"] = read_wrf_prs
-_readers["wrf_gfs_9"] = read_wrf_prs
-_readers["ecmwf"] = read_ecmwf_grib
-_readers["ecmwf_hres"] = read_ecmwf_grib
-_readers["ecmwf_ens"] = read_ecmwf_grib
-_readers["unified_model"] = read_unified_model_grib
-_readers["wrf_tl_ens"] = read_wrf_tl_ens_grib
-_readers["gfs"] = read_ncep_grib
-_readers["gefs"] = read_ncep_grib
-_readers["swan"] = read_swan_grib
-_readers["ww3"] = read_ww3_grib
-
-
-def get_reader(name):
+_readers["arome"] = "read_arome_grib"
+_readers["arpege"] = "read_arpege_grib"
+_readers["bolam"] = "read_bolam_grib"
+_readers["icon"] = "read_icon_grib"
+_readers["moloch_gfs"] = "read_moloch_grib"
+_readers["moloch_ecm"] = "read_moloch_grib"
+_readers["wrf_ecm"] = "read_wrf_prs"
+_readers["wrf_exp"] = "read_wrf_prs"
+_readers["wrf_gfs_3"] = "read_wrf_prs"
+_readers["wrf_gfs_9"] = "read_wrf_prs"
+_readers["ecmwf"] = "read_ecmwf_grib"
+_readers["ecmwf_hres"] = "read_ecmwf_grib"
+_readers["ecmwf_ens"] = "read_ecmwf_grib"
+_readers["unified_model"] = "read_unified_model_grib"
+_readers["wrf_tl_ens"] = "read_wrf_tl_ens_grib"
+_readers["gfs"] = "read_ncep_grib"
+_readers["gefs"] = "read_ncep_grib"
+_readers["swan"] = "read_swan_grib"
+_readers["ww3"] = "read_ww3_grib"
+
+# Dimension along which files of a model are stacked by 'read_many', if
+# different from 'valid_time'
+_stack_dims = dict()
+_stack_dims["wrf_tl_ens"] = "realization"
+
+_executors = dict()
+_executors["process"] = ProcessPoolExecutor
+_executors["thread"] = ThreadPoolExecutor
+
+
+def get_reader(
+    name,
+    chunks: dict = None,
+    bbox: tuple = None,
+    bbox_crs: str = None,
+    dtype: str = None,
+    levels: list = None,
+):
     """Returns a callable function for the reader method corresponding to
     the given name. The available options are 'arome', 'arpege', 'bolam',
     'icon', 'moloch_gfs', 'moloch_ecm', 'wrf_ecm', 'wrf_exp', 'wrf_gfs_3',
@@ -45,6 +58,17 @@ def get_reader(name):
 
     Args:
         name (str): Name of the NWP model.
+        chunks (dict, optional): Dask chunk sizes passed to the reader, which
+                                 then returns lazy data. Defaults to None.
+        bbox (tuple, optional): Bounding box (x_min, y_min, x_max, y_max)
+                                passed to the reader. Defaults to None.
+        bbox_crs (str, optional): CRS of 'bbox'. Defaults to None, the model
+                                  CRS.
+        dtype (str, optional): Data type of the values returned by the
+                               reader. Defaults to None, the reader default.
+        levels (list, optional): Isobaric levels (hPa) passed to the reader,
+                                 which returns them stacked along
+                                 'isobaricInhPa'. Defaults to None.
 
     Raises:
         ValueError: If 'name' not in the available model list.
@@ -56,10 +80,361 @@ def get_reader(name):
         name = name.lower()
 
     try:
-        reader_method = _readers[name]
-        return reader_method
+        reader_name = _readers[name]
     except KeyError:
         raise ValueError(
             f"Unknown reader {name}\n The available readers are: "
             + str(list(_readers.keys()))
         ) from None
+
+    reader_method = getattr(import_module("unimodel.io.readers_nwp"), reader_name)
+
+    # Only arguments that are set are bound, so reader defaults are kept
+    reader_kwargs = {
+        key: value
+        for key, value in zip(
+            ("chunks", "bbox", "bbox_crs", "dtype", "levels"),
+            (chunks, bbox, bbox_crs, dtype, levels),
+        )
+        if value is not None
+    }
+    if reader_kwargs:
+        return partial(reader_method, **reader_kwargs)
+
+    return reader_method
+
+
+def read_variables(
+    grib_file: str,
+    variables: list,
+    model: str,
+    extra_filters: dict = None,
+    as_dataset: bool = False,
+    chunks: dict = None,
+    bbox: tuple = None,
+    bbox_crs: str = None,
+    dtype: str = None,
+    levels: list = None,
+):
+    """Reads several variables of a grib file scanning its messages only
+    once. Each variable is transformed by the reader method of 'model', so
+    CRS and coordinates are the same as when reading them one by one.
+
+    Args:
+        grib_file (str): Path to a grib file.
+        variables (list): Variables to extract (i.e. ['2t', 'orog', 'lsm']).
+        model (str): Name of the NWP model, as accepted by `get_reader`.
+        extra_filters (dict, optional): Other filters needed to read the
+                                        variables. Defaults to None.
+        as_dataset (bool, optional): If True, variables are merged into an
+                                     xarray.Dataset. Defaults to False.
+        chunks (dict, optional): Dask chunk sizes passed to the reader, which
+                                 then returns lazy data. Defaults to None.
+        bbox (tuple, optional): Bounding box (x_min, y_min, x_max, y_max)
+                                of the returned data. Defaults to None.
+        bbox_crs (str, optional): CRS of 'bbox'. Defaults to None, the model
+                                  CRS.
+        dtype (str, optional): Data type of the values. Defaults to None,
+                               the reader default.
+        levels (list, optional): Isobaric levels (hPa) of every variable,
+                                 stacked along 'isobaricInhPa'. Defaults to
+                                 None.
+
+    Returns:
+        dict or xarray.Dataset: xarray.DataArray for each variable, keyed by
+                                its name in `variables`, or a Dataset with
+                                all of them.
+    """
+    import xarray
+
+    from unimodel.io.readers_nwp import open_grib_index
+
+    reader_method = get_reader(model, chunks, bbox, bbox_crs, dtype, levels)
+
+    filter_keys = {"shortName": list(variables)}
+    if extra_filters is not None:
+        filter_keys.update(extra_filters)
+    if levels is not None:
+        filter_keys["level:float"] = list(levels)
+
+    grib_index = open_grib_index(grib_file, filter_keys)
+
+    grib_data = {}
+    for variable in variables:
+        grib_data[variable] = reader_method(
+            grib_file, variable, model, extra_filters, grib_index=grib_index
+        )
+
+    if as_dataset:
+        return xarray.merge(
+            grib_data.values(), compat="minimal", combine_attrs="drop_conflicts"
+        )
+
+    return grib_data
+
+
+def read_messages(
+    grib_file: str,
+    variable: str,
+    model: str,
+    extra_filters: dict = None,
+    grib_inventory=None,
+    **reader_kwargs,
+) -> xarray.DataArray:
+    """Reads a variable seeking straight to its messages in the grib file,
+    so only their headers are read and only their values are decoded. The
+    messages are found in the inventory of the file by 'shortName' and the
+    'extra_filters' that are inventory columns (i.e. 'level', 'step',
+    'number'). Data is transformed by the reader method of 'model'.
+
+    Args:
+        grib_file (str): Path to a grib file.
+        variable (str): Variable to extract.
+        model (str): Name of the NWP model, as accepted by `get_reader`.
+        extra_filters (dict, optional): Other filters needed to read the
+                                        variable. Defaults to None.
+        grib_inventory (pandas.DataFrame, optional): Inventory of the grib
+                                                     file returned by
+                                                     `inventory`. Defaults
+                                                     to None, it is built.
+        **reader_kwargs: Other reader arguments (i.e. chunks, bbox, dtype).
+
+    Raises:
+        ValueError: If no message matches 'variable' and 'extra_filters'.
+
+    Returns:
+        xarray.DataArray: Variable data.
+    """
+    from unimodel.io.readers_nwp import find_messages, inventory, open_grib_index
+
+    reader_method = get_reader(model)
+
+    if grib_inventory is None:
+        grib_inventory = inventory(grib_file)
+
+    offsets = find_messages(grib_inventory, variable, extra_filters)
+    if not offsets:
+        raise ValueError(
+            f"No message of {grib_file} matches variable '{variable}' and "
+            f"extra_filters {extra_filters}."
+        )
+
+    filter_keys = {"shortName": variable}
+    if extra_filters is not None:
+        filter_keys.update(extra_filters)
+
+    grib_index = open_grib_index(grib_file, filter_keys, offsets)
+
+    return reader_method(
+        grib_file,
+        variable,
+        model,
+        extra_filters,
+        grib_index=grib_index,
+        **reader_kwargs,
+    )
+
+
+def iter_read(
+    grib_file: str,
+    variable: str,
+    model: str,
+    extra_filters: dict = None,
+    grib_inventory=None,
+    **reader_kwargs,
+):
+    """Reads a variable one grib message at a time, so only one field is
+    kept in memory. Each message (i.e. a step, level or ensemble member) is
+    read and transformed by the reader method of 'model' and loaded before
+    it is yielded, with its coordinates and CRS. Messages are found in the
+    inventory of the file as in `read_messages` and yielded in file order.
+
+    Args:
+        grib_file (str): Path to a grib file.
+        variable (str): Variable to extract.
+        model (str): Name of the NWP model, as accepted by `get_reader`.
+        extra_filters (dict, optional): Other filters needed to read the
+                                        variable. Defaults to None.
+        grib_inventory (pandas.DataFrame, optional): Inventory of the grib
+                                                     file returned by
+                                                     `inventory`. Defaults
+                                                     to None, it is built.
+        **reader_kwargs: Other reader arguments (i.e. bbox, dtype).
+
+    Raises:
+        ValueError: If no message matches 'variable' and 'extra_filters'.
+
+    Yields:
+        xarray.DataArray: Variable data of each message.
+    """
+    from unimodel.io.readers_nwp import find_messages, inventory, open_grib_index
+
+    reader_method = get_reader(model)
+
+    if grib_inventory is None:
+        grib_inventory = inventory(grib_file)
+
+    offsets = find_messages(grib_inventory, variable, extra_filters)
+    if not offsets:
+        raise ValueError(
+            f"No message of {grib_file} matches variable '{variable}' and "
+            f"extra_filters {extra_filters}."
+        )
+
+    filter_keys = {"shortName": variable}
+    if extra_filters is not None:
+        filter_keys.update(extra_filters)
+
+    for offset in offsets:
+        grib_index = open_grib_index(grib_file, filter_keys, [offset])
+
+        # Filters on keys that are not inventory columns may skip a message
+        if not grib_index.field_ids_index:
+            continue
+
+        yield reader_method(
+            grib_file,
+            variable,
+            model,
+            extra_filters,
+            grib_index=grib_index,
+            **reader_kwargs,
+        ).load()
+
+
+def _read_and_load(
+    reader_method, grib_file: str, variable: str, model: str, extra_filters: dict
+) -> xarray.DataArray:
+    """Reads a grib file and loads its values, so decoding is done by the
+    worker and not when the data is first accessed."""
+    return reader_method(grib_file, variable, model, extra_filters).load()
+
+
+def read_many(
+    files: list,
+    variable: str,
+    model: str,
+    extra_filters: dict = None,
+    max_workers: int = None,
+    executor: str = "process",
+    dim: str = None,
+    bbox: tuple = None,
+    bbox_crs: str = None,
+    dtype: str = None,
+) -> xarray.DataArray:
+    """Reads a variable from a list of grib files concurrently and stacks
+    them in a single xarray.DataArray. Files are stacked along 'valid_time',
+    or along 'realization' for WRF-TL-ENS members.
+
+    Args:
+        files (list): Paths to grib files (i.e. lead times or members of a
+                      run).
+        variable (str): Variable to extract.
+        model (str): Name of the NWP model, as accepted by `get_reader`.
+        extra_filters (dict, optional): Other filters needed to read the
+                                        variable. Defaults to None.
+        max_workers (int, optional): Maximum number of concurrent reads.
+                                     Defaults to None, the executor default.
+        executor (str, optional): 'process' or 'thread'. Threads avoid
+                                  the start up and pickling costs of
+                                  processes and decode in parallel if
+                                  ecCodes is built with thread support.
+                                  Defaults to 'process'.
+        dim (str, optional): Dimension along which files are stacked. Its
+                             scalar coordinate in each file is used as
+                             coordinate. Defaults to None, it is chosen
+                             from 'model'.
+        bbox (tuple, optional): Bounding box (x_min, y_min, x_max, y_max)
+                                of each file. Only the box is kept in
+                                memory. Defaults to None.
+        bbox_crs (str, optional): CRS of 'bbox'. Defaults to None, the model
+                                  CRS.
+        dtype (str, optional): Data type of the values. Defaults to None,
+                               the reader default.
+
+    Raises:
+        ValueError: If 'files' is empty.
+        ValueError: If 'executor' is not 'process' or 'thread'.
+        ValueError: If 'dim' is already a dimension of the data, or a
+                    coordinate along one (i.e. files with several steps).
+        ValueError: If files do not have the same shape.
+
+    Returns:
+        xarray.DataArray: Data of all files stacked along 'dim'.
+    """
+    import numpy as np
+    import xarray
+
+    if len(files) == 0:
+        raise ValueError("'files' is empty, there is no file to read.")
+
+    model = model.lower()
+    reader_method = get_reader(model, bbox=bbox, bbox_crs=bbox_crs, dtype=dtype)
+
+    if executor not in _executors:
+        raise ValueError(
+            f"Unknown executor {executor}\n The available executors are: "
+            + str(list(_executors.keys()))
+        )
+
+    if dim is None:
+        dim = _stack_dims.get(model, "valid_time")
+
+    stacked = None
+    file_coords = [None] * len(files)
+
+    with _executors[executor](max_workers=max_workers) as pool:
+        futures = {
+            pool.submit(
+                _read_and_load, reader_method, grib_file, variable, model, extra_filters
+            ): i
+            for i, grib_file in enumerate(files)
+        }
+        for future in as_completed(futures):
+            i = futures[future]
+            grib_data = future.result()
+
+            # The first read file is used as template for the stacked data
+            if stacked is None:
+                if dim in grib_data.dims:
+                    raise ValueError(f"'{dim}' is already a dimension of the data.")
+                if dim in grib_data.coords and grib_data.coords[dim].ndim > 0:
+                    raise ValueError(
+                        f"'{dim}' is a coordinate along {grib_data.coords[dim].dims}"
+                        f" in {files[i]}, files must have a single '{dim}'."
+                    )
+                template = grib_data
+                stacked = np.empty(
+                    (len(files),) + grib_data.shape, dtype=grib_data.dtype
+                )
+            elif grib_data.shape != template.shape:
+                raise ValueError(
+                    f"{files[i]} shape {grib_data.shape} is different than "
+                    f"{template.shape}."
+                )
+
+            stacked[i] = grib_data.values
+            file_coords[i] = {
+                name: coord.values
+                for name, coord in grib_data.coords.items()
+                if coord.ndim == 0
+            }
+
+    # Scalar coordinates that change between files are stacked along 'dim'
+    coords = dict(template.coords)
+    for name in file_coords[0]:
+        values = [f_coords[name] for f_coords in file_coords]
+        if name == dim or not all(np.array_equal(v, values[0]) for v in values):
+            coords[name] = xarray.Variable(
+                dim, np.stack(values), template.coords[name].attrs
+            )
+
+    grib_data = xarray.DataArray(
+        stacked,
+        dims=(dim,) + template.dims,
+        coords=coords,
+        name=template.name,
+        attrs=template.attrs,
+    )
+
+    return grib_data
@@ -1,18 +1,723 @@
-"""Module to read NWP files and transfrom them to xarray."""
-
+"""Module to read NWP files and transfrom them to xarray.
+
+Readers can be called concurrently from several threads of a process (i.e.
+a ThreadPoolExecutor), reading the same or different files. Each message is
+decoded through its own file handle and ecCodes handle, and the index and
+field caches are written atomically. If ecCodes is built with thread
+support, messages are decoded in parallel, as ecCodes calls release the GIL.
+Otherwise, decoding is serialized by a lock shared by all the readers.
+Caches must not be set (see `set_index_cache` and `set_field_cache`) while
+other threads are reading.
+
+The 'read_*_grib' readers and `read_wrf_prs` share these keyword arguments:
+
+    grib_index (FileIndex): Message index of the grib file returned by
+        `open_grib_index`. Defaults to None, the file is scanned.
+    chunks (dict): Dask chunk sizes (i.e. {'step': 1}). If set, data is
+        decoded only when computed. Defaults to None.
+    bbox (tuple): Bounding box (x_min, y_min, x_max, y_max) of the returned
+        data. Defaults to None, the whole domain.
+    bbox_crs (str): CRS of 'bbox' (i.e. 'EPSG:4326'). Defaults to None, the
+        model CRS.
+    dtype (str): Data type of the returned values. Defaults to 'float32'.
+    levels (list): Isobaric levels (hPa) to read in one pass, stacked along
+        'isobaricInhPa' in the given order. Defaults to None, levels are
+        selected by 'extra_filters'.
+"""
+
+import inspect
+import os
 import re
+from functools import lru_cache, wraps
 
 import numpy as np
+import pandas as pd
 import pyproj
 import xarray
-from cfgrib.dataset import DatasetBuildError
+from cfgrib.cfmessage import COMPUTED_KEYS
+from cfgrib.dataset import (
+    DatasetBuildError,
+    OnDiskArray,
+    Variable,
+    compute_index_keys,
+    open_fileindex,
+    open_from_index,
+)
+from cfgrib.messages import MISSING_VAUE_INDICATOR, FileIndex, FileStream
+from cfgrib.xarray_plugin import ECCODES_LOCK, CfGribDataStore
+from eccodes import (
+    codes_get,
+    codes_get_features,
+    codes_get_size,
+    codes_get_values,
+    codes_grib_new_from_file,
+    codes_is_defined,
+    codes_release,
+    codes_set,
+)
+from xarray.backends.locks import ensure_lock
 
 from unimodel.utils.custom_errors import raise_reader_missing_filters
-from unimodel.utils.geotools import proj4_from_grib
+from unimodel.utils.file_cache import ArrayCache, FileCache
+from unimodel.utils.geotools import grid_crs, subset_bbox
+from unimodel.utils.instrumentation import (
+    add_bytes_read,
+    enabled,
+    instrumented,
+    lap,
+    record_array,
+    timed,
+)
+
+# On-disk cache of grib message indexes, disabled unless a directory is set
+# through 'set_index_cache' or the UNIMODEL_INDEX_CACHE environment variable
+_index_cache = None
+if os.environ.get("UNIMODEL_INDEX_CACHE"):
+    _index_cache = FileCache(os.environ["UNIMODEL_INDEX_CACHE"], suffix=".idx")
+
+# On-disk cache of decoded fields, disabled unless a directory is set through
+# 'set_field_cache' or the UNIMODEL_FIELD_CACHE environment variable
+_field_cache = None
+if os.environ.get("UNIMODEL_FIELD_CACHE"):
+    _field_cache = ArrayCache(os.environ["UNIMODEL_FIELD_CACHE"])
+
+# Thread-safe ecCodes builds decode messages without the global cfgrib lock
+_ECCODES_THREADS = "ECCODES_THREADS" in codes_get_features().split()
+
+# ecCodes C functions decoding values into a given array, not part of the
+# public eccodes API, so values are copied if they are not available
+try:
+    from gribapi.bindings import ffi as _ffi
+    from gribapi.bindings import lib as _lib
+    from gribapi.gribapi import GRIB_CHECK, get_handle
+
+    _GET_ARRAY_INTO = {
+        np.dtype("float32"): (_lib.grib_get_float_array, "float *"),
+        np.dtype("float64"): (_lib.grib_get_double_array, "double *"),
+    }
+except (ImportError, AttributeError):
+    _GET_ARRAY_INTO = {}
+
+# Reader arguments that do not change the returned values
+_UNCACHED_ARGS = ("grib_index", "chunks")
+
+# Grib keys listed by 'inventory'
+_INVENTORY_KEYS = [
+    "shortName",
+    "typeOfLevel",
+    "level:float",
+    "step",
+    "number",
+    "dataType",
+    "gridType",
+    "Nx",
+    "Ny",
+    "numberOfPoints",
+    "totalLength",
+]
+
+# NCEP inventory variable abbreviation and level description of grib
+# shortNames. Level is None if the shortName is used at several levels.
+_NCEP_VARIABLES = {
+    "2t": ("TMP", "2 m above ground"),
+    "2d": ("DPT", "2 m above ground"),
+    "2r": ("RH", "2 m above ground"),
+    "2sh": ("SPFH", "2 m above ground"),
+    "10u": ("UGRD", "10 m above ground"),
+    "10v": ("VGRD", "10 m above ground"),
+    "tp": ("APCP", "surface"),
+    "acpcp": ("ACPCP", "surface"),
+    "prate": ("PRATE", "surface"),
+    "csnow": ("CSNOW", "surface"),
+    "crain": ("CRAIN", "surface"),
+    "gust": ("GUST", "surface"),
+    "sp": ("PRES", "surface"),
+    "orog": ("HGT", "surface"),
+    "lsm": ("LAND", "surface"),
+    "sde": ("SNOD", "surface"),
+    "sdwe": ("WEASD", "surface"),
+    "vis": ("VIS", "surface"),
+    "cape": ("CAPE", "surface"),
+    "prmsl": ("PRMSL", "mean sea level"),
+    "mslet": ("MSLET", "mean sea level"),
+    "pwat": ("PWAT", "entire atmosphere (considered as a single layer)"),
+    "tcc": ("TCDC", "entire atmosphere"),
+    "t": ("TMP", None),
+    "gh": ("HGT", None),
+    "r": ("RH", None),
+    "q": ("SPFH", None),
+    "u": ("UGRD", None),
+    "v": ("VGRD", None),
+    "w": ("VVEL", None),
+}
+
+# NCEP inventory level descriptions of grib typeOfLevel
+_NCEP_LEVELS = {
+    "isobaricInhPa": "{level} mb",
+    "heightAboveGround": "{level} m above ground",
+}
+
+# Type of the levels read through the 'levels' argument of the readers
+_LEVELS_TYPE = "isobaricInhPa"
+
+# cfgrib dimension names of regular grids
+_GRIB_DIMS = {"x": "longitude", "y": "latitude"}
+
+
+class _GribStream(FileStream):
+    """cfgrib file stream reporting the bytes of the messages it reads to
+    the instrumentation (see `unimodel.utils.instrumentation`)."""
+
+    def message_from_file(self, file, offset=None, **kwargs):
+        message = super().message_from_file(file, offset, **kwargs)
+        if enabled():
+            add_bytes_read(message["totalLength"])
+
+        return message
+
+
+class _TimedArray:
+    """cfgrib on-disk array reporting the decoding of its values to the
+    instrumentation (see `unimodel.utils.instrumentation`)."""
+
+    def __init__(self, array, grib_file: str) -> None:
+        self.array = array
+        self.shape = array.shape
+        self.dtype = array.dtype
+        self.grib_file = grib_file
+
+    def __getitem__(self, key) -> np.ndarray:
+        with timed("decode", grib_file=self.grib_file):
+            values = self.array[key]
+            record_array(values.nbytes)
+
+        return values
+
+
+class _GribIndexStore(CfGribDataStore):
+    """cfgrib data store built from an already scanned message index."""
+
+    def __init__(self, grib_index: FileIndex, values_dtype: str = "float32") -> None:
+        self.lock = ensure_lock(None if _ECCODES_THREADS else ECCODES_LOCK)
+        self.ds = open_from_index(grib_index, values_dtype=np.dtype(values_dtype))
+        self.grib_file = getattr(grib_index.fieldset, "path", None)
+
+    def open_store_variable(self, var: Variable) -> xarray.Variable:
+        if isinstance(var.data, OnDiskArray):
+            var = Variable(
+                var.dimensions, _TimedArray(var.data, self.grib_file), var.attributes
+            )
+
+        return super().open_store_variable(var)
+
+
+def set_index_cache(cache_dir: str = None, max_size: int = 512 * 1024**2) -> None:
+    """Sets the directory where grib message indexes are cached, so repeated
+    reads of the same file skip the scan of its message headers. Indexes are
+    identified by file path, size, modification time and filter keys, and
+    the least recently used are removed when 'max_size' is exceeded. The
+    directory can be shared by several processes.
+
+    Args:
+        cache_dir (str, optional): Cache directory. Defaults to None, which
+                                   disables the cache.
+        max_size (int, optional): Size budget of the cache in bytes.
+                                  Defaults to 512 MiB.
+    """
+    global _index_cache
+
+    if cache_dir is None:
+        _index_cache = None
+    else:
+        _index_cache = FileCache(cache_dir, max_size, suffix=".idx")
+
+
+def set_field_cache(cache_dir: str = None, max_size: int = 4 * 1024**3) -> None:
+    """Sets the directory where fields decoded by the readers are cached.
+    Cached fields are identified by file path, size, modification time,
+    reader and reader arguments, and are returned memory-mapped instead of
+    decoding the grib file again. The least recently used are removed when
+    'max_size' is exceeded. The directory can be shared by several
+    processes. Worker processes not created by fork must set it again, or
+    use the UNIMODEL_FIELD_CACHE environment variable.
+
+    Args:
+        cache_dir (str, optional): Cache directory. Defaults to None, which
+                                   disables the cache.
+        max_size (int, optional): Size budget of the cache in bytes.
+                                  Defaults to 4 GiB.
+    """
+    global _field_cache
+
+    if cache_dir is None:
+        _field_cache = None
+    else:
+        _field_cache = ArrayCache(cache_dir, max_size)
+
+
+def _cache_fields(reader):
+    """Decorator caching the fields returned by a reader in the field cache,
+    if it is set (see `set_field_cache`).
+
+    Args:
+        reader (function): NWP grib reader.
+
+    Returns:
+        function: Reader returning cached fields when available.
+    """
+    reader_signature = inspect.signature(reader)
+
+    @wraps(reader)
+    def cached_reader(*args, **kwargs):
+        if _field_cache is None:
+            return reader(*args, **kwargs)
+
+        reader_args = reader_signature.bind(*args, **kwargs)
+        reader_args.apply_defaults()
+        reader_args = reader_args.arguments
+
+        key_args = [reader.__name__]
+        for name, value in reader_args.items():
+            if name == "grib_index" and value is not None:
+                # Indexes of a subset of messages (see `open_grib_index`)
+                # select different fields with the same filters
+                value = sorted(
+                    offset for _, offsets in value.field_ids_index for offset in offsets
+                )
+            elif name in _UNCACHED_ARGS:
+                continue
+            if name == "dtype":
+                value = np.dtype(value).str
+            elif isinstance(value, dict):
+                value = sorted(value.items())
+            key_args.append((name, value))
+        cache_key = FileCache.file_key(reader_args["grib_file"], *key_args)
+
+        cached = _field_cache.load(cache_key)
+        if cached is None:
+            grib_data = reader(*args, **kwargs)
+            values = grib_data.values
+            _field_cache.store(
+                cache_key,
+                (
+                    values,
+                    {
+                        "dims": grib_data.dims,
+                        "coords": {
+                            name: {
+                                "dims": coord.dims,
+                                "values": coord.values,
+                                "attrs": coord.attrs,
+                                "encoding": coord.encoding,
+                            }
+                            for name, coord in grib_data.coords.items()
+                        },
+                        "name": grib_data.name,
+                        "attrs": grib_data.attrs,
+                        "encoding": grib_data.encoding,
+                    },
+                ),
+            )
+            cached = _field_cache.load(cache_key)
+            # Fields larger than the cache size budget are not kept
+            if cached is None:
+                return grib_data.copy(data=values)
+
+        values, metadata = cached
+        grib_data = xarray.DataArray(
+            values,
+            dims=metadata["dims"],
+            coords={
+                name: xarray.Variable(
+                    coord["dims"], coord["values"], coord["attrs"], coord["encoding"]
+                )
+                for name, coord in metadata["coords"].items()
+            },
+            name=metadata["name"],
+            attrs=metadata["attrs"],
+        )
+        grib_data.encoding = metadata["encoding"]
+
+        chunks = reader_args["chunks"]
+        if isinstance(chunks, dict):
+            chunks = {
+                dim: size for dim, size in chunks.items() if dim in grib_data.dims
+            }
+        if chunks is not None:
+            grib_data = grib_data.chunk(chunks)
+
+        return grib_data
+
+    return cached_reader
+
+
+def open_grib_index(
+    grib_file: str, filter_keys: dict = None, offsets: list = None
+) -> FileIndex:
+    """Scans the message headers of a grib file once and returns its index.
+    The index can be passed to any reader through 'grib_index' to read
+    several variables without scanning the file again. If an index cache is
+    set (see `set_index_cache`), the index is loaded from it when available.
+
+    Args:
+        grib_file (str): Path to a grib file.
+        filter_keys (dict, optional): Filters applied to the messages of the
+                                      grib file. List values select any of
+                                      the given values (i.e. {'shortName':
+                                      ['2t', 'tp']}). Defaults to None.
+        offsets (list, optional): Byte offsets of the messages to index (see
+                                  `inventory` and `find_messages`). Only
+                                  these messages are read. Defaults to None,
+                                  all the messages are scanned.
+
+    Returns:
+        FileIndex: Message index of the grib file.
+    """
+    if filter_keys is None:
+        filter_keys = {}
+
+    index_keys = sorted(set(compute_index_keys()) | set(filter_keys))
+
+    if offsets is not None:
+        grib_stream = _GribStream(grib_file)
+        with timed("scan", grib_file=grib_file):
+            grib_index = FileIndex.from_fieldset_and_iteritems(
+                grib_stream,
+                ((offset, grib_stream[offset]) for offset in offsets),
+                index_keys,
+                COMPUTED_KEYS,
+            )
+        return grib_index.subindex(filter_keys)
+
+    if _index_cache is None:
+        with timed("scan", grib_file=grib_file):
+            return open_fileindex(
+                _GribStream(grib_file), "", index_keys, filter_by_keys=filter_keys
+            )
+
+    return _scan_grib(grib_file, index_keys).subindex(filter_keys)
+
 
+def _scan_grib(grib_file: str, index_keys: list) -> FileIndex:
+    """Scans the message headers of a grib file, or loads the result from
+    the index cache if it is set.
 
+    Args:
+        grib_file (str): Path to a grib file.
+        index_keys (list): Grib keys read from each message.
+
+    Returns:
+        FileIndex: Message index of the grib file.
+    """
+    grib_stream = _GribStream(grib_file)
+
+    if _index_cache is None:
+        with timed("scan", grib_file=grib_file):
+            return FileIndex.from_fieldset(grib_stream, index_keys, COMPUTED_KEYS)
+
+    cache_key = FileCache.file_key(grib_file, tuple(index_keys))
+    field_ids_index = _index_cache.load(cache_key)
+
+    if field_ids_index is None:
+        with timed("scan", grib_file=grib_file):
+            grib_index = FileIndex.from_fieldset(grib_stream, index_keys, COMPUTED_KEYS)
+        _index_cache.store(cache_key, grib_index.field_ids_index)
+    else:
+        grib_index = FileIndex(
+            grib_stream,
+            index_keys,
+            field_ids_index=field_ids_index,
+            computed_keys=COMPUTED_KEYS,
+        )
+
+    return grib_index
+
+
+def inventory(grib_file: str) -> pd.DataFrame:
+    """Lists the messages of a grib file reading only their headers, so no
+    values are decoded. Columns are named after the grib keys, so they can
+    be used to plan the 'extra_filters' of a reader. Keys that are not
+    defined in a message are None. If an index cache is set (see
+    `set_index_cache`), the inventory is loaded from it when available.
+
+    Args:
+        grib_file (str): Path to a grib file.
+
+    Returns:
+        pandas.DataFrame: One row per message, sorted by position in the
+                          file, with columns 'shortName', 'typeOfLevel',
+                          'level', 'step' (hours), 'number' (ensemble
+                          member), 'dataType', 'gridType', 'Nx', 'Ny',
+                          'numberOfPoints', 'offset' and 'totalLength'
+                          (bytes).
+    """
+    grib_index = _scan_grib(grib_file, _INVENTORY_KEYS)
+
+    messages = []
+    for header_values, offsets in grib_index.field_ids_index:
+        header_values = [None if value == "undef" else value for value in header_values]
+        for offset in offsets:
+            messages.append(header_values + [offset])
+
+    columns = [key.split(":")[0] for key in _INVENTORY_KEYS] + ["offset"]
+    grib_inventory = pd.DataFrame(messages, columns=columns)
+    grib_inventory = grib_inventory.sort_values("offset", ignore_index=True)
+
+    return grib_inventory[columns[:-2] + ["offset", "totalLength"]]
+
+
+def find_messages(
+    grib_inventory: pd.DataFrame, variable, extra_filters: dict = None
+) -> list:
+    """Finds the messages of a variable in the inventory of a grib file.
+    Filters on keys that are not inventory columns are ignored, so they
+    must be applied when the messages are read.
+
+    Args:
+        grib_inventory (pandas.DataFrame): Grib file inventory returned by
+                                           `inventory`.
+        variable (str or list): Variable or variables to find.
+        extra_filters (dict, optional): Other filters of the messages (i.e.
+                                        {'level': 850, 'number': [1, 2]}).
+                                        Defaults to None.
+
+    Returns:
+        list: Byte offsets of the matching messages.
+    """
+    matches = _match_messages(grib_inventory, variable, extra_filters)
+
+    return grib_inventory.offset[matches].tolist()
+
+
+def _match_messages(
+    grib_inventory: pd.DataFrame, variable, extra_filters: dict = None
+) -> np.ndarray:
+    """Matches the messages of an inventory with a variable and filters on
+    inventory columns.
+
+    Args:
+        grib_inventory (pandas.DataFrame): Grib messages inventory.
+        variable (str or list): Variable or variables to find.
+        extra_filters (dict, optional): Other filters of the messages.
+                                        Defaults to None.
+
+    Returns:
+        numpy.ndarray: True for the messages matching all the filters.
+    """
+    filter_keys = {"shortName": variable}
+    if extra_filters is not None:
+        filter_keys.update(extra_filters)
+
+    matches = np.ones(len(grib_inventory), dtype=bool)
+    for key, value in filter_keys.items():
+        if key in grib_inventory.columns:
+            if not isinstance(value, (list, tuple)):
+                value = [value]
+            matches &= grib_inventory[key].isin(value).values
+
+    return matches
+
+
+@instrumented("grib_file", "offset")
+def read_values_into(grib_file: str, offset: int, out: np.ndarray) -> np.ndarray:
+    """Decodes the values of a grib message straight into an array given by
+    the caller (i.e. a slice of a preallocated block of several members or
+    steps), so no intermediate array is created. Values are in the same
+    order as in the readers of this module, with missing values as NaN.
+    Messages are found by `find_messages`, and coordinates can be taken
+    from reading one of them with a reader.
+
+    Args:
+        grib_file (str): Path to a grib file.
+        offset (int): Byte offset of the message in the file.
+        out (numpy.ndarray): C-contiguous and writable 'float32' or
+                             'float64' array with as many elements as
+                             points in the message (i.e. with shape
+                             (y, x)).
+
+    Raises:
+        ValueError: If 'out' is not a C-contiguous and writable 'float32'
+                    or 'float64' array.
+        ValueError: If there is no grib message at 'offset'.
+        ValueError: If 'out' size is not the number of points of the
+                    message.
+
+    Returns:
+        numpy.ndarray: 'out', filled with the message values.
+    """
+    if out.dtype not in (np.float32, np.float64):
+        raise ValueError(
+            f"'out' data type must be float32 or float64, not {out.dtype}."
+        )
+    if not (out.flags.c_contiguous and out.flags.writeable):
+        raise ValueError("'out' must be a C-contiguous and writable array.")
+
+    with ensure_lock(None if _ECCODES_THREADS else ECCODES_LOCK):
+        with open(grib_file, "rb") as f_grib:
+            f_grib.seek(offset)
+            codes_id = codes_grib_new_from_file(f_grib)
+        if codes_id is None:
+            raise ValueError(f"No grib message at offset {offset} of {grib_file}.")
+
+        try:
+            if enabled():
+                add_bytes_read(codes_get(codes_id, "totalLength"))
+
+            n_values = codes_get_size(codes_id, "values")
+            if out.size != n_values:
+                raise ValueError(
+                    f"'out' size {out.size} is different than the {n_values} "
+                    f"points of the message at offset {offset} of {grib_file}."
+                )
+
+            # Missing values are decoded as an indicator out of the data range
+            codes_set(codes_id, "missingValue", MISSING_VAUE_INDICATOR)
+            _get_values_into(codes_id, out)
+
+            if codes_is_defined(codes_id, "alternativeRowScanning") and codes_get(
+                codes_id, "alternativeRowScanning"
+            ):
+                rows = out.reshape(-1, codes_get(codes_id, "Ni"))
+                rows[1::2] = rows[1::2, ::-1].copy()
+
+            bitmap_present = codes_get(codes_id, "bitmapPresent")
+        finally:
+            codes_release(codes_id)
+
+    if bitmap_present:
+        out[out == MISSING_VAUE_INDICATOR] = np.nan
+
+    return out
+
+
+def _get_values_into(codes_id: int, out: np.ndarray) -> None:
+    """Decodes the values of a grib message into an array, in place through
+    the ecCodes C functions if they are available, or copied from
+    `codes_get_values` otherwise.
+
+    Args:
+        codes_id (int): ecCodes handle of the message.
+        out (numpy.ndarray): C-contiguous 'float32' or 'float64' array with
+                             as many elements as values in the message.
+    """
+    if out.dtype not in _GET_ARRAY_INTO:
+        out.reshape(-1)[:] = codes_get_values(codes_id, ktype=out.dtype.type)
+        return
+
+    get_array, c_type = _GET_ARRAY_INTO[out.dtype]
+    GRIB_CHECK(
+        get_array(
+            get_handle(codes_id),
+            b"values",
+            _ffi.cast(c_type, out.ctypes.data),
+            _ffi.new("size_t*", out.size),
+        )
+    )
+
+
+def _open_grib(
+    grib_file: str,
+    variable: str,
+    model: str,
+    extra_filters: dict = None,
+    grib_index: FileIndex = None,
+    chunks: dict = None,
+    dtype: str = "float32",
+    levels: list = None,
+) -> xarray.DataArray:
+    """Opens a variable of a grib file as an xarray.DataArray.
+
+    Args:
+        grib_file (str): Path to a grib file.
+        variable (str): Variable to extract.
+        model (str): Model to be read.
+        extra_filters (dict, optional): Other filters needed to read the
+                                        variable. Defaults to None.
+        grib_index (FileIndex, optional): Message index of the grib file. If
+                                          None, the file is scanned.
+                                          Defaults to None.
+        chunks (dict, optional): Dask chunk sizes. Dimensions 'x' and 'y'
+                                 refer to 'longitude' and 'latitude' in
+                                 regular grids. Defaults to None, data is
+                                 not chunked.
+        dtype (str, optional): Data type of the decoded values. Defaults to
+                               'float32'.
+        levels (list, optional): Isobaric levels (hPa) to read, stacked
+                                 along 'isobaricInhPa' in the given order.
+                                 Defaults to None, levels are selected by
+                                 'extra_filters'.
+
+    Raises:
+        ValueError: If any of 'levels' is not found.
+
+    Returns:
+        xarray.DataArray: Grib data with cfgrib coordinates and attributes.
+    """
+    filter_keys = {"shortName": variable}
+    if extra_filters is not None:
+        filter_keys.update(extra_filters)
+    if levels is not None:
+        # 'level:float' is a default index key, so any index can be filtered
+        filter_keys["typeOfLevel"] = _LEVELS_TYPE
+        filter_keys["level:float"] = list(levels)
+
+    if grib_index is None:
+        grib_index = open_grib_index(grib_file, filter_keys)
+
+    grib_index = grib_index.subindex(filter_keys)
+    if levels is not None:
+        missing_levels = set(levels) - set(
+            grib_index.header_values.get("level:float", [])
+        )
+        if missing_levels:
+            raise ValueError(
+                f"Levels {sorted(missing_levels)} of '{variable}' not found in "
+                f"{grib_file}."
+            )
+
+    try:
+        grib_store = _GribIndexStore(grib_index, dtype)
+    except DatasetBuildError as err:
+        raise_reader_missing_filters(grib_file, variable, model, err)
+
+    # Readers rename 'longitude' and 'latitude' dimensions of regular grids
+    # to 'x' and 'y' after opening, so chunks are given by their final names
+    if isinstance(chunks, dict):
+        grib_dims = grib_store.get_dimensions()
+        chunks = {
+            _GRIB_DIMS.get(dim, dim) if dim not in grib_dims else dim: size
+            for dim, size in chunks.items()
+        }
+
+    grib_data = xarray.open_dataarray(
+        grib_store, engine="store", decode_timedelta=True, chunks=chunks
+    )
+
+    if levels is not None:
+        # A single level is a scalar coordinate, placed as cfgrib would
+        if _LEVELS_TYPE not in grib_data.dims:
+            level_axis = sum(
+                dim in ("number", "time", "step") for dim in grib_data.dims
+            )
+            grib_data = grib_data.expand_dims(_LEVELS_TYPE, axis=level_axis)
+        grib_data = grib_data.sel({_LEVELS_TYPE: list(levels)})
+
+    return grib_data
+
+
+@instrumented("grib_file", "variable", "model")
+@_cache_fields
 def read_wrf_prs(
-    grib_file: str, variable: str, model: str, extra_filters: dict = None
+    grib_file: str,
+    variable: str,
+    model: str,
+    extra_filters: dict = None,
+    grib_index: FileIndex = None,
+    chunks: dict = None,
+    bbox: tuple = None,
+    bbox_crs: str = None,
+    dtype: str = "float32",
+    levels: list = None,
 ) -> xarray.DataArray:
     """Reads a WRF grib file and transforms it into an xarray.DataArray.
 
@@ -22,27 +727,21 @@ def read_wrf_prs(
         model (str): Model to be read.
         extra_filters (dict, optional): Other filters
                                         needed to read the variable
+        grib_index, chunks, bbox, bbox_crs, dtype, levels: See the module
+                                                           docstring.
 
     Returns:
         xarray.DataArray: WRF PRS grib file data.
     """
 
-    filter_keys = {"shortName": variable}
-    if extra_filters is not None:
-        filter_keys.update(extra_filters)
-
-    try:
-        grib_data = xarray.open_dataarray(
-            grib_file,
-            engine="cfgrib",
-            backend_kwargs={"filter_by_keys": filter_keys, "indexpath": ""},
-            decode_timedelta=True,
-        )
-    except DatasetBuildError as err:
-        raise_reader_missing_filters(grib_file, variable, model, err)
+    grib_data = _open_grib(
+        grib_file, variable, model, extra_filters, grib_index, chunks, dtype, levels
+    )
+    lap("open")
 
     geographics = _get_wrf_prs_metadata(grib_data, model)
     grib_data = grib_data.rio.write_crs(geographics["crs"])
+    lap("crs")
 
     # WRF PRS xarray does not have coordinates in its projection (Lambert),
     # only the equivalent irregulat longitude and latitude points. Then, x and
@@ -63,13 +762,35 @@ def read_wrf_prs(
 
     grib_data = grib_data.assign_coords(x=x_coords, y=y_coords)
     grib_data = grib_data.drop_vars(["latitude", "longitude"], errors="ignore")
+    lap("coords")
 
     # Add model name to attributes
     grib_data.attrs["model"] = model
 
+    if bbox is not None:
+        grib_data = subset_bbox(grib_data, bbox, bbox_crs)
+        lap("subset")
+
     return grib_data
 
 
+@lru_cache(maxsize=None)
+def _get_wrf_prs_crs() -> pyproj.CRS:
+    """Gets the projection of WRF PRS files, built only once.
+
+    Returns:
+        pyproj.CRS: WRF PRS coordinate reference system.
+    """
+    # WRF PRS projection lat_0 is not correctly defined in the file.
+    # Then, it must be updated to 40.70002. Therefore, we harcoded all WRF PRS
+    # projection.
+    return pyproj.CRS(
+        "+proj=lcc +units=m +R=6370000 +lat_1=60.0 "
+        "+lat_2=30.0 +lat_0=40.70002 +lon_0=-1.5 "
+        "+nadgrids=@null"
+    )
+
+
 def _get_wrf_prs_metadata(xarray_var: xarray.DataArray, model: str) -> dict:
     """Get projection, Affine transform and shape from a PRS xarray.
 
@@ -85,14 +806,7 @@ def _get_wrf_prs_metadata(xarray_var: xarray.DataArray, model: str) -> dict:
     n_x = xarray_var.attrs["GRIB_Nx"]
     n_y = xarray_var.attrs["GRIB_Ny"]
 
-    # WRF PRS projection lat_0 is not correctly defined in the file.
-    # Then, it must be updated to 40.70002. Therefore, we harcoded all WRF PRS
-    # projection.
-    crs_wrf = pyproj.CRS(
-        "+proj=lcc +units=m +R=6370000 +lat_1=60.0 "
-        "+lat_2=30.0 +lat_0=40.70002 +lon_0=-1.5 "
-        "+nadgrids=@null"
-    )
+    crs_wrf = _get_wrf_prs_crs()
 
     # WRF PRS is a GRIB1 file and does not provide enough precision for corner
     # coordinates. Then, geotransform must be calculated following alternative
@@ -128,8 +842,19 @@ def _get_wrf_prs_metadata(xarray_var: xarray.DataArray, model: str) -> dict:
     }
 
 
+@instrumented("grib_file", "variable", "model")
+@_cache_fields
 def read_icon_grib(
-    grib_file: str, variable: str, model: str, extra_filters: dict = None
+    grib_file: str,
+    variable: str,
+    model: str,
+    extra_filters: dict = None,
+    grib_index: FileIndex = None,
+    chunks: dict = None,
+    bbox: tuple = None,
+    bbox_crs: str = None,
+    dtype: str = "float32",
+    levels: list = None,
 ) -> xarray.DataArray:
     """Reads an ICON grib file and transforms it into an xarray.DataArray.
 
@@ -139,34 +864,33 @@ def read_icon_grib(
         model (str): Model to be read.
         extra_filters (dict, optional): Other filters
                                         needed to read the variable
+        grib_index, chunks, bbox, bbox_crs, dtype, levels: See the module
+                                                           docstring.
 
     Returns:
         xarray.DataArray: ICON grib file data.
     """
 
-    filter_keys = {"shortName": variable}
-    if extra_filters is not None:
-        filter_keys.update(extra_filters)
-
-    try:
-        grib_data = xarray.open_dataarray(
-            grib_file,
-            engine="cfgrib",
-            backend_kwargs={"filter_by_keys": filter_keys, "indexpath": ""},
-            decode_timedelta=True,
-        )
-    except DatasetBuildError as err:
-        raise_reader_missing_filters(grib_file, variable, model, err)
+    grib_data = _open_grib(
+        grib_file, variable, model, extra_filters, grib_index, chunks, dtype, levels
+    )
+    lap("open")
 
     geographics = _get_icon_metadata(grib_data)
     grib_data = grib_data.rio.write_crs(geographics["crs"])
+    lap("crs")
 
     # Rename coordinates for further reprojection
     grib_data = grib_data.rename({"longitude": "x", "latitude": "y"})
+    lap("coords")
 
     # Add model name to attributes
     grib_data.attrs["model"] = model
 
+    if bbox is not None:
+        grib_data = subset_bbox(grib_data, bbox, bbox_crs)
+        lap("subset")
+
     return grib_data
 
 
@@ -179,14 +903,24 @@ def _get_icon_metadata(xarray_var: xarray.DataArray) -> dict:
     Returns:
         dict: Coordinate reference system.
     """
-    projparams = proj4_from_grib(xarray_var)
-    crs_model = pyproj.crs.CRS.from_dict(projparams)
+    crs_model = grid_crs(xarray_var)
 
     return {"crs": crs_model}
 
 
+@instrumented("grib_file", "variable", "model")
+@_cache_fields
 def read_moloch_grib(
-    grib_file: str, variable: str, model: str, extra_filters: dict = None
+    grib_file: str,
+    variable: str,
+    model: str,
+    extra_filters: dict = None,
+    grib_index: FileIndex = None,
+    chunks: dict = None,
+    bbox: tuple = None,
+    bbox_crs: str = None,
+    dtype: str = "float32",
+    levels: list = None,
 ) -> xarray.DataArray:
     """Reads a Moloch grib file and transforms it into an xarray.DataArray.
 
@@ -196,28 +930,22 @@ def read_moloch_grib(
         model (str): Model to be read.
         extra_filters (dict, optional): Other filters
                                         needed to read the variable
+        grib_index, chunks, bbox, bbox_crs, dtype, levels: See the module
+                                                           docstring.
 
     Returns:
         xarray.DataArray: Moloch grib file data.
     """
 
-    filter_keys = {"shortName": variable}
-    if extra_filters is not None:
-        filter_keys.update(extra_filters)
-
-    try:
-        grib_data = xarray.open_dataarray(
-            grib_file,
-            engine="cfgrib",
-            backend_kwargs={"filter_by_keys": filter_keys, "indexpath": ""},
-            decode_timedelta=True,
-        )
-    except DatasetBuildError as err:
-        raise_reader_missing_filters(grib_file, variable, model, err)
+    grib_data = _open_grib(
+        grib_file, variable, model, extra_filters, grib_index, chunks, dtype, levels
+    )
+    lap("open")
 
     grib_md = _get_moloch_metadata(grib_data)
 
     grib_data.rio.write_crs(grib_md["crs"], inplace=True)
+    lap("crs")
 
     x_coords = np.linspace(
         grib_md["x0"],
@@ -233,10 +961,15 @@ def read_moloch_grib(
 
     grib_data = grib_data.assign_coords(x=x_coords, y=y_coords)
     grib_data = grib_data.drop_vars(["latitude", "longitude"], errors="ignore")
+    lap("coords")
 
     # Add model name to attributes
     grib_data.attrs["model"] = model
 
+    if bbox is not None:
+        grib_data = subset_bbox(grib_data, bbox, bbox_crs)
+        lap("subset")
+
     return grib_data
 
 
@@ -249,7 +982,7 @@ def _get_moloch_metadata(moloch_data: xarray.DataArray) -> dict:
     Returns:
         dict: Projection and geographic extent of Moloch xarray.
     """
-    moloch_projection = proj4_from_grib(moloch_data)
+    moloch_projection = grid_crs(moloch_data)
 
     x_0 = moloch_data.attrs["GRIB_longitudeOfFirstGridPointInDegrees"]
     d_x = moloch_data.attrs["GRIB_iDirectionIncrementInDegrees"]
@@ -268,8 +1001,19 @@ def _get_moloch_metadata(moloch_data: xarray.DataArray) -> dict:
     }
 
 
+@instrumented("grib_file", "variable", "model")
+@_cache_fields
 def read_bolam_grib(
-    grib_file: str, variable: str, model: str, extra_filters: dict = None
+    grib_file: str,
+    variable: str,
+    model: str,
+    extra_filters: dict = None,
+    grib_index: FileIndex = None,
+    chunks: dict = None,
+    bbox: tuple = None,
+    bbox_crs: str = None,
+    dtype: str = "float32",
+    levels: list = None,
 ) -> xarray.DataArray:
     """Reads a Bolam grib file and transforms it into an xarray.DataArray.
 
@@ -279,28 +1023,22 @@ def read_bolam_grib(
         model (str): Model to be read.
         extra_filters (dict, optional): Other filters
                                         needed to read the variable
+        grib_index, chunks, bbox, bbox_crs, dtype, levels: See the module
+                                                           docstring.
 
     Returns:
         xarray.DataArray: Bolam grib file data.
     """
 
-    filter_keys = {"shortName": variable}
-    if extra_filters is not None:
-        filter_keys.update(extra_filters)
-
-    try:
-        grib_data = xarray.open_dataarray(
-            grib_file,
-            engine="cfgrib",
-            backend_kwargs={"filter_by_keys": filter_keys, "indexpath": ""},
-            decode_timedelta=True,
-        )
-    except DatasetBuildError as err:
-        raise_reader_missing_filters(grib_file, variable, model, err)
+    grib_data = _open_grib(
+        grib_file, variable, model, extra_filters, grib_index, chunks, dtype, levels
+    )
+    lap("open")
 
     grib_md = _get_bolam_metadata(grib_data)
 
     grib_data.rio.write_crs(grib_md["crs"], inplace=True)
+    lap("crs")
 
     x_coords = np.linspace(
         grib_md["x0"],
@@ -316,10 +1054,15 @@ def read_bolam_grib(
 
     grib_data = grib_data.assign_coords(x=x_coords, y=y_coords)
     grib_data = grib_data.drop_vars(["latitude", "longitude"], errors="ignore")
+    lap("coords")
 
     # Add model name to attributes
     grib_data.attrs["model"] = model
 
+    if bbox is not None:
+        grib_data = subset_bbox(grib_data, bbox, bbox_crs)
+        lap("subset")
+
     return grib_data
 
 
@@ -332,7 +1075,7 @@ def _get_bolam_metadata(bolam_data: xarray.DataArray) -> dict:
     Returns:
         dict: Projection and geographic extent of Bolam xarray.
     """
-    bolam_projection = proj4_from_grib(bolam_data)
+    bolam_projection = grid_crs(bolam_data)
 
     x_0 = bolam_data.attrs["GRIB_longitudeOfFirstGridPointInDegrees"] - 360.0
     d_x = bolam_data.attrs["GRIB_iDirectionIncrementInDegrees"]
@@ -351,8 +1094,19 @@ def _get_bolam_metadata(bolam_data: xarray.DataArray) -> dict:
     }
 
 
+@instrumented("grib_file", "variable", "model")
+@_cache_fields
 def read_arome_grib(
-    grib_file: str, variable: str, model: str, extra_filters: dict = None
+    grib_file: str,
+    variable: str,
+    model: str,
+    extra_filters: dict = None,
+    grib_index: FileIndex = None,
+    chunks: dict = None,
+    bbox: tuple = None,
+    bbox_crs: str = None,
+    dtype: str = "float32",
+    levels: list = None,
 ) -> xarray.DataArray:
     """Reads an AROME grib file and transforms it into an xarray.DataArray.
 
@@ -362,28 +1116,22 @@ def read_arome_grib(
         model (str): Model to be read.
         extra_filters (dict, optional): Other filters
                                         needed to read the variable
+        grib_index, chunks, bbox, bbox_crs, dtype, levels: See the module
+                                                           docstring.
 
     Returns:
         xarray.DataArray: AROME grib file data.
     """
 
-    filter_keys = {"shortName": variable}
-    if extra_filters is not None:
-        filter_keys.update(extra_filters)
-
-    try:
-        grib_data = xarray.open_dataarray(
-            grib_file,
-            engine="cfgrib",
-            backend_kwargs={"filter_by_keys": filter_keys, "indexpath": ""},
-            decode_timedelta=True,
-        )
-    except DatasetBuildError as err:
-        raise_reader_missing_filters(grib_file, variable, model, err)
+    grib_data = _open_grib(
+        grib_file, variable, model, extra_filters, grib_index, chunks, dtype, levels
+    )
+    lap("open")
 
     grib_md = _get_arome_metadata(grib_data)
 
     grib_data.rio.write_crs(grib_md["crs"], inplace=True)
+    lap("crs")
 
     # Rename coordinates for further reprojection
     grib_data = grib_data.rename({"longitude": "x", "latitude": "y"})
@@ -391,6 +1139,7 @@ def read_arome_grib(
     grib_data = grib_data.assign_coords(
         {"x": np.round(grib_data.x.data, 2), "y": np.round(grib_data.y.data, 2)}
     )
+    lap("coords")
 
     # Add model name to attributes
     grib_data.attrs["model"] = model
@@ -398,6 +1147,10 @@ def read_arome_grib(
     # Cut out xarray
     grib_data = grib_data.sel(y=slice(44.005, 39.0), x=slice(-1.5, 6.005))
 
+    if bbox is not None:
+        grib_data = subset_bbox(grib_data, bbox, bbox_crs)
+        lap("subset")
+
     return grib_data
 
 
@@ -410,14 +1163,24 @@ def _get_arome_metadata(arome_data: xarray.DataArray) -> dict:
     Returns:
         dict: Coordinate reference system.
     """
-    projparams = proj4_from_grib(arome_data)
-    crs_model = pyproj.crs.CRS.from_dict(projparams)
+    crs_model = grid_crs(arome_data)
 
     return {"crs": crs_model}
 
 
+@instrumented("grib_file", "variable", "model")
+@_cache_fields
 def read_arpege_grib(
-    grib_file: str, variable: str, model: str, extra_filters: dict = None
+    grib_file: str,
+    variable: str,
+    model: str,
+    extra_filters: dict = None,
+    grib_index: FileIndex = None,
+    chunks: dict = None,
+    bbox: tuple = None,
+    bbox_crs: str = None,
+    dtype: str = "float32",
+    levels: list = None,
 ) -> xarray.DataArray:
     """Reads an ARPEGE grib file and transforms it into an xarray.DataArray.
 
@@ -427,34 +1190,29 @@ def read_arpege_grib(
         model (str): Model to be read.
         extra_filters (dict, optional): Other filters
                                         needed to read the variable
+        grib_index, chunks, bbox, bbox_crs, dtype, levels: See the module
+                                                           docstring.
 
     Returns:
         xarray.DataArray: ARPEGE grib file data.
     """
 
-    filter_keys = {"shortName": variable}
-    if extra_filters is not None:
-        filter_keys.update(extra_filters)
-
-    try:
-        grib_data = xarray.open_dataarray(
-            grib_file,
-            engine="cfgrib",
-            backend_kwargs={"filter_by_keys": filter_keys, "indexpath": ""},
-            decode_timedelta=True,
-        )
-    except DatasetBuildError as err:
-        raise_reader_missing_filters(grib_file, variable, model, err)
+    grib_data = _open_grib(
+        grib_file, variable, model, extra_filters, grib_index, chunks, dtype, levels
+    )
+    lap("open")
 
     grib_md = _get_arpege_metadata(grib_data)
 
     grib_data.rio.write_crs(grib_md["crs"], inplace=True)
+    lap("crs")
 
     # Rename coordinates for further reprojection
     grib_data = grib_data.rename({"longitude": "x", "latitude": "y"})
     grib_data = grib_data.assign_coords(
         {"x": np.round(grib_data.x.data, 1), "y": np.round(grib_data.y.data, 1)}
     )
+    lap("coords")
 
     # Add model name to attributes
     grib_data.attrs["model"] = model
@@ -462,6 +1220,10 @@ def read_arpege_grib(
     # Cut out xarray
     grib_data = grib_data.sel(y=slice(44.05, 38.95), x=slice(-1.55, 6.05))
 
+    if bbox is not None:
+        grib_data = subset_bbox(grib_data, bbox, bbox_crs)
+        lap("subset")
+
     return grib_data
 
 
@@ -474,14 +1236,24 @@ def _get_arpege_metadata(arpege_data: xarray.DataArray) -> dict:
     Returns:
         dict: Coordinate reference system.
     """
-    projparams = proj4_from_grib(arpege_data)
-    crs_model = pyproj.crs.CRS.from_dict(projparams)
+    crs_model = grid_crs(arpege_data)
 
     return {"crs": crs_model}
 
 
+@instrumented("grib_file", "variable", "model")
+@_cache_fields
 def read_ecmwf_grib(
-    grib_file: str, variable: str, model: str, extra_filters: dict = None
+    grib_file: str,
+    variable: str,
+    model: str,
+    extra_filters: dict = None,
+    grib_index: FileIndex = None,
+    chunks: dict = None,
+    bbox: tuple = None,
+    bbox_crs: str = None,
+    dtype: str = "float32",
+    levels: list = None,
 ) -> xarray.DataArray:
     """Reads an ECMWF grib file and transforms it into an xarray.DataArray.
 
@@ -491,39 +1263,40 @@ def read_ecmwf_grib(
         model (str): Model to be read.
         extra_filters (dict, optional): Other filters
                                         needed to read the variable
+        grib_index, chunks, bbox, bbox_crs, dtype, levels: See the module
+                                                           docstring.
 
     Returns:
         xarray.DataArray: ECMWF grib file data.
     """
 
-    filter_keys = {"shortName": variable}
-    if extra_filters is not None:
-        filter_keys.update(extra_filters)
-
-    try:
-        grib_data = xarray.open_dataarray(
-            grib_file,
-            engine="cfgrib",
-            backend_kwargs={"filter_by_keys": filter_keys, "indexpath": ""},
-            decode_timedelta=True,
-        )
-    except DatasetBuildError as err:
-        raise_reader_missing_filters(grib_file, variable, model, err)
+    grib_data = _open_grib(
+        grib_file, variable, model, extra_filters, grib_index, chunks, dtype, levels
+    )
+    lap("open")
 
     if variable == "tp":
-        grib_data.data = grib_data.data * 1000
+        # Scale factor with the data type of the values, to not upcast them
+        grib_data.data = grib_data.data * grib_data.dtype.type(1000)
         grib_data.attrs["units"] = "mm"
         grib_data.attrs["GRIB_units"] = "mm"
+        lap("scale")
 
     geographics = _get_ecmwf_hres_metadata(grib_data)
     grib_data = grib_data.rio.write_crs(geographics["crs"])
+    lap("crs")
 
     # Rename coordinates for further reprojection
     grib_data = grib_data.rename({"longitude": "x", "latitude": "y"})
+    lap("coords")
 
     # Add model name to attributes
     grib_data.attrs["model"] = model
 
+    if bbox is not None:
+        grib_data = subset_bbox(grib_data, bbox, bbox_crs)
+        lap("subset")
+
     return grib_data
 
 
@@ -536,14 +1309,24 @@ def _get_ecmwf_hres_metadata(xarray_var):
     Returns:
         dict: Coordinate reference system.
     """
-    projparams = proj4_from_grib(xarray_var)
-    crs_model = pyproj.crs.CRS.from_dict(projparams)
+    crs_model = grid_crs(xarray_var)
 
     return {"crs": crs_model}
 
 
+@instrumented("grib_file", "variable", "model")
+@_cache_fields
 def read_unified_model_grib(
-    grib_file: str, variable: str, model: str, extra_filters: dict = None
+    grib_file: str,
+    variable: str,
+    model: str,
+    extra_filters: dict = None,
+    grib_index: FileIndex = None,
+    chunks: dict = None,
+    bbox: tuple = None,
+    bbox_crs: str = None,
+    dtype: str = "float32",
+    levels: list = None,
 ) -> xarray.DataArray:
     """Reads an Unified Model grib file and transforms it into
     an xarray.DataArray.
@@ -554,34 +1337,33 @@ def read_unified_model_grib(
         model (str): Model to be read.
         extra_filters (dict, optional): Other filters
                                         needed to read the variable
+        grib_index, chunks, bbox, bbox_crs, dtype, levels: See the module
+                                                           docstring.
 
     Returns:
         xarray.DataArray: Unified Model grib file data.
     """
 
-    filter_keys = {"shortName": variable}
-    if extra_filters is not None:
-        filter_keys.update(extra_filters)
-
-    try:
-        grib_data = xarray.open_dataarray(
-            grib_file,
-            engine="cfgrib",
-            backend_kwargs={"filter_by_keys": filter_keys, "indexpath": ""},
-            decode_timedelta=True,
-        )
-    except DatasetBuildError as err:
-        raise_reader_missing_filters(grib_file, variable, model, err)
+    grib_data = _open_grib(
+        grib_file, variable, model, extra_filters, grib_index, chunks, dtype, levels
+    )
+    lap("open")
 
     geographics = _get_unified_model_metadata(grib_data)
     grib_data = grib_data.rio.write_crs(geographics["crs"])
+    lap("crs")
 
     # Rename coordinates for further reprojection
     grib_data = grib_data.rename({"longitude": "x", "latitude": "y"})
+    lap("coords")
 
     # Add model name to attributes
     grib_data.attrs["model"] = model
 
+    if bbox is not None:
+        grib_data = subset_bbox(grib_data, bbox, bbox_crs)
+        lap("subset")
+
     return grib_data
 
 
@@ -594,14 +1376,24 @@ def _get_unified_model_metadata(xarray_var):
     Returns:
         dict: Coordinate reference system.
     """
-    projparams = proj4_from_grib(xarray_var)
-    crs_model = pyproj.crs.CRS.from_dict(projparams)
+    crs_model = grid_crs(xarray_var)
 
     return {"crs": crs_model}
 
 
+@instrumented("grib_file", "variable", "model")
+@_cache_fields
 def read_wrf_tl_ens_grib(
-    grib_file: str, variable: str, model: str, extra_filters: dict = None
+    grib_file: str,
+    variable: str,
+    model: str,
+    extra_filters: dict = None,
+    grib_index: FileIndex = None,
+    chunks: dict = None,
+    bbox: tuple = None,
+    bbox_crs: str = None,
+    dtype: str = "float32",
+    levels: list = None,
 ) -> xarray.DataArray:
     """Reads a WRF-TLS-ENS member grib file and transforms it into
     an xarray.DataArray.
@@ -612,28 +1404,22 @@ def read_wrf_tl_ens_grib(
         model (str): Model to be read.
         extra_filters (dict, optional): Other filters
                                         needed to read the variable
+        grib_index, chunks, bbox, bbox_crs, dtype, levels: See the module
+                                                           docstring.
 
     Returns:
         xarray.DataArray: WRF-TLS-ENS member grib file data.
     """
 
-    filter_keys = {"shortName": variable}
-    if extra_filters is not None:
-        filter_keys.update(extra_filters)
-
-    try:
-        grib_data = xarray.open_dataarray(
-            grib_file,
-            engine="cfgrib",
-            backend_kwargs={"filter_by_keys": filter_keys, "indexpath": ""},
-            decode_timedelta=True,
-        )
-    except DatasetBuildError as err:
-        raise_reader_missing_filters(grib_file, variable, model, err)
+    grib_data = _open_grib(
+        grib_file, variable, model, extra_filters, grib_index, chunks, dtype, levels
+    )
+    lap("open")
 
     grib_md = _get_wrf_tl_ens_metadata(grib_data)
 
     grib_data.rio.write_crs(grib_md["crs"], inplace=True)
+    lap("crs")
 
     # Rename coordinates for further reprojection
     grib_data = grib_data.rename({"longitude": "x", "latitude": "y"})
@@ -642,10 +1428,15 @@ def read_wrf_tl_ens_grib(
     grib_data = grib_data.assign_coords(
         realization=int(re.search(r"tl_ens-\d+-(\d+)\.", grib_file).group(1))
     )
+    lap("coords")
 
     # Add model name to attributes
     grib_data.attrs["model"] = model
 
+    if bbox is not None:
+        grib_data = subset_bbox(grib_data, bbox, bbox_crs)
+        lap("subset")
+
     return grib_data
 
 
@@ -658,16 +1449,29 @@ def _get_wrf_tl_ens_metadata(xarray_var: xarray.DataArray) -> dict:
     Returns:
         dict: Coordinate reference system.
     """
-    projparams = proj4_from_grib(xarray_var)
-    crs_model = pyproj.crs.CRS.from_dict(projparams)
+    crs_model = grid_crs(xarray_var)
 
     return {"crs": crs_model}
 
 
+@instrumented("grib_file", "variable", "model")
+@_cache_fields
 def read_ncep_grib(
-    grib_file: str, variable: str, model: str, extra_filters: dict = None
+    grib_file: str,
+    variable: str,
+    model: str,
+    extra_filters: dict = None,
+    grib_index: FileIndex = None,
+    chunks: dict = None,
+    bbox: tuple = None,
+    bbox_crs: str = None,
+    dtype: str = "float32",
+    idx_file: str = None,
+    levels: list = None,
 ) -> xarray.DataArray:
     """Reads an NCEP (GEFS or GFS) grib file and transforms it into an xarray.DataArray.
+    If the grib file has an NCEP '.idx' inventory (see `read_ncep_idx`),
+    only the messages of the variable are read.
 
     Args:
         grib_file (string): Path to an GFS/GEFS grib file.
@@ -675,37 +1479,159 @@ def read_ncep_grib(
         model (str): Model to be read.
         extra_filters (dict, optional): Other filters
                                         needed to read the variable
+        grib_index, chunks, bbox, bbox_crs, dtype, levels: See the module
+                                                           docstring.
+        idx_file (str, optional): Path to the NCEP '.idx' inventory of the
+                                  grib file. Defaults to None, the grib file
+                                  path followed by '.idx' if it exists.
 
     Returns:
         xarray.DataArray: GFS/GEFS grib file data.
     """
-
-    filter_keys = {"shortName": variable}
-    if extra_filters is not None:
-        filter_keys.update(extra_filters)
-
-    try:
-        grib_data = xarray.open_dataarray(
-            grib_file,
-            engine="cfgrib",
-            backend_kwargs={"filter_by_keys": filter_keys, "indexpath": ""},
-            decode_timedelta=True,
+    if grib_index is None:
+        grib_index = _ncep_grib_index(
+            grib_file, variable, extra_filters, idx_file, levels
         )
-    except DatasetBuildError as err:
-        raise_reader_missing_filters(grib_file, variable, model, err)
+
+    grib_data = _open_grib(
+        grib_file, variable, model, extra_filters, grib_index, chunks, dtype, levels
+    )
+    lap("open")
 
     geographics = _get_ncep_metadata(grib_data)
     grib_data = grib_data.rio.write_crs(geographics["crs"])
+    lap("crs")
 
     # Rename coordinates for further reprojection
     grib_data = grib_data.rename({"longitude": "x", "latitude": "y"})
+    lap("coords")
 
     # Add model name to attributes
     grib_data.attrs["model"] = model
 
+    if bbox is not None:
+        grib_data = subset_bbox(grib_data, bbox, bbox_crs)
+        lap("subset")
+
     return grib_data
 
 
+def read_ncep_idx(idx_file: str, grib_file: str = None) -> pd.DataFrame:
+    """Reads an NCEP '.idx' inventory, which lists the messages of a grib
+    file as lines like '1:0:d=2023022800:PRMSL:mean sea level:3 hour
+    fcst:'.
+
+    Args:
+        idx_file (str): Path to the NCEP '.idx' inventory.
+        grib_file (str, optional): Path to the grib file, used to get the
+                                   length of the last message. Defaults to
+                                   None, its path is 'idx_file' without
+                                   '.idx'.
+
+    Returns:
+        pandas.DataFrame: One row per message, with columns 'offset',
+                          'totalLength', 'variable' (NCEP abbreviation),
+                          'level' (description), 'forecast' and 'ensemble'.
+    """
+    if grib_file is None:
+        grib_file = re.sub(r"\.idx$", "", idx_file)
+
+    messages = []
+    with open(idx_file, "r", encoding="utf-8") as f_idx:
+        for line in f_idx:
+            fields = line.rstrip("\n").split(":")
+            if len(fields) < 6:
+                continue
+            messages.append(
+                {
+                    "offset": int(fields[1]),
+                    "variable": fields[3],
+                    "level": fields[4],
+                    "forecast": fields[5],
+                    "ensemble": ":".join(fields[6:]).strip(":") or None,
+                }
+            )
+
+    ncep_inventory = pd.DataFrame(
+        messages, columns=["offset", "variable", "level", "forecast", "ensemble"]
+    )
+
+    # Fields of the same grib message (i.e. '5.1' and '5.2') share its offset
+    offsets = np.unique(ncep_inventory.offset.values)
+    message_ends = np.append(offsets[1:], os.path.getsize(grib_file))
+    ncep_inventory.insert(
+        1,
+        "totalLength",
+        message_ends[np.searchsorted(offsets, ncep_inventory.offset.values)]
+        - ncep_inventory.offset.values,
+    )
+
+    return ncep_inventory
+
+
+def _ncep_grib_index(
+    grib_file: str,
+    variable: str,
+    extra_filters: dict = None,
+    idx_file: str = None,
+    levels: list = None,
+) -> FileIndex:
+    """Indexes the messages of a variable found in the NCEP '.idx' inventory
+    of a grib file, reading only their headers.
+
+    Args:
+        grib_file (str): Path to a GFS/GEFS grib file.
+        variable (str): Variable to extract.
+        extra_filters (dict, optional): Other filters needed to read the
+                                        variable. Defaults to None.
+        idx_file (str, optional): Path to the NCEP '.idx' inventory.
+                                  Defaults to None, the grib file path
+                                  followed by '.idx'.
+        levels (list, optional): Isobaric levels (hPa) of the variable.
+                                 Defaults to None.
+
+    Returns:
+        FileIndex: Message index of the variable, or None if there is no
+                   inventory or the variable is not found in it.
+    """
+    if idx_file is None:
+        idx_file = grib_file + ".idx"
+    if variable not in _NCEP_VARIABLES or not os.path.isfile(idx_file):
+        return None
+
+    filter_keys = {"shortName": variable}
+    if extra_filters is not None:
+        filter_keys.update(extra_filters)
+
+    ncep_inventory = read_ncep_idx(idx_file, grib_file)
+    ncep_variable, ncep_level = _NCEP_VARIABLES[variable]
+
+    matches = ncep_inventory.variable == ncep_variable
+    if ncep_level is not None:
+        matches &= ncep_inventory.level == ncep_level
+    elif levels is not None:
+        matches &= ncep_inventory.level.isin(
+            [_NCEP_LEVELS[_LEVELS_TYPE].format(level=level) for level in levels]
+        )
+    elif filter_keys.get("typeOfLevel") in _NCEP_LEVELS and "level" in filter_keys:
+        matches &= ncep_inventory.level == _NCEP_LEVELS[
+            filter_keys["typeOfLevel"]
+        ].format(level=filter_keys["level"])
+
+    offsets = ncep_inventory.offset[matches].unique().tolist()
+    if not offsets:
+        return None
+
+    grib_index = open_grib_index(grib_file, filter_keys, offsets)
+
+    # Messages not matching the filters are read as usual, so errors are
+    # the same as without inventory
+    if not grib_index.field_ids_index:
+        return None
+
+    return grib_index
+
+
 def _get_ncep_metadata(xarray_var):
     """Gets projection of an GFS/GEFS xarray.
 
@@ -715,14 +1641,24 @@ def _get_ncep_metadata(xarray_var):
     Returns:
         dict: Coordinate reference system.
     """
-    projparams = proj4_from_grib(xarray_var)
-    crs_model = pyproj.crs.CRS.from_dict(projparams)
+    crs_model = grid_crs(xarray_var)
 
     return {"crs": crs_model}
 
 
+@instrumented("grib_file", "variable", "model")
+@_cache_fields
 def read_swan_grib(
-    grib_file: str, variable: str, model: str, extra_filters: dict = None
+    grib_file: str,
+    variable: str,
+    model: str,
+    extra_filters: dict = None,
+    grib_index: FileIndex = None,
+    chunks: dict = None,
+    bbox: tuple = None,
+    bbox_crs: str = None,
+    dtype: str = "float32",
+    levels: list = None,
 ) -> xarray.DataArray:
     """Reads a SWAN grib file and transforms it into an xarray.DataArray.
 
@@ -732,27 +1668,21 @@ def read_swan_grib(
         model (str): Model to be read.
         extra_filters (dict, optional): Other filters
                                         needed to read the variable
+        grib_index, chunks, bbox, bbox_crs, dtype, levels: See the module
+                                                           docstring.
 
     Returns:
         xarray.DataArray: SWAN grib file data.
     """
 
-    filter_keys = {"shortName": variable}
-    if extra_filters is not None:
-        filter_keys.update(extra_filters)
-
-    try:
-        grib_data = xarray.open_dataarray(
-            grib_file,
-            engine="cfgrib",
-            backend_kwargs={"filter_by_keys": filter_keys, "indexpath": ""},
-            decode_timedelta=True,
-        )
-    except DatasetBuildError as err:
-        raise_reader_missing_filters(grib_file, variable, model, err)
+    grib_data = _open_grib(
+        grib_file, variable, model, extra_filters, grib_index, chunks, dtype, levels
+    )
+    lap("open")
 
     geographics = _get_swan_metadata(grib_data)
     grib_data = grib_data.rio.write_crs(geographics["crs"])
+    lap("crs")
 
     # Change time for steps (timedelta)
     # grib_data["time"] = (grib_data.time - grib_data.time[0])
@@ -762,10 +1692,15 @@ def read_swan_grib(
     # Rename coordinates for further reprojection
     grib_data = grib_data.rename({"longitude": "x", "latitude": "y"})
     # , "time": "step"})
+    lap("coords")
 
     # Add model name to attributes
     grib_data.attrs["model"] = model
 
+    if bbox is not None:
+        grib_data = subset_bbox(grib_data, bbox, bbox_crs)
+        lap("subset")
+
     return grib_data
 
 
@@ -778,14 +1713,24 @@ def _get_swan_metadata(xarray_var):
     Returns:
         dict: Coordinate reference system.
     """
-    projparams = proj4_from_grib(xarray_var)
-    crs_model = pyproj.crs.CRS.from_dict(projparams)
+    crs_model = grid_crs(xarray_var)
 
     return {"crs": crs_model}
 
 
+@instrumented("grib_file", "variable", "model")
+@_cache_fields
 def read_ww3_grib(
-    grib_file: str, variable: str, model: str, extra_filters: dict = None
+    grib_file: str,
+    variable: str,
+    model: str,
+    extra_filters: dict = None,
+    grib_index: FileIndex = None,
+    chunks: dict = None,
+    bbox: tuple = None,
+    bbox_crs: str = None,
+    dtype: str = "float32",
+    levels: list = None,
 ) -> xarray.DataArray:
     """Reads a WW3 grib file and transforms it into an xarray.DataArray.
 
@@ -795,34 +1740,33 @@ def read_ww3_grib(
         model (str): Model to be read.
         extra_filters (dict, optional): Other filters
                                         needed to read the variable
+        grib_index, chunks, bbox, bbox_crs, dtype, levels: See the module
+                                                           docstring.
 
     Returns:
         xarray.DataArray: WW3 grib file data.
     """
 
-    filter_keys = {"shortName": variable}
-    if extra_filters is not None:
-        filter_keys.update(extra_filters)
-
-    try:
-        grib_data = xarray.open_dataarray(
-            grib_file,
-            engine="cfgrib",
-            backend_kwargs={"filter_by_keys": filter_keys, "indexpath": ""},
-            decode_timedelta=True,
-        )
-    except DatasetBuildError as err:
-        raise_reader_missing_filters(grib_file, variable, model, err)
+    grib_data = _open_grib(
+        grib_file, variable, model, extra_filters, grib_index, chunks, dtype, levels
+    )
+    lap("open")
 
     geographics = _get_ww3_metadata(grib_data)
     grib_data = grib_data.rio.write_crs(geographics["crs"])
+    lap("crs")
 
     # Rename coordinates for further reprojection
     grib_data = grib_data.rename({"longitude": "x", "latitude": "y"})
+    lap("coords")
 
     # Add model name to attributes
     grib_data.attrs["model"] = model
 
+    if bbox is not None:
+        grib_data = subset_bbox(grib_data, bbox, bbox_crs)
+        lap("subset")
+
     return grib_data
 
 
@@ -835,7 +1779,6 @@ def _get_ww3_metadata(xarray_var):
     Returns:
         dict: Coordinate reference system.
     """
-    projparams = proj4_from_grib(xarray_var)
-    crs_model = pyproj.crs.CRS.from_dict(projparams)
+    crs_model = grid_crs(xarray_var)
 
     return {"crs": crs_model}
@@ -0,0 +1,234 @@
+"""Module to open the grib files of a model run as a single lazy xarray."""
+
+import os
+from datetime import datetime
+from glob import glob
+
+import dask
+import dask.array
+import numpy as np
+import pandas as pd
+import xarray
+
+from unimodel.io.importers_nwp import _format_nwp_file
+from unimodel.io.interface import get_reader
+from unimodel.io.readers_nwp import _match_messages, inventory, open_grib_index
+
+# Inventory columns that are stacked as dimensions, in this order, when
+# their values change between the messages of a variable
+_RUN_DIMS = ("number", "step", "level")
+
+
+def build_run_references(
+    date_run: datetime,
+    model: str,
+    config: dict,
+    lead_times: list,
+    references_file: str = None,
+) -> pd.DataFrame:
+    """Scans the grib files of a model run, found following the 'src'
+    template of `import_nwp_grib` configuration, and builds a reference set
+    with the file, byte offset and length of each message. Only message
+    headers are read.
+
+    Args:
+        date_run (datetime): Datetime of the model run.
+        model (str): Name of the model.
+        config (dict): Configuration dictionary.
+        lead_times (list): Lead times of the run.
+        references_file (str, optional): Path where references are written,
+                                         as Parquet if it ends with
+                                         '.parquet' and as JSON otherwise.
+                                         Defaults to None, not written.
+
+    Raises:
+        KeyError: If 'model' not in the configuration dictionary.
+        ValueError: If grib files of 'model' are compressed.
+        FileNotFoundError: If the grib file of a lead time is not found.
+
+    Returns:
+        pandas.DataFrame: Inventory (see `inventory`) of all the messages of
+                          the run, with their file path in column 'file'.
+    """
+    if model not in config.keys():
+        raise KeyError(model + " not in configuration dictionary.")
+
+    if config[model]["compressed"]:
+        raise ValueError("References can only be built from uncompressed files.")
+
+    grib_files = []
+    for lead_time in lead_times:
+        nwp_file = _format_nwp_file(date_run, lead_time, model, config)
+        lead_time_files = sorted(glob(nwp_file))
+        if len(lead_time_files) == 0:
+            raise FileNotFoundError(nwp_file + " not found.")
+        grib_files.extend(lead_time_files)
+
+    references = []
+    for grib_file in grib_files:
+        grib_inventory = inventory(grib_file)
+        grib_inventory.insert(0, "file", os.path.abspath(grib_file))
+        references.append(grib_inventory)
+    references = pd.concat(references, ignore_index=True)
+
+    if references_file is not None:
+        if references_file.endswith(".parquet"):
+            references.to_parquet(references_file, index=False)
+        else:
+            references.to_json(references_file, orient="records", indent=1)
+
+    return references
+
+
+def open_run_references(
+    references, variable: str, model: str, extra_filters: dict = None, **reader_kwargs
+) -> xarray.DataArray:
+    """Opens a variable of a model run as a lazy xarray.DataArray from its
+    reference set. Each message is a dask chunk, read and transformed by
+    the reader method of 'model' only when computed, so coordinates, CRS
+    and values are the same as those of the reader. Messages are stacked
+    along 'number', 'step' and level dimensions if these change.
+
+    Args:
+        references (str or pandas.DataFrame): References returned by
+                                              `build_run_references` or
+                                              path to a file where they
+                                              were written.
+        variable (str): Variable to extract.
+        model (str): Name of the NWP model, as accepted by `get_reader`.
+        extra_filters (dict, optional): Other filters needed to read the
+                                        variable, on reference columns.
+                                        Defaults to None.
+        **reader_kwargs: Other reader arguments (i.e. bbox, dtype).
+
+    Raises:
+        ValueError: If no message matches 'variable' and 'extra_filters'.
+        ValueError: If messages are not unique by 'number', 'step' and
+                    level.
+        ValueError: If messages do not fill all the dimensions.
+
+    Returns:
+        xarray.DataArray: Lazy data of the variable for the whole run.
+    """
+    if isinstance(references, str):
+        if references.endswith(".parquet"):
+            references = pd.read_parquet(references)
+        else:
+            references = pd.read_json(
+                references, orient="records", dtype=False, convert_dates=False
+            )
+
+    references = references[_match_messages(references, variable, extra_filters)]
+    if len(references) == 0:
+        raise ValueError(
+            f"No message matches variable '{variable}' and extra_filters "
+            f"{extra_filters}."
+        )
+
+    dims = [dim for dim in _RUN_DIMS if references[dim].nunique() > 1]
+    if dims:
+        duplicated = references.duplicated(dims).any()
+    else:
+        # A single message is returned as it is, not stacked
+        duplicated = len(references) > 1
+    if duplicated:
+        raise ValueError(
+            f"Messages of '{variable}' are not unique by {list(_RUN_DIMS)}, "
+            "set 'extra_filters' to select them."
+        )
+    dim_values = {dim: np.unique(references[dim]) for dim in dims}
+    dim_shape = tuple(len(values) for values in dim_values.values())
+    if len(references) != np.prod(dim_shape, dtype=int):
+        raise ValueError(f"Messages of '{variable}' do not fill {dims}.")
+    if dims:
+        references = references.sort_values(dims)
+
+    reader_method = get_reader(model)
+    template = _read_message(
+        reader_method,
+        references.file.iloc[0],
+        references.offset.iloc[0],
+        variable,
+        model,
+        extra_filters,
+        reader_kwargs,
+    )
+
+    messages = [
+        dask.array.from_delayed(
+            dask.delayed(_read_message_values)(
+                reader_method,
+                message.file,
+                message.offset,
+                variable,
+                model,
+                extra_filters,
+                reader_kwargs,
+            ),
+            shape=template.shape,
+            dtype=template.dtype,
+        )
+        for message in references.itertuples()
+    ]
+    if dims:
+        run_data = dask.array.stack(messages).reshape(dim_shape + template.shape)
+    else:
+        run_data = messages[0]
+
+    # Dimension coordinates follow cfgrib names, level is named after its type
+    coords = dict(template.coords)
+    dim_names = []
+    for dim, values in dim_values.items():
+        if dim == "step":
+            values = pd.to_timedelta(values, unit="h").values.astype("timedelta64[ns]")
+        elif dim == "level":
+            dim = references.typeOfLevel.iloc[0]
+        dim_attrs = template.coords[dim].attrs if dim in template.coords else {}
+        coords[dim] = xarray.Variable(dim, values, dim_attrs)
+        dim_names.append(dim)
+
+    if "step" in dim_values and "time" in coords:
+        coords["valid_time"] = xarray.Variable(
+            "step",
+            template.time.values + coords["step"].values,
+            template.valid_time.attrs,
+        )
+
+    return xarray.DataArray(
+        run_data,
+        dims=tuple(dim_names) + template.dims,
+        coords=coords,
+        name=template.name,
+        attrs=template.attrs,
+    )
+
+
+def _read_message(
+    reader_method,
+    grib_file: str,
+    offset: int,
+    variable: str,
+    model: str,
+    extra_filters: dict,
+    reader_kwargs: dict,
+) -> xarray.DataArray:
+    """Reads and transforms a single grib message with a reader method."""
+    filter_keys = {"shortName": variable}
+    if extra_filters is not None:
+        filter_keys.update(extra_filters)
+
+    grib_index = open_grib_index(grib_file, filter_keys, [offset])
+
+    return reader_method(
+        grib_file,
+        variable,
+        model,
+        extra_filters,
+        grib_index=grib_index,
+        **reader_kwargs,
+    ).load()
+
+
+def _read_message_values(*args) -> np.ndarray:
+    """Reads the values of a single grib message with a reader method."""
+    return _read_message(*args).values
@@ -0,0 +1,639 @@
+"""Module to manage on-disk caches with a size budget."""
+
+import base64
+import hashlib
+import json
+import os
+import shutil
+import socket
+import threading
+import time
+
+import numpy as np
+
+from unimodel.utils.instrumentation import add_bytes_read
+
+# Subdirectory of a stage directory with the references to its files
+_REFS_DIR = ".refs"
+
+# Ways of staging a file: copying it or linking it to its source
+STAGE_MODES = ("copy", "hardlink", "reflink", "symlink")
+
+# Linux ioctl cloning a file (reflink) on copy-on-write file systems
+_FICLONE = 0x40049409
+
+
+def _temporary_path(file_path: str) -> str:
+    """Gets a path, unique to the calling thread, where a file is written
+    before being renamed to 'file_path'. Unlike `tempfile.mkstemp`, files
+    are created with the default permissions, so they can be shared.
+
+    Args:
+        file_path (str): Path to the final file.
+
+    Returns:
+        str: Temporary path.
+    """
+    return f"{file_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+
+def _to_json(obj):
+    """Converts an object to JSON types. Tuples, bytes, numpy data types,
+    scalars and arrays are tagged, so `_from_json` restores them.
+
+    Raises:
+        TypeError: If the object contains other types (i.e. numpy object
+                   arrays or dicts with keys that are not strings).
+    """
+    if obj is None or isinstance(obj, (bool, int, float, str)):
+        return obj
+    if isinstance(obj, list):
+        return [_to_json(item) for item in obj]
+    if isinstance(obj, tuple):
+        return {"__tuple__": [_to_json(item) for item in obj]}
+    if isinstance(obj, dict):
+        if not all(isinstance(key, str) for key in obj):
+            raise TypeError("Only dicts with string keys can be cached.")
+        return {key: _to_json(value) for key, value in obj.items()}
+    if isinstance(obj, bytes):
+        return {"__bytes__": base64.b64encode(obj).decode("ascii")}
+    if isinstance(obj, np.dtype):
+        return {"__dtype__": obj.str}
+    if isinstance(obj, (np.generic, np.ndarray)):
+        array = np.asarray(obj)
+        if array.dtype.hasobject:
+            raise TypeError("Numpy object arrays cannot be cached.")
+        return {
+            "__scalar__" if isinstance(obj, np.generic) else "__ndarray__": [
+                array.dtype.str,
+                list(array.shape),
+                base64.b64encode(np.ascontiguousarray(array).tobytes()).decode("ascii"),
+            ]
+        }
+
+    raise TypeError(f"Objects of type {type(obj).__name__} cannot be cached.")
+
+
+def _from_json(obj: dict):
+    """Restores the object of a tagged dict written by `_to_json`."""
+    if len(obj) != 1:
+        return obj
+
+    tag, value = next(iter(obj.items()))
+    if tag == "__tuple__":
+        return tuple(value)
+    if tag == "__bytes__":
+        return base64.b64decode(value)
+    if tag == "__dtype__":
+        return np.dtype(value)
+    if tag in ("__scalar__", "__ndarray__"):
+        dtype, shape, data = value
+        array = np.frombuffer(base64.b64decode(data), dtype=dtype).reshape(shape)
+        return array[()] if tag == "__scalar__" else array.copy()
+
+    return obj
+
+
+def dump_json(obj, file) -> None:
+    """Writes an object to a binary file as JSON. Unlike pickle, loading it
+    never runs code, so files can be shared with other users.
+
+    Args:
+        obj (any): JSON types, tuples, bytes, numpy data types, scalars and
+                   arrays.
+        file (file): Binary file object.
+
+    Raises:
+        TypeError: If 'obj' contains other types.
+    """
+    file.write(json.dumps(_to_json(obj)).encode("utf-8"))
+
+
+def load_json(file):
+    """Reads an object written by `dump_json`.
+
+    Args:
+        file (file): Binary file object.
+
+    Raises:
+        ValueError: If the file is not valid JSON.
+
+    Returns:
+        any: Object.
+    """
+    return json.loads(file.read().decode("utf-8"), object_hook=_from_json)
+
+
+def _reflink(src_file: str, dst_file: str) -> None:
+    """Clones a file sharing its data blocks (reflink), on Linux file
+    systems with copy-on-write (i.e. Btrfs, XFS).
+
+    Raises:
+        OSError: If the file system or platform does not support it.
+    """
+    try:
+        import fcntl
+    except ImportError:
+        raise OSError("Reflinks are not supported on this platform.") from None
+
+    with open(src_file, "rb") as f_src, open(dst_file, "wb") as f_dst:
+        fcntl.ioctl(f_dst.fileno(), _FICLONE, f_src.fileno())
+
+
+def link_or_copy(
+    src_file: str, dst_file: str, mode: str = "copy", mtime_ns: int = None
+) -> str:
+    """Stages a file as a link to its source, or as a copy if it cannot be
+    linked (i.e. hardlinks and reflinks between different file systems).
+    The file is created atomically.
+
+    Args:
+        src_file (str): Path to the source file.
+        dst_file (str): Path to the staged file.
+        mode (str, optional): 'copy', 'hardlink', 'reflink' or 'symlink'.
+                              Defaults to 'copy'.
+        mtime_ns (int, optional): Modification time in nanoseconds of the
+                                  staged file if it is a copy or a reflink.
+                                  Links share that of the source. Defaults
+                                  to None, the time it is staged.
+
+    Raises:
+        ValueError: If 'mode' is not a stage mode.
+
+    Returns:
+        str: Mode used, 'copy' if the file could not be linked.
+    """
+    if mode not in STAGE_MODES:
+        raise ValueError(
+            f"Unknown stage mode {mode}\n The available stage modes are: "
+            + str(list(STAGE_MODES))
+        )
+
+    tmp_path = _temporary_path(dst_file)
+    try:
+        try:
+            if mode == "hardlink":
+                os.link(src_file, tmp_path)
+            elif mode == "symlink":
+                os.symlink(os.path.abspath(src_file), tmp_path)
+            elif mode == "reflink":
+                _reflink(src_file, tmp_path)
+        except OSError:
+            if os.path.lexists(tmp_path):
+                os.remove(tmp_path)
+            mode = "copy"
+
+        if mode == "copy":
+            shutil.copyfile(src_file, tmp_path)
+            add_bytes_read(os.path.getsize(tmp_path))
+        if mode in ("copy", "reflink") and mtime_ns is not None:
+            os.utime(tmp_path, ns=(time.time_ns(), mtime_ns))
+
+        os.replace(tmp_path, dst_file)
+    except BaseException:
+        if os.path.lexists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    return mode
+
+
+class FileCache:
+    """Directory of cached objects with a size budget and least recently
+    used (LRU) eviction.
+
+    Entries are written to a temporary file and atomically renamed, so
+    several processes can share the same directory: an entry is either
+    complete or missing, and entries evicted by another process are
+    treated as misses.
+    """
+
+    def __init__(
+        self, cache_dir: str, max_size: int = 512 * 1024**2, suffix: str = ".json"
+    ) -> None:
+        """Function for initializing the object's attributes.
+
+        Args:
+            cache_dir (str): Directory where cached entries are stored. It is
+                             created if it does not exist.
+            max_size (int, optional): Size budget of the cache in bytes.
+                                      Defaults to 512 MiB.
+            suffix (str, optional): Extension of the cached entries.
+                                    Defaults to '.json'.
+        """
+        os.makedirs(cache_dir, exist_ok=True)
+
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self.suffix = suffix
+
+    @staticmethod
+    def file_key(file_path: str, *args) -> str:
+        """Builds a cache key identifying a file by its absolute path, size
+        and modification time, so changed files never hit stale entries.
+
+        Args:
+            file_path (str): Path to the file.
+            *args: Other hashable values that identify the entry.
+
+        Returns:
+            str: Cache key.
+        """
+        stat = os.stat(file_path)
+        key = repr((os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns) + args)
+
+        return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+    def path(self, key: str) -> str:
+        """Gets the path of a cached entry.
+
+        Args:
+            key (str): Cache key.
+
+        Returns:
+            str: Path to the cached entry.
+        """
+        return os.path.join(self.cache_dir, key + self.suffix)
+
+    def load(self, key: str):
+        """Loads a cached object and marks it as recently used.
+
+        Args:
+            key (str): Cache key.
+
+        Returns:
+            any: Cached object, or None if not cached.
+        """
+        entry_path = self.path(key)
+        try:
+            with open(entry_path, "rb") as entry:
+                cached = load_json(entry)
+            os.utime(entry_path)
+        except (OSError, ValueError):
+            return None
+
+        return cached
+
+    def store(self, key: str, obj) -> None:
+        """Stores an object in the cache and evicts the least recently used
+        entries if the size budget is exceeded.
+
+        Args:
+            key (str): Cache key.
+            obj (any): Object to cache, of the types written by `dump_json`.
+        """
+        self._write(self.path(key), lambda tmp_file: dump_json(obj, tmp_file))
+
+        self.evict()
+
+    def _write(self, entry_path: str, write) -> None:
+        """Writes a file of the cache atomically.
+
+        Args:
+            entry_path (str): Path to the file.
+            write (function): Function writing the file contents to the
+                              open file object it receives.
+        """
+        tmp_path = _temporary_path(entry_path)
+        try:
+            with open(tmp_path, "wb") as tmp_file:
+                write(tmp_file)
+            os.replace(tmp_path, entry_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def _remove(self, entry_path: str) -> None:
+        """Removes an entry of the cache.
+
+        Args:
+            entry_path (str): Path to the cached entry.
+        """
+        try:
+            os.remove(entry_path)
+        except FileNotFoundError:
+            pass
+
+    def evict(self) -> None:
+        """Removes the least recently used entries until the cache fits in
+        its size budget."""
+        entries = []
+        with os.scandir(self.cache_dir) as scan:
+            for entry in scan:
+                if not entry.name.endswith(self.suffix):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+
+        cache_size = sum(entry[1] for entry in entries)
+        for _, entry_size, entry_path in sorted(entries):
+            if cache_size <= self.max_size:
+                break
+            self._remove(entry_path)
+            cache_size -= entry_size
+
+
+class ArrayCache(FileCache):
+    """Directory of cached numpy arrays with a size budget and least
+    recently used (LRU) eviction.
+
+    Arrays are stored as '.npy' files and loaded memory-mapped, so they are
+    read from disk only when accessed and several processes share the same
+    pages. Each array can be stored with a metadata object, saved as JSON
+    (see `dump_json`) in a sidecar '.meta' file.
+    """
+
+    def __init__(self, cache_dir: str, max_size: int = 4 * 1024**3) -> None:
+        """Function for initializing the object's attributes.
+
+        Args:
+            cache_dir (str): Directory where cached arrays are stored. It is
+                             created if it does not exist.
+            max_size (int, optional): Size budget of the cache in bytes.
+                                      Defaults to 4 GiB.
+        """
+        super().__init__(cache_dir, max_size, suffix=".npy")
+
+    def _metadata_path(self, entry_path: str) -> str:
+        """Gets the path of the metadata of a cached array.
+
+        Args:
+            entry_path (str): Path to the cached array.
+
+        Returns:
+            str: Path to the metadata file.
+        """
+        return entry_path[: -len(self.suffix)] + ".meta"
+
+    def load(self, key: str):
+        """Loads a cached array, memory-mapped in copy-on-write mode, and
+        marks it as recently used. Changes to the array are not written to
+        the cache.
+
+        Args:
+            key (str): Cache key.
+
+        Returns:
+            tuple: Array and metadata, or None if not cached.
+        """
+        entry_path = self.path(key)
+        try:
+            with open(self._metadata_path(entry_path), "rb") as entry:
+                metadata = load_json(entry)
+            values = np.load(entry_path, mmap_mode="c", allow_pickle=False)
+            os.utime(entry_path)
+        except (OSError, ValueError):
+            return None
+
+        return values, metadata
+
+    def store(self, key: str, obj: tuple) -> None:
+        """Stores an array and its metadata in the cache and evicts the
+        least recently used entries if the size budget is exceeded.
+
+        Args:
+            key (str): Cache key.
+            obj (tuple): Array and metadata, of the types written by
+                         `dump_json`.
+        """
+        values, metadata = obj
+        entry_path = self.path(key)
+
+        # Metadata is written first, so an array is never loaded without it
+        self._write(
+            self._metadata_path(entry_path),
+            lambda tmp_file: dump_json(metadata, tmp_file),
+        )
+        self._write(
+            entry_path,
+            lambda tmp_file: np.save(tmp_file, np.asarray(values), allow_pickle=False),
+        )
+
+        self.evict()
+
+    def _remove(self, entry_path: str) -> None:
+        """Removes a cached array and its metadata.
+
+        Args:
+            entry_path (str): Path to the cached array.
+        """
+        super()._remove(entry_path)
+        super()._remove(self._metadata_path(entry_path))
+
+
+class StageCache(FileCache):
+    """Stage directory of files copied from a source directory, with a size
+    budget, least recently used (LRU) eviction and reference counting.
+
+    Staged files keep their names and the modification time of their
+    source, so unchanged files are reused. The last use of a file is
+    recorded in its access time. Files are referenced by the processes that
+    staged them until released, and referenced files are never evicted.
+    References are files in a '.refs' subdirectory, so several processes
+    can share the same directory. References of processes that are no
+    longer running are ignored.
+    """
+
+    # Number of references of each file held by this process
+    _references = dict()
+    _references_lock = threading.Lock()
+
+    def __init__(self, cache_dir: str, max_size: int) -> None:
+        """Function for initializing the object's attributes.
+
+        Args:
+            cache_dir (str): Stage directory. It is created if it does not
+                             exist.
+            max_size (int): Size budget of the directory in bytes.
+        """
+        super().__init__(cache_dir, max_size, suffix="")
+        os.makedirs(os.path.join(cache_dir, _REFS_DIR), exist_ok=True)
+
+    def is_staged(self, name: str, size: int, mtime_ns: int) -> bool:
+        """Checks if a file is staged and unchanged.
+
+        Args:
+            name (str): Name of the file in the stage directory.
+            size (int): Size of the source file in bytes.
+            mtime_ns (int): Modification time of the source file in
+                            nanoseconds.
+
+        Returns:
+            bool: True if the staged file has the same size and modification
+                  time as the source.
+        """
+        try:
+            stat = os.stat(self.path(name))
+        except FileNotFoundError:
+            return False
+
+        return stat.st_size == size and stat.st_mtime_ns == mtime_ns
+
+    def stage(self, src_file: str, mode: str = "copy") -> str:
+        """Stages a file (see `link_or_copy`), unless it is already staged
+        and unchanged, and marks it as recently used.
+
+        Args:
+            src_file (str): Path to the source file.
+            mode (str, optional): 'copy', 'hardlink', 'reflink' or
+                                  'symlink'. Defaults to 'copy'.
+
+        Returns:
+            str: Path to the staged file.
+        """
+        src_stat = os.stat(src_file)
+        staged_file = self.path(os.path.basename(src_file))
+
+        if not self.is_staged(
+            os.path.basename(src_file), src_stat.st_size, src_stat.st_mtime_ns
+        ):
+            link_or_copy(src_file, staged_file, mode, src_stat.st_mtime_ns)
+
+        self.touch(staged_file)
+
+        return staged_file
+
+    @staticmethod
+    def touch(staged_file: str) -> None:
+        """Marks a staged file as recently used, keeping its modification
+        time. The access time of symbolic links is set instead of that of
+        their source. Hard links of files of other users cannot be marked.
+
+        Args:
+            staged_file (str): Path to the staged file.
+        """
+        stat = os.lstat(staged_file)
+        try:
+            os.utime(
+                staged_file,
+                ns=(time.time_ns(), stat.st_mtime_ns),
+                follow_symlinks=False,
+            )
+        except (PermissionError, NotImplementedError):
+            pass
+
+    @staticmethod
+    def _reference_path(staged_file: str) -> str:
+        """Gets the path of the reference of this process to a file."""
+        stage_dir, name = os.path.split(os.path.abspath(staged_file))
+
+        return os.path.join(
+            stage_dir, _REFS_DIR, f"{name}@{socket.gethostname()}@{os.getpid()}"
+        )
+
+    @classmethod
+    def acquire(cls, staged_file: str) -> None:
+        """Adds a reference of this process to a staged file, so it is not
+        evicted until released.
+
+        Args:
+            staged_file (str): Path to the staged file.
+        """
+        reference_path = cls._reference_path(staged_file)
+        with cls._references_lock:
+            count = cls._references.get(reference_path, 0)
+            if count == 0:
+                open(reference_path, "wb").close()
+            cls._references[reference_path] = count + 1
+
+    @classmethod
+    def release(cls, staged_file: str) -> None:
+        """Removes a reference of this process to a staged file.
+
+        Args:
+            staged_file (str): Path to the staged file.
+        """
+        reference_path = cls._reference_path(staged_file)
+        with cls._references_lock:
+            count = cls._references.get(reference_path, 0)
+            if count <= 1:
+                cls._references.pop(reference_path, None)
+                try:
+                    os.remove(reference_path)
+                except FileNotFoundError:
+                    pass
+            else:
+                cls._references[reference_path] = count - 1
+
+    def _referenced(self) -> set:
+        """Gets the names of the files referenced by running processes and
+        removes the references of processes that are no longer running."""
+        hostname = socket.gethostname()
+        refs_dir = os.path.join(self.cache_dir, _REFS_DIR)
+
+        referenced = set()
+        for reference in os.listdir(refs_dir):
+            # Stray or partially written files are not references
+            fields = reference.rsplit("@", 2)
+            if (
+                reference.endswith(".tmp")
+                or len(fields) != 3
+                or not fields[2].isdigit()
+            ):
+                continue
+            name, reference_host, pid = fields
+            # Processes of other hosts sharing the directory cannot be
+            # checked, so their references are kept
+            if reference_host == hostname and not _process_running(int(pid)):
+                try:
+                    os.remove(os.path.join(refs_dir, reference))
+                except FileNotFoundError:
+                    pass
+            else:
+                referenced.add(name)
+
+        return referenced
+
+    def evict(self) -> None:
+        """Removes the least recently used files that are not referenced
+        until the directory fits in its size budget. Links count as the
+        size of their source."""
+        entries = []
+        with os.scandir(self.cache_dir) as scan:
+            for entry in scan:
+                if entry.is_dir(follow_symlinks=False) or entry.name.endswith(".tmp"):
+                    continue
+                try:
+                    stat = entry.stat(follow_symlinks=False)
+                except FileNotFoundError:
+                    continue
+                entry_size = stat.st_size
+                if entry.is_symlink():
+                    try:
+                        entry_size = entry.stat().st_size
+                    except FileNotFoundError:
+                        pass
+                entries.append((stat.st_atime_ns, entry_size, entry.name))
+
+        cache_size = sum(entry[1] for entry in entries)
+        referenced = self._referenced()
+        for _, entry_size, name in sorted(entries):
+            if cache_size <= self.max_size:
+                break
+            if name in referenced:
+                continue
+            self._remove(self.path(name))
+            cache_size -= entry_size
+
+
+def _process_running(pid: int) -> bool:
+    """Checks if a process of this host is running.
+
+    Args:
+        pid (int): Process identifier.
+
+    Returns:
+        bool: True if the process is running.
+    """
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+
+    return True
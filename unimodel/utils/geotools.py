@@ -1,9 +1,11 @@
 """Module to deal with projection features."""
 
 import json
+from functools import lru_cache
 
 import numpy as np
 import pandas as pd
+import pyproj
 import rasterio
 import rioxarray
 import shapefile
@@ -20,6 +22,7 @@ def reproject_xarray(
     ul_corner: tuple,
     resolution: tuple,
     resampling: Resampling = Resampling.cubic_spline,
+    dtype: str = None,
 ) -> xarray.DataArray:
     """Reprojects an xarray based on crs, transform and shape of another
     xarray.
@@ -32,6 +35,8 @@ def reproject_xarray(
         resolution (tuple): destination grid's resolution in (x,y) directions
         resampling (Resampling, optional): Resampling method used for
             interpolation processes. Defaults to Resampling.cubic_spline
+        dtype (str, optional): Data type of the reprojected xarray. Defaults
+            to None, the data type of 'xr_coarse'.
 
     Returns:
         xarray: Reprojected xarray
@@ -40,6 +45,9 @@ def reproject_xarray(
     transform = Affine.from_gdal(
         ul_corner[0], resolution[0], 0, ul_corner[1], 0, -resolution[1]
     )
+    if dtype is not None:
+        xr_coarse = xr_coarse.astype(dtype, copy=False)
+
     xr_reproj = xr_coarse.rio.reproject(
         dst_proj, shape=(shape[0], shape[1]), resampling=resampling, transform=transform
     )
@@ -47,6 +55,50 @@ def reproject_xarray(
     return xr_reproj
 
 
+def subset_bbox(
+    data: xarray.DataArray, bbox: tuple, bbox_crs: str = None
+) -> xarray.DataArray:
+    """Selects the grid points of an xarray inside a bounding box. Data is
+    only indexed, so values of lazy data are not decoded outside the box.
+    In geographic grids, longitudes are wrapped to the bounding box (i.e.
+    a box from -1 to 4 degrees cuts a 0 to 360 degrees grid).
+
+    Args:
+        data (xarray.DataArray): xarray with 'x' and 'y' dimensions and CRS.
+        bbox (tuple): Bounding box (x_min, y_min, x_max, y_max).
+        bbox_crs (str, optional): CRS of the bounding box (i.e. 'EPSG:4326').
+                                  Defaults to None, the CRS of 'data'.
+
+    Raises:
+        ValueError: If no grid point is inside the bounding box.
+
+    Returns:
+        xarray.DataArray: Grid points inside the bounding box.
+    """
+    x_min, y_min, x_max, y_max = bbox
+    if bbox_crs is not None:
+        to_data_crs = pyproj.Transformer.from_crs(
+            bbox_crs, data.rio.crs, always_xy=True
+        )
+        x_min, y_min, x_max, y_max = to_data_crs.transform_bounds(*bbox)
+
+    x_coords = data["x"].values
+    y_coords = data["y"].values
+    if data.rio.crs.is_geographic:
+        x_coords = (x_coords - x_min) % 360.0 + x_min
+
+    x_index = np.flatnonzero((x_coords >= x_min) & (x_coords <= x_max))
+    x_index = x_index[np.argsort(x_coords[x_index], kind="stable")]
+    y_index = np.flatnonzero((y_coords >= y_min) & (y_coords <= y_max))
+
+    if x_index.size == 0 or y_index.size == 0:
+        raise ValueError(f"No grid point of the data is inside {bbox}.")
+
+    data = data.isel(x=x_index, y=y_index)
+
+    return data.assign_coords(x=data["x"].copy(data=x_coords[x_index]))
+
+
 def _get_key(attribs: dict, key: str, default=None):
     """Get key if exists, otherwise return default value.
 
@@ -88,7 +140,7 @@ def proj4_from_grib(ds_grib: xarray.DataArray) -> dict:
 
     attributes = ds_grib.attrs
     tolerate_badgrib = False
-    missingvalue_int = attributes["GRIB_missingValue"]
+    missingvalue_int = attributes.get("GRIB_missingValue")
 
     # check for radius key, if it exists just use it
     # and don't bother with shapeOfTheEarth
@@ -266,6 +318,107 @@ def proj4_from_grib(ds_grib: xarray.DataArray) -> dict:
     return projparams
 
 
+# GRIB keys describing the grid and projection of a message. Each value is
+# read from the 'GRIB_' attributes of cfgrib data.
+_GRID_KEYS = (
+    "gridType",
+    "Nx",
+    "Ny",
+    "Ni",
+    "Nj",
+    "N",
+    "latitudeOfFirstGridPointInDegrees",
+    "longitudeOfFirstGridPointInDegrees",
+    "latitudeOfLastGridPointInDegrees",
+    "longitudeOfLastGridPointInDegrees",
+    "longitudeOfFirstGridPoint",
+    "longitudeOfLastGridPoint",
+    "iDirectionIncrementInDegrees",
+    "jDirectionIncrementInDegrees",
+    "DxInMetres",
+    "DyInMetres",
+    "iScansNegatively",
+    "jScansPositively",
+    "jPointsAreConsecutive",
+    "radius",
+    "shapeOfTheEarth",
+    "scaleFactorOfMajorAxisOfOblateSpheroidEarth",
+    "scaleFactorOfMinorAxisOfOblateSpheroidEarth",
+    "scaledValueOfEarthMajorAxis",
+    "scaledValueOfEarthMinorAxis",
+    "scaleFactorOfRadiusOfSphericalEarth",
+    "scaledValueOfRadiusOfSphericalEarth",
+    "latitudeWhereDxAndDyAreSpecifiedInDegrees",
+    "projectionCentreFlag",
+    "projectionCenterFlag",
+    "orientationOfTheGridInDegrees",
+    "LoVInDegrees",
+    "LaDInDegrees",
+    "Latin1InDegrees",
+    "Latin2InDegrees",
+    "grib2divider",
+    "truncateDegrees",
+    "LoV",
+    "LaD",
+    "Latin",
+    "Latin1",
+    "Latin2",
+    "longitudeOfSubSatellitePointInDegrees",
+    "latitudeOfSubSatellitePointInDegrees",
+    "Nr",
+    "standardParallel",
+    "centralLongitude",
+    "angleOfRotationInDegrees",
+    "latitudeOfSouthernPoleInDegrees",
+    "longitudeOfSouthernPoleInDegrees",
+)
+
+
+def grid_crs(ds_grib: xarray.DataArray) -> pyproj.CRS:
+    """Gets the CRS of an xarray containing data from a NWP grib. CRSs are
+    cached by the GRIB attributes describing the grid (see
+    `grid_crs_cache_info`), so they are built only once per grid and shared
+    between all its reads.
+
+    Args:
+        ds_grib (xarray.DataArray): NWP grib data array.
+
+    Returns:
+        pyproj.CRS: Coordinate reference system.
+    """
+    grid_key = tuple(ds_grib.attrs.get("GRIB_" + key) for key in _GRID_KEYS)
+
+    return _build_grid_crs(grid_key)
+
+
+def grid_crs_cache_info():
+    """Gets the hits and misses of the grid CRS cache.
+
+    Returns:
+        functools._CacheInfo: Hits, misses, maximum and current size.
+    """
+    return _build_grid_crs.cache_info()
+
+
+@lru_cache(maxsize=256)
+def _build_grid_crs(grid_key: tuple) -> pyproj.CRS:
+    """Builds the CRS corresponding to a tuple of the values of _GRID_KEYS.
+
+    Args:
+        grid_key (tuple): Values of _GRID_KEYS.
+
+    Returns:
+        pyproj.CRS: Coordinate reference system.
+    """
+    attributes = {
+        "GRIB_" + key: value
+        for key, value in zip(_GRID_KEYS, grid_key)
+        if value is not None
+    }
+
+    return pyproj.CRS.from_dict(proj4_from_grib(xarray.DataArray(attrs=attributes)))
+
+
 def __get_geometry_from_shp(shapefile_path: str) -> pd.DataFrame:
     """Gets geometry from shapefile.
 
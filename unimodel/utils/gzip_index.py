@@ -0,0 +1,467 @@
+"""Module to read gzip files at random offsets through a seek-point index.
+
+A gzip stream can only be decompressed from its start. The index stores
+checkpoints every 'span' bytes of uncompressed data, at the boundaries of
+the deflate blocks, with the compressed offset of the block and the last
+32 KiB of data before it (the deflate window). Decompression then starts
+at the checkpoint nearest a requested offset, as in zlib's zran.c example.
+
+Python's zlib module does not expose block boundaries nor priming a stream
+with bits, so the zlib shared library is called through ctypes.
+"""
+
+import ctypes
+import ctypes.util
+import io
+import os
+import zlib
+from bisect import bisect_right
+from threading import Lock
+
+from unimodel.utils.file_cache import _temporary_path, dump_json, load_json
+from unimodel.utils.instrumentation import add_bytes_read, timed
+
+# Default distance between checkpoints, in bytes of uncompressed data
+SPAN = 8 * 1024**2
+
+# Size of the deflate window stored with each checkpoint
+_WINDOW_SIZE = 32 * 1024
+
+# Size of the blocks of compressed data read from the file
+_CHUNK_SIZE = 64 * 1024
+
+# zlib constants
+_Z_OK = 0
+_Z_STREAM_END = 1
+_Z_NEED_DICT = 2
+_Z_BUF_ERROR = -5
+_Z_NO_FLUSH = 0
+_Z_BLOCK = 5
+
+# Window bits of raw deflate, gzip and automatic zlib or gzip streams
+_RAW_BITS = -15
+_GZIP_BITS = 31
+_AUTO_BITS = 47
+
+# Length of the gzip member trailer (CRC32 and size)
+_TRAILER_SIZE = 8
+
+_zlib = None
+_zlib_lock = Lock()
+
+
+class _ZStream(ctypes.Structure):
+    """zlib z_stream structure."""
+
+    _fields_ = [
+        ("next_in", ctypes.c_void_p),
+        ("avail_in", ctypes.c_uint),
+        ("total_in", ctypes.c_ulong),
+        ("next_out", ctypes.c_void_p),
+        ("avail_out", ctypes.c_uint),
+        ("total_out", ctypes.c_ulong),
+        ("msg", ctypes.c_char_p),
+        ("state", ctypes.c_void_p),
+        ("zalloc", ctypes.c_void_p),
+        ("zfree", ctypes.c_void_p),
+        ("opaque", ctypes.c_void_p),
+        ("data_type", ctypes.c_int),
+        ("adler", ctypes.c_ulong),
+        ("reserved", ctypes.c_ulong),
+    ]
+
+
+def _zlib_library() -> ctypes.CDLL:
+    """Loads the zlib shared library on first use.
+
+    Raises:
+        ImportError: If the zlib shared library is not found.
+
+    Returns:
+        ctypes.CDLL: zlib library.
+    """
+    global _zlib
+
+    with _zlib_lock:
+        if _zlib is None:
+            library_path = ctypes.util.find_library("z")
+            if library_path is None:
+                raise ImportError("zlib shared library not found.")
+            library = ctypes.CDLL(library_path)
+
+            stream_p = ctypes.POINTER(_ZStream)
+            library.zlibVersion.restype = ctypes.c_char_p
+            library.inflateInit2_.argtypes = [
+                stream_p,
+                ctypes.c_int,
+                ctypes.c_char_p,
+                ctypes.c_int,
+            ]
+            library.inflate.argtypes = [stream_p, ctypes.c_int]
+            library.inflateEnd.argtypes = [stream_p]
+            library.inflateReset.argtypes = [stream_p]
+            library.inflateReset2.argtypes = [stream_p, ctypes.c_int]
+            library.inflatePrime.argtypes = [stream_p, ctypes.c_int, ctypes.c_int]
+            library.inflateSetDictionary.argtypes = [
+                stream_p,
+                ctypes.c_char_p,
+                ctypes.c_uint,
+            ]
+            library.inflateGetDictionary.argtypes = [
+                stream_p,
+                ctypes.c_char_p,
+                ctypes.POINTER(ctypes.c_uint),
+            ]
+            _zlib = library
+
+    return _zlib
+
+
+class _Inflater:
+    """zlib inflate stream reading compressed data from a file."""
+
+    def __init__(self, f_gz, window_bits: int) -> None:
+        """Function for initializing the object's attributes.
+
+        Args:
+            f_gz (file): Compressed file, opened in binary mode at the
+                         position where decompression starts.
+            window_bits (int): zlib window bits of the stream.
+        """
+        self.zlib = _zlib_library()
+        self.f_gz = f_gz
+        self.raw = window_bits == _RAW_BITS
+        self.eof = False
+        self.members = 0
+        self.in_buffer = ctypes.create_string_buffer(_CHUNK_SIZE)
+        self.stream = _ZStream()
+        ret = self.zlib.inflateInit2_(
+            ctypes.byref(self.stream),
+            window_bits,
+            self.zlib.zlibVersion(),
+            ctypes.sizeof(_ZStream),
+        )
+        self._check(ret)
+
+    def _check(self, ret: int) -> None:
+        """Raises zlib.error if a zlib call failed."""
+        if ret == _Z_NEED_DICT or (ret < 0 and ret != _Z_BUF_ERROR):
+            message = self.stream.msg.decode() if self.stream.msg else str(ret)
+            raise zlib.error("Error decompressing gzip data: " + message)
+
+    def _fill(self) -> bool:
+        """Reads more compressed data if all the read data was consumed.
+
+        Returns:
+            bool: False if the end of the file is reached.
+        """
+        if self.stream.avail_in == 0:
+            n_bytes = self.f_gz.readinto(self.in_buffer)
+            add_bytes_read(n_bytes)
+            self.stream.next_in = ctypes.addressof(self.in_buffer)
+            self.stream.avail_in = n_bytes
+
+        return self.stream.avail_in > 0
+
+    def _next_member(self) -> None:
+        """Continues with the next gzip member once a member ends, or marks
+        the end of the data."""
+        # Raw streams do not consume the gzip trailer
+        if self.raw:
+            remaining = _TRAILER_SIZE
+            while remaining > 0 and self._fill():
+                skipped = min(remaining, self.stream.avail_in)
+                self.stream.next_in += skipped
+                self.stream.avail_in -= skipped
+                remaining -= skipped
+
+        self.members += 1
+        if self._fill():
+            self._check(self.zlib.inflateReset2(ctypes.byref(self.stream), _GZIP_BITS))
+            self.raw = False
+        else:
+            self.eof = True
+
+    def prime(self, bits: int, value: int, window: bytes) -> None:
+        """Starts a raw stream in the middle of a deflate stream.
+
+        Args:
+            bits (int): Number of bits of the first block in the previous
+                        byte.
+            value (int): Previous byte.
+            window (bytes): Deflate window before the first block.
+        """
+        if bits > 0:
+            self._check(
+                self.zlib.inflatePrime(
+                    ctypes.byref(self.stream), bits, value >> (8 - bits)
+                )
+            )
+        if len(window) > 0:
+            self._check(
+                self.zlib.inflateSetDictionary(
+                    ctypes.byref(self.stream), window, len(window)
+                )
+            )
+
+    def inflate(self, out_buffer, size: int, flush: int = _Z_NO_FLUSH) -> int:
+        """Decompresses data into a buffer.
+
+        Args:
+            out_buffer (ctypes.Array): Output buffer.
+            size (int): Maximum number of bytes to decompress.
+            flush (int, optional): zlib flush mode. With Z_BLOCK, it stops
+                                   at the end of each deflate block.
+                                   Defaults to Z_NO_FLUSH.
+
+        Raises:
+            EOFError: If the file ends before the gzip data.
+
+        Returns:
+            int: Number of decompressed bytes, 0 at the end of the data.
+        """
+        self.stream.next_out = ctypes.addressof(out_buffer)
+        self.stream.avail_out = size
+        while self.stream.avail_out > 0 and not self.eof:
+            if not self._fill():
+                raise EOFError("Compressed file ended before the end of the data.")
+            ret = self.zlib.inflate(ctypes.byref(self.stream), flush)
+            self._check(ret)
+            if ret == _Z_STREAM_END:
+                self._next_member()
+            if flush == _Z_BLOCK:
+                break
+
+        return size - self.stream.avail_out
+
+    def window(self) -> bytes:
+        """Gets the deflate window, the last 32 KiB of decompressed data."""
+        window = ctypes.create_string_buffer(_WINDOW_SIZE)
+        window_size = ctypes.c_uint(_WINDOW_SIZE)
+        self._check(
+            self.zlib.inflateGetDictionary(
+                ctypes.byref(self.stream), window, ctypes.byref(window_size)
+            )
+        )
+
+        return window.raw[: window_size.value]
+
+    def close(self) -> None:
+        """Frees the zlib stream."""
+        if self.stream is not None:
+            self.zlib.inflateEnd(ctypes.byref(self.stream))
+            self.stream = None
+
+
+def build_index(gz_file: str, span: int = SPAN) -> dict:
+    """Decompresses a gzip file once to build its seek-point index.
+
+    Args:
+        gz_file (str): Path to the gzip file.
+        span (int, optional): Distance between checkpoints in bytes of
+                              uncompressed data. Defaults to 8 MiB.
+
+    Raises:
+        ImportError: If the zlib shared library is not found.
+
+    Returns:
+        dict: Index with the size of the uncompressed data ('size') and the
+              checkpoints ('points'), as tuples (uncompressed offset,
+              compressed offset, bits, compressed window).
+    """
+    points = []
+    total_in = total_out = 0
+    out_buffer = ctypes.create_string_buffer(_CHUNK_SIZE)
+
+    with timed("index"), open(gz_file, "rb") as f_gz:
+        inflater = _Inflater(f_gz, _AUTO_BITS)
+        try:
+            while not inflater.eof:
+                avail_in = inflater.stream.avail_in
+                position = f_gz.tell()
+                members = inflater.members
+                n_bytes = inflater.inflate(out_buffer, _CHUNK_SIZE, _Z_BLOCK)
+                # Consumed input is tracked by file positions, so members
+                # ended in the middle of an input chunk are counted too
+                total_in += f_gz.tell() - position + avail_in - inflater.stream.avail_in
+                total_out += n_bytes
+
+                # At the end of a deflate block that is not the last one, a
+                # checkpoint is added. The first one is right after the
+                # gzip header.
+                data_type = inflater.stream.data_type
+                if (
+                    inflater.members == members
+                    and data_type & 128
+                    and not data_type & 64
+                    and (len(points) == 0 or total_out - points[-1][0] >= span)
+                ):
+                    points.append(
+                        (
+                            total_out,
+                            total_in,
+                            data_type & 7,
+                            zlib.compress(inflater.window()),
+                        )
+                    )
+        finally:
+            inflater.close()
+
+    return {"size": total_out, "span": span, "points": points}
+
+
+def load_index(gz_file: str, index_file: str, span: int = SPAN) -> dict:
+    """Loads the seek-point index of a gzip file from an index file, or
+    builds it and writes the index file if it is missing or outdated.
+
+    Args:
+        gz_file (str): Path to the gzip file.
+        index_file (str): Path to the index file.
+        span (int, optional): Distance between checkpoints of new indexes,
+                              in bytes of uncompressed data. Defaults to
+                              8 MiB.
+
+    Raises:
+        ImportError: If the zlib shared library is not found.
+
+    Returns:
+        dict: Index, as returned by `build_index`.
+    """
+    gz_stat = os.stat(gz_file)
+    gz_key = (gz_stat.st_size, gz_stat.st_mtime_ns)
+
+    try:
+        with open(index_file, "rb") as f_index:
+            index = load_json(f_index)
+        if index["key"] == gz_key:
+            return index
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+
+    index = build_index(gz_file, span)
+    index["key"] = gz_key
+
+    # The index is written atomically, so concurrent readers never load a
+    # partial one
+    tmp_path = _temporary_path(index_file)
+    try:
+        with open(tmp_path, "wb") as f_index:
+            dump_json(index, f_index)
+        os.replace(tmp_path, index_file)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    return index
+
+
+class IndexedGzipFile(io.RawIOBase):
+    """Read-only file object of the uncompressed data of a gzip file, with
+    seeks starting decompression at the nearest checkpoint of its index.
+
+    Sequential reads continue the running decompression, so short forward
+    seeks (i.e. over tar headers) do not restart it.
+    """
+
+    def __init__(self, gz_file: str, index_file: str = None, span: int = SPAN):
+        """Function for initializing the object's attributes.
+
+        Args:
+            gz_file (str): Path to the gzip file.
+            index_file (str, optional): Path to the index file, built on
+                                        first use (see `load_index`).
+                                        Defaults to None, the index is
+                                        built in memory.
+            span (int, optional): Distance between checkpoints in bytes of
+                                  uncompressed data. Defaults to 8 MiB.
+
+        Raises:
+            ImportError: If the zlib shared library is not found.
+        """
+        super().__init__()
+        if index_file is None:
+            self.index = build_index(gz_file, span)
+        else:
+            self.index = load_index(gz_file, index_file, span)
+
+        self.name = gz_file
+        self._offsets = [point[0] for point in self.index["points"]]
+        self._f_gz = open(gz_file, "rb")
+        self._inflater = None
+        self._position = 0
+        self._stream_position = 0
+        self._skip_buffer = ctypes.create_string_buffer(_CHUNK_SIZE)
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += self.index["size"]
+        if offset < 0:
+            raise ValueError("Negative seek position " + str(offset))
+        self._position = offset
+
+        return self._position
+
+    def _start(self) -> None:
+        """Starts decompressing at the checkpoint before the position."""
+        if self._inflater is not None:
+            self._inflater.close()
+
+        point = self.index["points"][bisect_right(self._offsets, self._position) - 1]
+        offset, compressed_offset, bits, window = point
+
+        self._f_gz.seek(compressed_offset - (1 if bits else 0))
+        value = self._f_gz.read(1)[0] if bits else 0
+        self._inflater = _Inflater(self._f_gz, _RAW_BITS)
+        self._inflater.prime(bits, value, zlib.decompress(window))
+        self._stream_position = offset
+
+    def readinto(self, buffer) -> int:
+        size = min(len(buffer), self.index["size"] - self._position)
+        if size <= 0:
+            return 0
+
+        # Decompression restarts if a checkpoint is nearer than the stream
+        checkpoint = self._offsets[bisect_right(self._offsets, self._position) - 1]
+        if (
+            self._inflater is None
+            or self._position < self._stream_position
+            or checkpoint > self._stream_position
+        ):
+            self._start()
+
+        # Data between the checkpoint and the position is discarded
+        while self._stream_position < self._position:
+            n_bytes = self._inflater.inflate(
+                self._skip_buffer,
+                min(_CHUNK_SIZE, self._position - self._stream_position),
+            )
+            if n_bytes == 0:
+                raise EOFError("Gzip data ended before the read position.")
+            self._stream_position += n_bytes
+
+        out_buffer = (ctypes.c_char * size).from_buffer(memoryview(buffer).cast("B"))
+        n_bytes = self._inflater.inflate(out_buffer, size)
+        self._stream_position += n_bytes
+        self._position += n_bytes
+
+        return n_bytes
+
+    def close(self) -> None:
+        if not self.closed:
+            if getattr(self, "_inflater", None) is not None:
+                self._inflater.close()
+            if getattr(self, "_f_gz", None) is not None:
+                self._f_gz.close()
+        super().close()
@@ -0,0 +1,270 @@
+"""Module to report timings of the stages of readers and importers.
+
+Instrumentation is disabled unless a sink is set through 'set_sink' or the
+UNIMODEL_INSTRUMENTATION environment variable (path to a JSON lines file).
+When disabled, instrumented functions only check a module variable.
+
+Each instrumented call emits one event, a dict like:
+
+    {
+        "call": "read_icon_grib",
+        "grib_file": "icon.grib2",
+        "variable": "2t",
+        "model": "icon",
+        "start": 1676000000.0,
+        "bytes_read": 1048576,
+        "peak_array_bytes": 524288,
+        "seconds": 0.52,
+        "stages": {"scan": 0.2, "open": 0.3, "crs": 0.01, "coords": 0.2},
+    }
+
+Stages timed with `timed` (i.e. 'scan' or 'decode') may overlap those timed
+with `lap` (i.e. 'open'). Stages run outside an instrumented call, like the
+decoding of lazy data, emit their own event named after the stage.
+"""
+
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from inspect import signature
+
+# Function receiving each event, None if instrumentation is disabled
+_sink = None
+
+# Event of the instrumented call running in the current context
+_record = contextvars.ContextVar("unimodel_instrumentation_record", default=None)
+
+
+def set_sink(sink=None) -> None:
+    """Sets where instrumentation events are emitted.
+
+    Args:
+        sink (function, logging.Logger or str, optional): Function called
+                                                          with each event,
+                                                          logger where
+                                                          events are logged
+                                                          as JSON, or path
+                                                          to a JSON lines
+                                                          file where they
+                                                          are appended.
+                                                          Defaults to None,
+                                                          instrumentation
+                                                          is disabled.
+
+    Raises:
+        TypeError: If 'sink' is not a function, logger or path.
+    """
+    global _sink
+
+    if sink is None or callable(sink):
+        _sink = sink
+    elif isinstance(sink, logging.Logger):
+        _sink = _logger_sink(sink)
+    elif isinstance(sink, (str, os.PathLike)):
+        _sink = _json_lines_sink(sink)
+    else:
+        raise TypeError(
+            "'sink' must be a function, a logging.Logger or a path, not "
+            f"{type(sink).__name__}."
+        )
+
+
+def _logger_sink(logger: logging.Logger):
+    """Builds a sink logging each event as JSON with level INFO."""
+
+    def log_event(event: dict) -> None:
+        logger.info(json.dumps(event, default=str))
+
+    return log_event
+
+
+def _json_lines_sink(file_path: str):
+    """Builds a sink appending each event as a line of a JSON lines file."""
+    lock = threading.Lock()
+
+    def write_event(event: dict) -> None:
+        line = json.dumps(event, default=str) + "\n"
+        with lock, open(file_path, "a", encoding="utf-8") as f_events:
+            f_events.write(line)
+
+    return write_event
+
+
+def enabled() -> bool:
+    """Checks if instrumentation is enabled.
+
+    Returns:
+        bool: True if a sink is set.
+    """
+    return _sink is not None
+
+
+def instrumented(*arg_names):
+    """Decorator emitting an event for each call of a function, with the
+    values of the arguments in 'arg_names'.
+
+    Args:
+        *arg_names: Names of the arguments included in the event.
+
+    Returns:
+        function: Decorator.
+    """
+
+    def decorator(func):
+        func_signature = signature(func)
+
+        @wraps(func)
+        def instrumented_func(*args, **kwargs):
+            if _sink is None:
+                return func(*args, **kwargs)
+
+            func_args = func_signature.bind(*args, **kwargs)
+            func_args.apply_defaults()
+            record = _new_record(
+                func.__name__,
+                {name: func_args.arguments[name] for name in arg_names},
+            )
+
+            token = _record.set(record)
+            try:
+                result = func(*args, **kwargs)
+                record_array(getattr(result, "nbytes", 0))
+                return result
+            except BaseException as err:
+                record["error"] = type(err).__name__
+                raise
+            finally:
+                _record.reset(token)
+                _emit(record)
+
+        return instrumented_func
+
+    return decorator
+
+
+@contextmanager
+def timed(stage: str, **fields):
+    """Context manager timing a stage of the running instrumented call. If
+    there is none, the stage emits its own event with 'fields'.
+
+    Args:
+        stage (str): Name of the stage.
+        **fields: Fields of the event emitted outside instrumented calls.
+    """
+    if _sink is None:
+        yield
+        return
+
+    record = _record.get()
+    if record is None:
+        record = _new_record(stage, fields)
+        token = _record.set(record)
+        try:
+            yield
+        finally:
+            _record.reset(token)
+            _add_stage(record, stage, time.perf_counter() - record["_start"])
+            _emit(record)
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _add_stage(record, stage, time.perf_counter() - start)
+
+
+def lap(stage: str) -> None:
+    """Times a stage of the running instrumented call as the time elapsed
+    since its previous stage timed with `lap`, or since the call started.
+
+    Args:
+        stage (str): Name of the stage.
+    """
+    if _sink is None:
+        return
+
+    record = _record.get()
+    if record is not None:
+        now = time.perf_counter()
+        _add_stage(record, stage, now - record["_lap"])
+        record["_lap"] = now
+
+
+def add_bytes_read(n_bytes: int) -> None:
+    """Adds bytes read from disk to the running instrumented call.
+
+    Args:
+        n_bytes (int): Number of bytes read.
+    """
+    if _sink is None:
+        return
+
+    record = _record.get()
+    if record is not None:
+        record["bytes_read"] += n_bytes
+
+
+def record_array(n_bytes: int) -> None:
+    """Reports the size of an array built by the running instrumented call,
+    so the largest one is included in its event.
+
+    Args:
+        n_bytes (int): Size of the array in bytes.
+    """
+    if _sink is None:
+        return
+
+    record = _record.get()
+    if record is not None:
+        record["peak_array_bytes"] = max(record["peak_array_bytes"], n_bytes)
+
+
+def _new_record(call: str, fields: dict) -> dict:
+    """Starts the event of an instrumented call."""
+    start = time.perf_counter()
+
+    return {
+        "call": call,
+        **fields,
+        "start": time.time(),
+        "stages": {},
+        "bytes_read": 0,
+        "peak_array_bytes": 0,
+        "_start": start,
+        "_lap": start,
+    }
+
+
+def _add_stage(record: dict, stage: str, seconds: float) -> None:
+    """Adds the duration of a stage to an event. Stages run several times
+    in a call are added up."""
+    record["stages"][stage] = record["stages"].get(stage, 0.0) + seconds
+
+
+def _emit(record: dict) -> None:
+    """Finishes an event and sends it to the sink."""
+    sink = _sink
+    if sink is None:
+        return
+
+    seconds = time.perf_counter() - record.pop("_start")
+    record.pop("_lap")
+    event = {key: value for key, value in record.items() if key != "stages"}
+    event["seconds"] = seconds
+    event["stages"] = record["stages"]
+
+    # Instrumentation never breaks the instrumented code
+    try:
+        sink(event)
+    except Exception:
+        logging.getLogger(__name__).exception("Instrumentation sink failed.")
+
+
+if os.environ.get("UNIMODEL_INSTRUMENTATION"):
+    set_sink(os.environ["UNIMODEL_INSTRUMENTATION"])
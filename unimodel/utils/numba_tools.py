@@ -1,15 +1,26 @@
+"""Module with numba kernels.
+
+Kernels are compiled on first use and cached on disk, next to the module
+or in NUMBA_CACHE_DIR if it is set, so later processes load them instead
+of compiling them. `warmup` (or the 'unimodel warmup' command) compiles
+them for the signatures used by unimodel at deploy time.
+"""
+
 import numba
 import numpy as np
 
+# Data types of the arrays the kernels are compiled for by 'warmup'
+_DTYPES = ("float32", "float64")
 
-@numba.jit(nogil=True, parallel=True, nopython=True)
-def linalg_lstsq(XX, yy):
+
+@numba.jit(nogil=True, parallel=True, nopython=True, cache=True)
+def _linalg_lstsq(XX, yy):
     """Fit a large set of points to a regression"""
     assert XX.shape == yy.shape, "Inputs mismatched"
     n_pnts, _ = XX.shape
 
-    scale = np.empty(n_pnts)
-    offset = np.empty(n_pnts)
+    scale = np.empty(n_pnts, dtype=yy.dtype)
+    offset = np.empty(n_pnts, dtype=yy.dtype)
 
     for i in numba.prange(n_pnts):
         X, y = XX[i], yy[i]
@@ -17,3 +28,51 @@ def linalg_lstsq(XX, yy):
         offset[i], scale[i] = np.linalg.lstsq(A, y)[0]
 
     return offset, scale
+
+
+def linalg_lstsq(XX: np.ndarray, yy: np.ndarray) -> tuple:
+    """Fits a linear regression to each row of a set of points.
+
+    Args:
+        XX (numpy.ndarray): x values, one row per regression.
+        yy (numpy.ndarray): y values, with the same shape as 'XX'.
+
+    Returns:
+        tuple: Offsets and scales of the regressions, as 'float32' if both
+               inputs are 'float32' and as 'float64' otherwise.
+    """
+    # Inputs are cast to the signatures compiled by 'warmup'
+    dtype = np.result_type(XX, yy)
+    if dtype not in _DTYPES:
+        dtype = np.float64
+
+    return _linalg_lstsq(
+        np.ascontiguousarray(XX, dtype=dtype), np.ascontiguousarray(yy, dtype=dtype)
+    )
+
+
+# Kernels compiled by 'warmup' and their signatures
+_KERNELS = {
+    _linalg_lstsq: [
+        f"Tuple(({dt}[::1], {dt}[::1]))({dt}[:, ::1], {dt}[:, ::1])" for dt in _DTYPES
+    ],
+}
+
+
+def warmup() -> dict:
+    """Compiles the numba kernels of unimodel for the signatures they are
+    called with, or loads them from the on-disk cache.
+
+    Returns:
+        dict: Compiled signatures of each kernel, keyed by its name.
+    """
+    for kernel, signatures in _KERNELS.items():
+        for signature in signatures:
+            kernel.compile(signature)
+
+    return {
+        kernel.__name__.lstrip("_"): [
+            str(signature) for signature in kernel.nopython_signatures
+        ]
+        for kernel in _KERNELS
+    }